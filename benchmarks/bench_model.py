@@ -0,0 +1,183 @@
+"""
+Times the model layer's hot paths against synthetic downloads folders.
+
+    python -m benchmarks.bench_model --sizes 1000 10000 100000 --output model.json
+
+Run from the repository root. Results are printed as JSON (and written to
+--output) so runs can be compared for regressions.
+"""
+
+import argparse
+import json
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from src.headless import HeadlessOrganizer, ensure_mobase
+
+ensure_mobase()
+
+# pylint:disable=wrong-import-position
+from benchmarks.synthetic import generate_downloads_folder
+from src.download_manager_model import DownloadManagerModel
+from src.instrumentation import MemoryDiagnostics
+from src.nexus_api import _md5_response_to_class
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+# Meta writes and deletes touch at most this many entries per size
+MUTATION_SAMPLE = 1000
+
+
+def _timed(fn: Callable, repeat: int) -> Dict[str, object]:
+    samples: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return {
+        "seconds": [round(sample, 6) for sample in samples],
+        "median": round(statistics.median(samples), 6),
+        "min": round(min(samples), 6),
+    }
+
+
+def _nexus_response(entry):
+    user = {"member_id": 1, "member_group_id": 1, "name": "benchmark"}
+    mod = {
+        "name": entry.name or "Benchmark", "summary": "", "description": "Synthetic, with a comma", "picture_url": "",
+        "mod_downloads": 0, "mod_unique_downloads": 0, "uid": 0, "user": user, "mod_id": int(entry.nexus_mod_id or 1),
+        "game_id": 1704, "allow_rating": True, "domain_name": "skyrimspecialedition", "category_id": 1,
+        "version": entry.version, "endorsement_count": 0, "created_timestamp": 0, "created_time": "",
+        "updated_timestamp": 0, "updated_time": "", "author": "", "uploaded_by": "",
+        "uploaded_users_profile_url": "", "contains_adult_content": False, "status": "published",
+        "available": True, "endorsement": None,
+    }
+    file_details = {
+        "id": [1, 1704], "uid": 0, "file_id": int(entry.nexus_file_id or 1), "name": entry.name or "Benchmark",
+        "version": entry.version, "category_id": 1, "category_name": "MAIN", "is_primary": True,
+        "size": 0, "file_name": entry.filename, "uploaded_timestamp": 0, "uploaded_time": "", "mod_version": "",
+        "external_virus_scan_url": "", "description": "", "size_kb": 0, "size_in_bytes": 0,
+        "changelog_html": "", "content_preview_link": "", "md5": "",
+    }
+    return _md5_response_to_class({"mod": mod, "file_details": file_details})
+
+
+def _refresh_memory(model: DownloadManagerModel, repeat: int) -> List[Dict[str, object]]:
+    """Traced memory per refresh; growth_since_first should stay flat across repeats."""
+    memory = MemoryDiagnostics(True)
+    records = []
+    for _ in range(repeat):
+        mark = memory.begin("refresh")
+        snapshot = model.refresh()
+        model.publish(snapshot)
+        record = memory.end(mark, len(snapshot.entries))
+        records.append({
+            "traced_bytes": record.traced_bytes,
+            "growth_since_first": record.growth_since_first,
+            "bytes_per_entry": record.bytes_per_entry,
+        })
+    return records
+
+
+def bench_size(size: int, repeat: int, seed: int, work_dir: Path, memory: bool = False) -> Dict[str, object]:
+    folder = work_dir / f"downloads-{size}"
+    started = time.perf_counter()
+    folder_stats = generate_downloads_folder(folder, size, seed)
+    results: Dict[str, object] = {
+        "size": size,
+        "folder": folder_stats,
+        "generate_seconds": round(time.perf_counter() - started, 3),
+        "ops": {},
+    }
+    ops = results["ops"]
+    model = DownloadManagerModel(HeadlessOrganizer(folder))
+
+    ops["refresh"] = _timed(lambda: model.publish(model.refresh()), repeat)
+    if memory:
+        results["refresh_memory"] = _refresh_memory(model, repeat)
+    ops["get_duplicates"] = _timed(model.get_duplicates, repeat)
+    ops["get_not_installed"] = _timed(model.get_not_installed, repeat)
+
+    rng = random.Random(seed)
+    with_meta = [entry for entry in model.data if entry.raw_meta_path is not None]
+    requery_sample = rng.sample(with_meta, min(MUTATION_SAMPLE, len(with_meta)))
+    responses = [(entry, _nexus_response(entry)) for entry in requery_sample]
+    ops["requery_meta_writes"] = _timed(
+        lambda: [
+            future.result()
+            for future in [model._create_meta_from_mod_and_nexus_response(entry, response) for entry, response in responses]
+        ],
+        1,
+    )
+    ops["requery_meta_writes"]["count"] = len(responses)
+
+    hide_updates, _ = model.hide_updates(requery_sample)
+    writer = model.meta_writer
+    ops["hide_meta_writes"] = _timed(
+        lambda: [future.result() for future in [writer.submit(entry.raw_meta_path, keys) for entry, keys, _ in hide_updates]],
+        1,
+    )
+    ops["hide_meta_writes"]["count"] = len(hide_updates)
+
+    # Deletes are destructive, so each variant gets its own sample
+    delete_pool = list(model.data)
+    rng.shuffle(delete_pool)
+    trash_sample = delete_pool[:MUTATION_SAMPLE // 2]
+    unlink_sample = delete_pool[MUTATION_SAMPLE // 2:MUTATION_SAMPLE]
+
+    def delete_to_trash():
+        batch = model.trash.begin_batch()
+        for entry in trash_sample:
+            model.delete(entry, batch)
+        model.trash.commit_batch(batch)
+
+    ops["delete_staged"] = _timed(delete_to_trash, 1)
+    ops["delete_staged"]["count"] = len(trash_sample)
+    ops["delete_unlink"] = _timed(lambda: [model.delete(entry) for entry in unlink_sample], 1)
+    ops["delete_unlink"]["count"] = len(unlink_sample)
+
+    shutil.rmtree(folder, ignore_errors=True)
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--repeat", type=int, default=3, help="runs per read-only operation")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--work-dir", type=Path, help="where folders are generated (default: a temp dir)")
+    parser.add_argument("--output", type=Path, help="also write the JSON results here")
+    parser.add_argument("--memory", action="store_true", help="also trace memory across repeated refreshes")
+    args = parser.parse_args(argv)
+
+    work_dir = args.work_dir or Path(tempfile.mkdtemp(prefix="dlm-bench-"))
+    report = {
+        "benchmark": "model",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.time(),
+        "results": [],
+    }
+    try:
+        for size in args.sizes:
+            print(f"benchmarking {size} entries...", file=sys.stderr)
+            report["results"].append(bench_size(size, args.repeat, args.seed, work_dir, args.memory))
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text, encoding="utf-8")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Measures what the plugin costs MO2 at startup, against its budget.
+
+    python -m benchmarks.bench_startup --runs 10 --output startup.json
+
+Each run is a fresh interpreter, so imports are cold. Qt is imported before
+timing starts, as MO2 has it loaded already. Exits with status 1 when the
+median import or init time is over budget.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from src.headless import ensure_mobase
+
+ensure_mobase()
+
+# pylint:disable=wrong-import-position
+from src.download_manager_plugin import IMPORT_BUDGET_MS, INIT_BUDGET_MS
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+_CHILD = """
+import json, sys, time
+from src.headless import HeadlessOrganizer, ensure_mobase
+ensure_mobase()
+try:
+    from PyQt6.QtWidgets import QApplication
+except ImportError:
+    from PyQt5.QtWidgets import QApplication
+app = QApplication(sys.argv[:1])
+
+started = time.perf_counter()
+from src.download_manager_plugin import DownloadManagerPlugin
+imported = time.perf_counter()
+plugin = DownloadManagerPlugin()
+plugin.init(HeadlessOrganizer(sys.argv[1]))
+initialised = time.perf_counter()
+plugin._window()
+built = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "init_ms": (initialised - imported) * 1000,
+    "first_display_ms": (built - initialised) * 1000,
+}))
+"""
+
+
+def _run_once(downloads: Path) -> Dict[str, float]:
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    completed = subprocess.run(
+        [sys.executable, "-c", _CHILD, str(downloads)],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--output", type=Path, help="also write the JSON results here")
+    args = parser.parse_args(argv)
+
+    samples: Dict[str, List[float]] = {}
+    with tempfile.TemporaryDirectory(prefix="dlm-bench-startup-") as downloads:
+        for _ in range(args.runs):
+            for key, value in _run_once(Path(downloads)).items():
+                samples.setdefault(key, []).append(value)
+
+    medians = {key: round(statistics.median(values), 3) for key, values in samples.items()}
+    budgets = {"import_ms": IMPORT_BUDGET_MS, "init_ms": INIT_BUDGET_MS}
+    report = {
+        "benchmark": "startup",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.time(),
+        "runs": args.runs,
+        "median": medians,
+        "max": {key: round(max(values), 3) for key, values in samples.items()},
+        "budget": budgets,
+        "within_budget": all(medians[key] <= budget for key, budget in budgets.items()),
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text, encoding="utf-8")
+    print(text)
+    return 0 if report["within_budget"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""
+Measures user-facing latency of the download window under an offscreen Qt.
+
+    python -m benchmarks.bench_ui --sizes 1000 10000 50000 --output ui.json
+
+Run from the repository root with PyQt6 or PyQt5 installed. Each interaction
+is timed from the moment it is issued until the event loop is free again
+(a zero-delay timer fires), which is the delay a user would feel.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from src.headless import HeadlessOrganizer, ensure_mobase
+
+ensure_mobase()
+
+# pylint:disable=wrong-import-position
+try:
+    from PyQt6.QtCore import QEventLoop, QTimer, Qt
+    from PyQt6.QtWidgets import QApplication
+except ImportError:
+    from PyQt5.QtCore import QEventLoop, QTimer, Qt
+    from PyQt5.QtWidgets import QApplication
+
+try:
+    try:
+        from PyQt6.QtTest import QTest
+    except ImportError:
+        from PyQt5.QtTest import QTest
+except ImportError:
+    QTest = None
+
+from benchmarks.synthetic import generate_downloads_folder
+from src.download_manager_table_model import Column
+from src.download_manager_window import DownloadManagerWindow
+
+DEFAULT_SIZES = (1000, 10000, 50000)
+SEARCH_QUERIES = ("synthetic mod 12", "size>100MB installed:no", "-hidden:yes 1.2")
+SORT_COLUMNS = (Column.NAME, Column.FILENAME, Column.SIZE, Column.DATE, Column.VERSION)
+FIRST_ROW_TIMEOUT_SECONDS = 600
+
+
+def _percentiles(samples: List[float]) -> Dict[str, object]:
+    ordered = sorted(samples)
+
+    def pick(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+    return {
+        "n": len(ordered),
+        "p50_ms": round(pick(0.5) * 1000, 3),
+        "p90_ms": round(pick(0.9) * 1000, 3),
+        "p99_ms": round(pick(0.99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+        "mean_ms": round(statistics.mean(ordered) * 1000, 3),
+    }
+
+
+def _until_idle() -> float:
+    """Runs the event loop until everything queued so far has been handled; returns when that happened."""
+    loop = QEventLoop()
+    finished = []
+
+    def done():
+        finished.append(time.perf_counter())
+        loop.quit()
+
+    QTimer.singleShot(0, done)
+    loop.exec()
+    return finished[0]
+
+
+def _latency(action: Callable[[], None]) -> float:
+    started = time.perf_counter()
+    action()
+    return _until_idle() - started
+
+
+def _time_to_first_row(folder: Path) -> (DownloadManagerWindow, float):
+    app = QApplication.instance()
+    started = time.perf_counter()
+    window = DownloadManagerWindow(HeadlessOrganizer(folder))
+    window.show()
+    while window._proxy_model.rowCount() == 0:
+        app.processEvents(QEventLoop.ProcessEventsFlag.AllEvents, 5)
+        if time.perf_counter() - started > FIRST_ROW_TIMEOUT_SECONDS:
+            raise TimeoutError("window never showed a row")
+    return window, time.perf_counter() - started
+
+
+def _type(window: DownloadManagerWindow, char: str):
+    if QTest is not None:
+        QTest.keyClick(window._search_input, char)
+    else:
+        window._search_input.insert(char)
+
+
+def bench_size(size: int, repeat: int, seed: int, work_dir: Path) -> Dict[str, object]:
+    folder = work_dir / f"downloads-{size}"
+    generate_downloads_folder(folder, size, seed)
+    interactions: Dict[str, object] = {}
+
+    first_rows = []
+    window = None
+    for _ in range(repeat):
+        if window is not None:
+            window.close()
+            window.deleteLater()
+            _until_idle()
+        window, seconds = _time_to_first_row(folder)
+        first_rows.append(seconds)
+    interactions["time_to_first_row"] = _percentiles(first_rows)
+    _until_idle()
+
+    keystrokes = []
+    for _ in range(repeat):
+        for query in SEARCH_QUERIES:
+            for char in query:
+                keystrokes.append(_latency(lambda char=char: _type(window, char)))
+            window._search_input.clear()
+            _until_idle()
+    interactions["keystroke_to_filter"] = _percentiles(keystrokes)
+
+    sorts = []
+    for _ in range(repeat):
+        for column in SORT_COLUMNS:
+            for order in (Qt.SortOrder.AscendingOrder, Qt.SortOrder.DescendingOrder):
+                sorts.append(_latency(lambda column=column, order=order: window._table_widget.sortByColumn(column, order)))
+    interactions["sort"] = _percentiles(sorts)
+
+    select_all, select_none = [], []
+    for _ in range(repeat * 3):
+        select_all.append(_latency(window._table_model.select_all))
+        select_none.append(_latency(window._table_model.select_none))
+    interactions["select_all"] = _percentiles(select_all)
+    interactions["select_none"] = _percentiles(select_none)
+
+    window.close()
+    window.deleteLater()
+    _until_idle()
+    shutil.rmtree(folder, ignore_errors=True)
+    return {"size": size, "interactions": interactions}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--work-dir", type=Path, help="where folders are generated (default: a temp dir)")
+    parser.add_argument("--output", type=Path, help="also write the JSON results here")
+    args = parser.parse_args(argv)
+
+    _app = QApplication.instance() or QApplication(sys.argv[:1])
+    work_dir = args.work_dir or Path(tempfile.mkdtemp(prefix="dlm-bench-ui-"))
+    report = {
+        "benchmark": "ui",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "qpa": os.environ.get("QT_QPA_PLATFORM"),
+        "time": time.time(),
+        "results": [],
+    }
+    try:
+        for size in args.sizes:
+            print(f"benchmarking window with {size} entries...", file=sys.stderr)
+            report["results"].append(bench_size(size, args.repeat, args.seed, work_dir))
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text, encoding="utf-8")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
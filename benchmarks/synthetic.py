@@ -0,0 +1,83 @@
+import random
+from pathlib import Path
+from typing import Dict
+
+ARCHIVE_SUFFIXES = (".7z", ".zip", ".rar")
+
+# Share of generated files that are archives without a .meta file
+STUB_RATIO = 0.1
+# Share of generated files that are half-finished downloads the scan must skip
+UNFINISHED_RATIO = 0.02
+# Duplicate families get between 1 and this many versions of the same mod
+MAX_FAMILY_SIZE = 6
+
+
+def _archive_size(rng: random.Random) -> int:
+    # Mostly small mods with a long tail of large texture packs
+    return int(min(rng.lognormvariate(15, 2), 8 * 1024 ** 3))
+
+
+def _meta_text(mod_id: int, file_id: int, version: str, name: str, installed: bool, hidden: bool) -> str:
+    lines = [
+        "[General]",
+        "gameName=skyrimse",
+        f"modID={mod_id}",
+        f"fileID={file_id}",
+        f"url=https://www.nexusmods.com/skyrimspecialedition/mods/{mod_id}",
+        f"name={name}",
+        'description="A synthetic mod, with a comma"',
+        f"modName={name}",
+        f"version={version}",
+        "newestVersion=",
+        "fileTime=@Variant(\\0\\0\\0\\x10\\0\\0\\0\\0\\0%\\x8a\\x1a\\x3\\x1e\\xae\\xd0\\x2)",
+        "fileCategory=1",
+        "category=1",
+        "repository=Nexus",
+        'userData=@Variant(\\0\\0\\0\\b\\0\\0\\0\\0)',
+        f"installed={'true' if installed else 'false'}",
+        "uninstalled=false",
+        "paused=false",
+        f"removed={'true' if hidden else 'false'}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def generate_downloads_folder(root: Path, count: int, seed: int = 1) -> Dict[str, int]:
+    """
+    Fills root with `count` archives in MO2's layout: duplicate families of
+    several versions per mod, a mix of installed/hidden flags, stub archives
+    without meta files and unfinished downloads. Archives are sparse files,
+    so sizes are realistic without using the disk space.
+    """
+    rng = random.Random(seed)
+    root.mkdir(parents=True, exist_ok=True)
+    stats = {"archives": 0, "stubs": 0, "unfinished": 0, "families": 0}
+    mod_id = 0
+    while stats["archives"] < count:
+        mod_id += 1
+        stats["families"] += 1
+        name = f"Synthetic Mod {mod_id}"
+        family_size = min(rng.randint(1, MAX_FAMILY_SIZE), count - stats["archives"])
+        for version_index in range(family_size):
+            file_id = mod_id * 100 + version_index
+            suffix = rng.choice(ARCHIVE_SUFFIXES)
+            version = f"1.{version_index}.{rng.randint(0, 9)}"
+            archive = root / f"Synthetic Mod {mod_id}-{mod_id}-{version.replace('.', '-')}-{file_id}{suffix}"
+            with open(archive, "wb") as handle:
+                handle.truncate(_archive_size(rng))
+            stats["archives"] += 1
+
+            if rng.random() < STUB_RATIO:
+                stats["stubs"] += 1
+            else:
+                # Newer versions are less likely to be installed yet
+                installed = rng.random() < 0.6 / (version_index + 1)
+                hidden = installed and rng.random() < 0.5
+                meta = archive.with_name(archive.name + ".meta")
+                meta.write_text(_meta_text(mod_id, file_id, version, name, installed, hidden), encoding="utf-8")
+
+            if rng.random() < UNFINISHED_RATIO:
+                (root / f"{archive.stem}.unfinished{suffix}").write_bytes(b"")
+                (root / f"{archive.name}.unfinished").write_bytes(b"")
+                stats["unfinished"] += 1
+    return stats
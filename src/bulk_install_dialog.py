@@ -1,28 +1,61 @@
-from typing import List, Callable
+import logging
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Union
 
 try:
     import PyQt6.QtWidgets as QtWidgets
     from PyQt6.QtCore import Qt, QTimer, pyqtSignal
     from PyQt6.QtGui import QFont
-    from PyQt6.QtWidgets import QApplication
 except ImportError:
     import PyQt5.QtWidgets as QtWidgets
     from PyQt5.QtCore import Qt, QTimer, pyqtSignal
     from PyQt5.QtGui import QFont
-    from PyQt5.QtWidgets import QApplication
 
+from .archive_prefetch import PrefetchResult, prefetch_archive
 from .download_entry import DownloadEntry
-from .util import logger
+from .install_journal import STATUS_FAILED, STATUS_INSTALLED, STATUS_INSTALLING, InstallJournal
+from .io_scheduler import Priority, device_key, shared_scheduler
+from .util import CancellationToken, logger, sizeof_fmt
+
+
+@dataclass
+class InstallTiming:
+    filename: str
+    file_size: float
+    install_seconds: float
+    settle_seconds: float
+    success: bool
+    # Time the background read-ahead spent on the archive; overlapped with the previous install, not a measured saving
+    read_ahead_seconds: float = 0.0
 
 
 class BulkInstallPanel(QtWidgets.QWidget):
+    """
+    Installs mods one after another. The next install starts as soon as the
+    previous one has returned and the event loop is responsive again (checked
+    with zero-delay timer probes), rather than after a fixed delay.
+
+    With read-ahead on, the archive after the current one is validated and
+    read into the OS cache on the I/O scheduler while MO2 installs; archives
+    that fail validation are marked failed before their turn and skipped.
+    """
+
     STATUS_PENDING = "⏳"
     STATUS_INSTALLING = "🔄"
     STATUS_SUCCESS = "✅"
     STATUS_FAILED = "❌"
     STATUS_SKIPPED = "⏭️"
 
+    # The event loop counts as settled once a zero-delay timer fires within this long
+    RESPONSIVE_LAG_SECONDS = 0.03
+    # Upper bound on settling between installs (the old fixed delay)
+    MAX_SETTLE_SECONDS = 2.0
+
     installation_finished = pyqtSignal()
+    # Emitted from scheduler threads; delivered on the UI thread
+    _prefetch_finished = pyqtSignal(object)
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -35,7 +68,18 @@ class BulkInstallPanel(QtWidgets.QWidget):
         self._success_count = 0
         self._fail_count = 0
         self._skipped_count = 0
-        self._mod_to_row = {}
+        # entry_id -> list row
+        self._mod_to_row: Dict[str, int] = {}
+        self._timings: List[InstallTiming] = []
+        self._read_ahead = True
+        self._prefetch: Dict[str, Future] = {}
+        self._prefetch_results: Dict[str, PrefetchResult] = {}
+        self._prefetch_token = CancellationToken()
+        self._prefetch_finished.connect(self._on_prefetch_finished)
+        self._journal: Union[InstallJournal, None] = None
+        self._started_at = 0.0
+        self._settle_started = 0.0
+        self._probe_sent = 0.0
 
         self._setup_ui()
         self.hide()
@@ -66,7 +110,7 @@ class BulkInstallPanel(QtWidgets.QWidget):
 
         self._cancel_button = QtWidgets.QPushButton("Cancel")
         self._cancel_button.setFixedWidth(90)
-        self._cancel_button.setToolTip("Cancel remaining installations (there's a short delay between mods to click this)")
+        self._cancel_button.setToolTip("Cancel remaining installations after the current one")
         self._cancel_button.clicked.connect(self._on_cancel_clicked)
         header_layout.addWidget(self._cancel_button)
 
@@ -103,7 +147,14 @@ class BulkInstallPanel(QtWidgets.QWidget):
         self._summary_label.hide()
         main_layout.addWidget(self._summary_label)
 
-    def start_installation(self, mods: List[DownloadEntry], install_fn: Callable[[DownloadEntry], bool]):
+    def start_installation(
+        self,
+        mods: List[DownloadEntry],
+        install_fn: Callable[[DownloadEntry], bool],
+        read_ahead: bool = True,
+        journal: Union[InstallJournal, None] = None,
+    ):
+        """With a journal, every step is logged so an interrupted run can be resumed later."""
         if self._is_running:
             logger.warning("BulkInstallPanel: installation already in progress")
             return
@@ -120,6 +171,15 @@ class BulkInstallPanel(QtWidgets.QWidget):
         self._fail_count = 0
         self._skipped_count = 0
         self._mod_to_row.clear()
+        self._timings = []
+        self._started_at = time.perf_counter()
+        self._read_ahead = read_ahead
+        self._prefetch = {}
+        self._prefetch_results = {}
+        self._prefetch_token = CancellationToken()
+        self._journal = journal
+        if journal is not None:
+            journal.start(self._mods)
 
         self._list_widget.clear()
         self._progress_label.setText("Preparing to install...")
@@ -133,14 +193,14 @@ class BulkInstallPanel(QtWidgets.QWidget):
         self._populate_list()
         self.show()
 
-        QTimer.singleShot(100, self._process_next_mod)
+        QTimer.singleShot(0, self._process_next_mod)
 
     def _populate_list(self):
         for i, mod in enumerate(self._mods):
             display_name = mod.name if mod.name else mod.filename
             item = QtWidgets.QListWidgetItem(f"{self.STATUS_PENDING} {display_name}")
             self._list_widget.addItem(item)
-            self._mod_to_row[mod] = i
+            self._mod_to_row[mod.entry_id] = i
 
     def _process_next_mod(self):
         if self._cancelled or self._current_index >= len(self._mods):
@@ -148,38 +208,134 @@ class BulkInstallPanel(QtWidgets.QWidget):
             return
 
         mod = self._mods[self._current_index]
-        logger.debug("BulkInstallPanel._process_next_mod: processing %d/%d: %s", 
-                    self._current_index + 1, len(self._mods), mod.filename)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("BulkInstallPanel._process_next_mod: processing %d/%d: %s",
+                         self._current_index + 1, len(self._mods), mod.filename)
+
+        prefetched = self._prefetch_results.get(mod.entry_id)
+        if prefetched is not None and prefetched.error:
+            # Already marked failed when read-ahead found the problem; don't hand it to MO2
+            logger.debug("BulkInstallPanel._process_next_mod: skipping %s: %s", mod.filename, prefetched.error)
+            self._fail_count += 1
+            self._timings.append(InstallTiming(mod.filename, mod.file_size or 0, 0.0, 0.0, False))
+            if self._journal is not None:
+                self._journal.record(mod, STATUS_FAILED)
+            self._current_index += 1
+            QTimer.singleShot(0, self._process_next_mod)
+            return
 
         self._update_ui_mod_starting(mod)
-        QApplication.processEvents()
+        self._schedule_prefetch()
+        # Let the "installing" state paint before the (blocking) install starts
+        QTimer.singleShot(0, self._install_current_mod)
 
-        logger.debug("BulkInstallPanel._process_next_mod: calling install_fn for %s", mod.filename)
+    def _install_current_mod(self):
+        mod = self._mods[self._current_index]
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("BulkInstallPanel._install_current_mod: calling install_fn for %s", mod.filename)
+        if self._journal is not None:
+            self._journal.record(mod, STATUS_INSTALLING)
+        install_started = time.perf_counter()
         try:
             success = self._install_fn(mod)
-            logger.debug("BulkInstallPanel._process_next_mod: install_fn returned %s for %s", success, mod.filename)
+            if debug:
+                logger.debug("BulkInstallPanel._install_current_mod: install_fn returned %s for %s", success, mod.filename)
         except Exception as e:
-            logger.error("BulkInstallPanel._process_next_mod: exception for %s: %s", mod.filename, e)
+            logger.error("BulkInstallPanel._install_current_mod: exception for %s: %s", mod.filename, e)
             success = False
+        install_seconds = time.perf_counter() - install_started
+        if self._journal is not None:
+            self._journal.record(mod, STATUS_INSTALLED if success else STATUS_FAILED, install_seconds)
 
         if success:
             self._success_count += 1
         else:
             self._fail_count += 1
+        prefetched = self._prefetch_results.get(mod.entry_id)
+        read_ahead_seconds = prefetched.seconds if prefetched is not None and not prefetched.cancelled else 0.0
+        self._timings.append(
+            InstallTiming(mod.filename, mod.file_size or 0, install_seconds, 0.0, success, read_ahead_seconds)
+        )
+        row = self._mod_to_row.get(mod.entry_id)
+        item = self._list_widget.item(row) if row is not None else None
+        if item:
+            tooltip = f"Took {install_seconds:.1f}s"
+            if read_ahead_seconds:
+                tooltip += f" (read-ahead time {read_ahead_seconds:.1f}s)"
+            item.setToolTip(tooltip)
 
         self._update_ui_mod_completed(mod, success)
-        QApplication.processEvents()
-
         self._current_index += 1
 
         if self._cancelled:
             self._skipped_count = len(self._mods) - self._current_index
             self._finish_installation()
         else:
-            QTimer.singleShot(2000, self._process_next_mod)
+            self._settle_started = time.perf_counter()
+            self._send_settle_probe()
+
+    def _schedule_prefetch(self):
+        """Starts reading ahead the next archive that hasn't been looked at, one at a time."""
+        if not self._read_ahead or self._cancelled:
+            return
+        if any(not future.done() for future in self._prefetch.values()):
+            return
+        for mod in self._mods[self._current_index + 1:]:
+            if mod.entry_id in self._prefetch or mod.raw_file_path is None:
+                continue
+            future = shared_scheduler().submit(
+                prefetch_archive, mod.entry_id, mod.raw_file_path, self._prefetch_token,
+                priority=Priority.VERIFICATION, device=device_key(mod.raw_file_path), token=self._prefetch_token,
+            )
+            future.add_done_callback(self._emit_prefetch_result)
+            self._prefetch[mod.entry_id] = future
+            return
+
+    def _emit_prefetch_result(self, future: Future):
+        if not future.cancelled() and future.exception() is None:
+            self._prefetch_finished.emit(future.result())
+
+    def _on_prefetch_finished(self, result: PrefetchResult):
+        if result.entry_id not in self._prefetch:
+            return  # from a previous run
+        self._prefetch_results[result.entry_id] = result
+        if result.error is None:
+            return
+        row = self._mod_to_row.get(result.entry_id)
+        if row is not None and row > self._current_index:
+            mod = self._mods[row]
+            logger.info("Read-ahead: %s can't be installed: %s", mod.filename, result.error)
+            self._update_ui_mod_completed(mod, False)
+            item = self._list_widget.item(row)
+            if item:
+                item.setToolTip(result.error)
+        # That one will be skipped, so look further ahead
+        self._schedule_prefetch()
+
+    def _send_settle_probe(self):
+        self._probe_sent = time.perf_counter()
+        QTimer.singleShot(0, self._on_settle_probe)
+
+    def _on_settle_probe(self):
+        now = time.perf_counter()
+        lag = now - self._probe_sent
+        settle_seconds = now - self._settle_started
+        if lag > self.RESPONSIVE_LAG_SECONDS and settle_seconds < self.MAX_SETTLE_SECONDS:
+            # MO2 is still processing events from the last install; check again
+            self._send_settle_probe()
+            return
+        timing = self._timings[-1]
+        timing.settle_seconds = settle_seconds
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "BulkInstallPanel: %s installed in %.2fs, settled in %.3fs, read-ahead time %.2fs",
+                timing.filename, timing.install_seconds, timing.settle_seconds, timing.read_ahead_seconds,
+            )
+        self._process_next_mod()
 
     def _update_ui_mod_starting(self, mod: DownloadEntry):
-        row = self._mod_to_row.get(mod)
+        row = self._mod_to_row.get(mod.entry_id)
         if row is not None:
             display_name = mod.name if mod.name else mod.filename
             item = self._list_widget.item(row)
@@ -191,7 +347,7 @@ class BulkInstallPanel(QtWidgets.QWidget):
         self._current_mod_label.setText(f"Current: {mod.filename}")
 
     def _update_ui_mod_completed(self, mod: DownloadEntry, success: bool):
-        row = self._mod_to_row.get(mod)
+        row = self._mod_to_row.get(mod.entry_id)
         if row is not None:
             display_name = mod.name if mod.name else mod.filename
             status = self.STATUS_SUCCESS if success else self.STATUS_FAILED
@@ -204,11 +360,16 @@ class BulkInstallPanel(QtWidgets.QWidget):
                     self._success_count, self._fail_count, self._skipped_count)
         self._is_finished = True
         self._is_running = False
+        self._prefetch_token.cancel()
+        if self._journal is not None:
+            # Finished or deliberately cancelled: nothing to resume
+            self._journal.finish()
+            self._journal = None
         self._cancel_button.hide()
         self._close_button.show()
 
         for mod in self._mods:
-            row = self._mod_to_row.get(mod)
+            row = self._mod_to_row.get(mod.entry_id)
             if row is not None:
                 item = self._list_widget.item(row)
                 if item and item.text().startswith(self.STATUS_PENDING):
@@ -227,17 +388,49 @@ class BulkInstallPanel(QtWidgets.QWidget):
             summary_parts.append(f"{self._skipped_count} skipped")
 
         if summary_parts:
-            self._summary_label.setText("Result: " + ", ".join(summary_parts))
+            summary = "Result: " + ", ".join(summary_parts)
+            throughput = self.throughput_summary()
+            if throughput:
+                summary += f"\n{throughput}"
+            self._summary_label.setText(summary)
             self._summary_label.show()
 
         self.installation_finished.emit()
 
+    @property
+    def timings(self) -> List[InstallTiming]:
+        return list(self._timings)
+
+    def throughput_summary(self) -> str:
+        if not self._timings:
+            return ""
+        elapsed = time.perf_counter() - self._started_at
+        installed = [timing for timing in self._timings if timing.success]
+        install_seconds = sum(timing.install_seconds for timing in self._timings)
+        settle_seconds = sum(timing.settle_seconds for timing in self._timings)
+        summary = (
+            f"{len(self._timings)} mods in {elapsed:.1f}s ({len(self._timings) / elapsed * 60:.1f}/min), "
+            f"{install_seconds:.1f}s installing, {settle_seconds:.1f}s settling"
+        )
+        if installed and install_seconds > 0:
+            installed_bytes = sum(timing.file_size for timing in installed)
+            summary += f", {sizeof_fmt(installed_bytes / install_seconds)}/s"
+        read_ahead_seconds = sum(timing.read_ahead_seconds for timing in self._timings)
+        if read_ahead_seconds >= 0.1:
+            summary += f", {read_ahead_seconds:.1f}s read-ahead time"
+        rejected = sum(1 for result in self._prefetch_results.values() if result.error)
+        if rejected:
+            summary += f", {rejected} damaged archive(s) skipped"
+        logger.debug("BulkInstallPanel.throughput_summary: %s", summary)
+        return summary
+
     def _on_cancel_clicked(self):
         if not self._is_finished:
             logger.debug("BulkInstallPanel._on_cancel_clicked: cancel requested")
             self._cancel_button.setEnabled(False)
             self._cancel_button.setText("Cancelling...")
             self._cancelled = True
+            self._prefetch_token.cancel()
 
     def _on_close_clicked(self):
         self._current_mod_label.show()
@@ -0,0 +1,278 @@
+"""
+Scans, reports on and cleans up a downloads folder without MO2 or any Qt
+widgets, through the same model the plugin uses.
+
+    python -m src.cli scan "D:/MO2/downloads" --format csv > downloads.csv
+    python -m src.cli duplicates "D:/MO2/downloads"
+    python -m src.cli verify "D:/MO2/downloads" --md5
+    python -m src.cli delete "D:/MO2/downloads" --select duplicates --dry-run
+
+Run from the repository root. Results stream to stdout as JSON lines or CSV,
+one download per line; the summary goes to stderr. Exit status: 0 when
+nothing was found, 1 when downloads were listed (duplicates, not installed,
+verify problems), 2 for usage errors, 3 when the folder can't be read and 4
+when a delete failed.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple, Union
+
+from .headless import HeadlessOrganizer, ensure_mobase
+
+ensure_mobase()
+
+# pylint:disable=wrong-import-position
+from .archive_prefetch import validate_archive
+from .download_catalog import CATALOG_SETTING
+from .download_entry import DownloadEntry
+from .download_manager_model import DownloadManagerModel
+from .hash_worker import file_md5
+from .io_scheduler import IOScheduler, Priority, device_key
+from .util import sizeof_fmt
+
+EXIT_OK = 0
+EXIT_FOUND = 1
+EXIT_NO_FOLDER = 3
+EXIT_FAILED = 4
+
+ENTRY_FIELDS = (
+    "entry_id", "filename", "name", "modname", "version", "installed", "hidden",
+    "file_size", "filetime", "nexus_mod_id", "nexus_file_id", "path",
+)
+# Tasks queued on the scheduler at once by verify and delete, so results stream as they finish
+MAX_IN_FLIGHT = 64
+
+
+def _entry_record(entry: DownloadEntry) -> Dict[str, object]:
+    return {
+        "entry_id": entry.entry_id,
+        "filename": entry.raw_file_path.name,
+        "name": entry.name,
+        "modname": entry.modname,
+        "version": entry.version,
+        "installed": entry.installed,
+        "hidden": entry.hidden,
+        "file_size": entry.file_size,
+        "filetime": entry.filetime.isoformat(timespec="seconds"),
+        "nexus_mod_id": entry.nexus_mod_id,
+        "nexus_file_id": entry.nexus_file_id,
+        "path": str(entry.raw_file_path),
+    }
+
+
+class RecordWriter:
+    """Writes records to a stream as they arrive, as JSON lines or CSV with a header row."""
+
+    def __init__(self, stream, output_format: str, fields: Tuple[str, ...]):
+        self._stream = stream
+        self._csv = csv.DictWriter(stream, fields, extrasaction="ignore") if output_format == "csv" else None
+        if self._csv is not None:
+            self._csv.writeheader()
+
+    def write(self, record: Dict[str, object]):
+        if self._csv is not None:
+            self._csv.writerow(
+                {key: ";".join(value) if isinstance(value, list) else value for key, value in record.items()}
+            )
+        else:
+            self._stream.write(json.dumps(record) + "\n")
+        self._stream.flush()
+
+
+def _run_parallel(
+    scheduler: IOScheduler, fn: Callable, entries: List[DownloadEntry], priority: Priority
+) -> Iterator[Tuple[DownloadEntry, object]]:
+    """Runs fn(entry) for every entry on the scheduler, yielding (entry, result) as each finishes."""
+    pending = iter(entries)
+    in_flight = {}
+    device = device_key(entries[0].raw_file_path) if entries else "unknown"
+    while True:
+        while len(in_flight) < MAX_IN_FLIGHT:
+            entry = next(pending, None)
+            if entry is None:
+                break
+            in_flight[scheduler.submit(fn, entry, priority=priority, device=device)] = entry
+        if not in_flight:
+            return
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield in_flight.pop(future), future.result()
+
+
+def _sorted(entries: Iterable[DownloadEntry]) -> List[DownloadEntry]:
+    return sorted(entries, key=lambda entry: (entry.raw_file_path.name.lower(), entry.entry_id))
+
+
+def verify_entry(entry: DownloadEntry, with_md5: bool = False) -> Tuple[List[str], Union[str, None]]:
+    """
+    Problems found with one download's archive, and its MD5: missing, a
+    changed size, or whatever the installer's read-ahead check rejects it
+    for (empty, damaged, truncated, not an archive).
+    """
+    path = entry.raw_file_path
+    try:
+        size = path.stat().st_size
+    except FileNotFoundError:
+        return ["missing"], None
+    except OSError as exc:
+        return [f"unreadable: {exc.strerror or exc}"], None
+    problems = []
+    reason = validate_archive(path)
+    if reason is not None:
+        problems.append(reason)
+    if size != entry.file_size:
+        problems.append("size changed")
+    md5 = None
+    if with_md5 and size:
+        try:
+            md5 = file_md5(path)
+        except OSError as exc:
+            problems.append(f"unreadable: {exc.strerror or exc}")
+    return problems, md5
+
+
+def _command_list(model: DownloadManagerModel, args, out) -> int:
+    selections = {
+        "scan": lambda: model.snapshot.entries,
+        "duplicates": model.get_duplicates,
+        "not-installed": model.get_not_installed,
+    }
+    entries = _sorted(selections[args.command]())
+    if args.summary:
+        out.write(json.dumps(model.get_stats()) + "\n")
+    else:
+        writer = RecordWriter(out, args.format, ENTRY_FIELDS)
+        for entry in entries:
+            writer.write(_entry_record(entry))
+    size = sum(entry.file_size for entry in entries)
+    print(f"{args.command}: {len(entries)} downloads, {sizeof_fmt(size)}", file=sys.stderr)
+    if args.command == "scan":
+        return EXIT_OK
+    return EXIT_FOUND if entries else EXIT_OK
+
+
+def _command_verify(model: DownloadManagerModel, args, out) -> int:
+    catalog = model.catalog
+    recorded = catalog.digests() if catalog is not None and args.md5 else {}
+    writer = RecordWriter(out, args.format, ENTRY_FIELDS + ("problems", "md5"))
+    checked = problem_count = 0
+    entries = _sorted(model.snapshot.entries)
+    for entry, (problems, md5) in _run_parallel(
+        model.scheduler, lambda item: verify_entry(item, args.md5), entries, Priority.VERIFICATION
+    ):
+        checked += 1
+        if md5 is not None:
+            if recorded.get(entry.entry_id, md5) != md5:
+                problems.append("digest changed")
+            if catalog is not None:
+                catalog.record_digest(entry.entry_id, md5)
+        if problems:
+            problem_count += 1
+        if problems or args.all:
+            writer.write(dict(_entry_record(entry), problems=problems, md5=md5))
+    print(f"verify: {checked} downloads checked, {problem_count} with problems", file=sys.stderr)
+    return EXIT_FOUND if problem_count else EXIT_OK
+
+
+def _command_delete(model: DownloadManagerModel, args, out) -> int:
+    selections = {"duplicates": model.get_duplicates, "not-installed": model.get_not_installed}
+    entries = _sorted(selections[args.select]())
+    writer = RecordWriter(out, args.format, ENTRY_FIELDS + ("action",))
+    size = sum(entry.file_size for entry in entries)
+    if args.dry_run:
+        for entry in entries:
+            writer.write(dict(_entry_record(entry), action="would delete"))
+        print(f"delete: would delete {len(entries)} downloads, {sizeof_fmt(size)}", file=sys.stderr)
+        return EXIT_FOUND if entries else EXIT_OK
+
+    trash_batch = None
+    if args.trash:
+        try:
+            trash_batch = model.trash.begin_batch()
+        except OSError as exc:
+            print(f"delete: can't create the trash folder: {exc}", file=sys.stderr)
+            return EXIT_FAILED
+    deleted_action = "staged" if trash_batch is not None else "deleted"
+    failed = 0
+    for entry, changes in _run_parallel(
+        model.scheduler, lambda item: model.delete(item, trash_batch), entries, Priority.INTERACTIVE
+    ):
+        model.apply_changes(changes)
+        failed += len(changes.failed)
+        writer.write(dict(_entry_record(entry), action="failed" if changes.failed else deleted_action))
+    if trash_batch is not None:
+        model.trash.commit_batch(trash_batch)
+    print(f"delete: {deleted_action} {len(entries) - failed} downloads, {failed} failed", file=sys.stderr)
+    return EXIT_FAILED if failed else EXIT_OK
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description=__doc__.splitlines()[1])
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("downloads", type=Path, help="the downloads folder to work on")
+    common.add_argument("--format", choices=("json", "csv"), default="json", help="json lines (default) or csv")
+    common.add_argument("--workers", type=int, default=0, help="I/O worker threads (0 = automatic)")
+    common.add_argument(
+        "--device-concurrency", type=int, default=0, help="concurrent file operations per disk (0 = automatic)"
+    )
+    common.add_argument(
+        "--catalog", action="store_true", help="keep the folder's SQLite catalog up to date and query it"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, text in (
+        ("scan", "list every download"),
+        ("duplicates", "list older versions of downloads that have a newer one"),
+        ("not-installed", "list downloads that are newer than anything installed from them"),
+    ):
+        command = commands.add_parser(name, parents=[common], help=text)
+        command.add_argument("--summary", action="store_true", help="print counts and sizes instead of downloads")
+    verify = commands.add_parser("verify", parents=[common], help="check every archive is present and readable")
+    verify.add_argument("--md5", action="store_true", help="also hash every archive (reads all of them)")
+    verify.add_argument("--all", action="store_true", help="list every download, not just those with problems")
+    delete = commands.add_parser("delete", parents=[common], help="delete a selection of downloads")
+    delete.add_argument("--select", choices=("duplicates", "not-installed"), required=True)
+    delete.add_argument("--dry-run", action="store_true", help="only list what would be deleted")
+    delete.add_argument("--trash", action="store_true", help="move downloads to the trash folder so it can be undone")
+    return parser
+
+
+def main(argv=None, out=None) -> int:
+    args = _parser().parse_args(argv)
+    out = out or sys.stdout
+    if not args.downloads.is_dir() or not os.access(args.downloads, os.R_OK | os.X_OK):
+        print(f"{args.downloads}: not a readable folder", file=sys.stderr)
+        return EXIT_NO_FOLDER
+
+    scheduler = IOScheduler(args.workers, args.device_concurrency)
+    organizer = HeadlessOrganizer(args.downloads, {CATALOG_SETTING: args.catalog})
+    model = DownloadManagerModel(organizer, scheduler)
+    try:
+        started = time.perf_counter()
+        model.publish(model.refresh())
+        print(
+            f"scanned {len(model.snapshot.entries)} downloads in {time.perf_counter() - started:.2f} s",
+            file=sys.stderr,
+        )
+        if args.command == "verify":
+            return _command_verify(model, args, out)
+        if args.command == "delete":
+            return _command_delete(model, args, out)
+        return _command_list(model, args, out)
+    except BrokenPipeError:
+        # The reader stopped early (`| head`); keep the interpreter from failing to flush at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return EXIT_OK
+    finally:
+        model.close()
+        scheduler.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import List, Union
+
+from .download_entry import DownloadEntry
+from .download_trash import TrashBatch
+from .io_scheduler import Priority, device_key
+from .util import logger
+
+try:
+    from PyQt6.QtCore import QThread, pyqtSignal
+except ImportError:
+    from PyQt5.QtCore import QThread, pyqtSignal
+
+
+@dataclass
+class DeleteResult:
+    deleted: List[str] = field(default_factory=list)
+    failed: List[DownloadEntry] = field(default_factory=list)
+    cancelled: bool = False
+    trash_batch: Union[TrashBatch, None] = None
+
+
+class DeleteWorker(QThread):
+    """
+    Deletes archives (and their meta files) on the shared I/O scheduler, off
+    the UI thread. Deleted entry ids are reported in batches so the table can drop
+    rows incrementally instead of rescanning the folder afterwards.
+
+    With a trash batch, files are staged into the trash folder instead of
+    being unlinked, and the batch manifest is written once all are moved.
+    """
+
+    progress_updated = pyqtSignal(int, int)
+    entries_deleted = pyqtSignal(list)
+    delete_finished = pyqtSignal(DeleteResult)
+
+    MAX_IN_FLIGHT = 16
+    BATCH_SIZE = 64
+    BATCH_INTERVAL = 0.1
+
+    def __init__(self, model, entries: List[DownloadEntry], trash_batch: Union[TrashBatch, None] = None):
+        super().__init__()
+        self._model = model
+        self._entries = list(entries)
+        self._trash_batch = trash_batch
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        logger.debug("DeleteWorker.cancel: cancellation requested")
+        self._cancel_event.set()
+
+    def run(self):
+        total = len(self._entries)
+        result = DeleteResult(trash_batch=self._trash_batch)
+        pending = iter(self._entries)
+        in_flight = set()
+        batch: List[str] = []
+        last_flush = time.monotonic()
+        done_count = 0
+
+        scheduler = self._model.scheduler
+        device = device_key(self._entries[0].raw_file_path) if self._entries else "unknown"
+        while True:
+            # Keep the queue shallow so cancelling stops promptly
+            while not self._cancel_event.is_set() and len(in_flight) < self.MAX_IN_FLIGHT:
+                entry = next(pending, None)
+                if entry is None:
+                    break
+                in_flight.add(scheduler.submit(self._delete_one, entry, priority=Priority.INTERACTIVE, device=device))
+            if not in_flight:
+                break
+
+            done, in_flight = wait(in_flight, timeout=self.BATCH_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in done:
+                changes = future.result()
+                done_count += 1
+                batch.extend(changes.removed)
+                result.deleted.extend(changes.removed)
+                result.failed.extend(changes.failed)
+
+            now = time.monotonic()
+            if batch and (len(batch) >= self.BATCH_SIZE or now - last_flush >= self.BATCH_INTERVAL):
+                self.entries_deleted.emit(batch)
+                batch = []
+                last_flush = now
+            self.progress_updated.emit(done_count, total)
+
+        if batch:
+            self.entries_deleted.emit(batch)
+        if self._trash_batch is not None:
+            try:
+                self._model.trash.commit_batch(self._trash_batch)
+            except OSError as exc:
+                logger.error("DeleteWorker.run: failed to write trash manifest: %s", exc)
+        result.cancelled = self._cancel_event.is_set() and done_count < total
+        logger.debug(
+            "DeleteWorker.run: deleted=%d failed=%d cancelled=%s",
+            len(result.deleted), len(result.failed), result.cancelled,
+        )
+        self.delete_finished.emit(result)
+
+    def _delete_one(self, entry: DownloadEntry):
+        return self._model.delete(entry, self._trash_batch)
@@ -0,0 +1,325 @@
+import os
+import sqlite3
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterable, List, Tuple, Union
+
+from .download_entry import DownloadEntry
+from .io_scheduler import IOScheduler, Priority, device_key
+from .util import logger
+
+CATALOG_SETTING = "catalog"
+CATALOG_NAME = ".download_manager_catalog.sqlite"
+# Bump when the table layout changes; an older catalog is dropped and rebuilt by the next scan
+SCHEMA_VERSION = 1
+
+# Columns without a declared type keep whatever Python type was stored (the
+# meta file's mod id is a string, the archive size an int), so an entry read
+# back compares equal to the one that was written.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS downloads (
+    entry_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    modname TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    filetime TEXT NOT NULL,
+    filetime_ts REAL NOT NULL,
+    version TEXT NOT NULL,
+    installed INTEGER NOT NULL,
+    hidden INTEGER NOT NULL,
+    raw_file_path TEXT NOT NULL,
+    raw_meta_path TEXT,
+    file_size NOT NULL,
+    nexus_mod_id,
+    nexus_file_id,
+    repository,
+    game_name,
+    group_key TEXT NOT NULL,
+    version_key TEXT NOT NULL,
+    md5 TEXT,
+    synced_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS downloads_group ON downloads (group_key, filetime_ts, version_key);
+CREATE INDEX IF NOT EXISTS downloads_mod_id ON downloads (nexus_mod_id);
+CREATE INDEX IF NOT EXISTS downloads_size ON downloads (file_size);
+CREATE INDEX IF NOT EXISTS downloads_mtime ON downloads (filetime_ts);
+CREATE TABLE IF NOT EXISTS catalog_info (key TEXT PRIMARY KEY, value);
+"""
+
+_ENTRY_COLUMNS = (
+    "entry_id", "name", "modname", "filename", "filetime", "version", "installed", "hidden",
+    "raw_file_path", "raw_meta_path", "file_size", "nexus_mod_id", "nexus_file_id", "repository", "game_name",
+)
+_ROW_COLUMNS = _ENTRY_COLUMNS + ("filetime_ts", "group_key", "version_key", "synced_at")
+# A digest only describes the archive it was computed from, so a changed size or date drops it
+_UPSERT = (
+    f"INSERT INTO downloads ({', '.join(_ROW_COLUMNS)}) VALUES ({', '.join('?' * len(_ROW_COLUMNS))}) "
+    "ON CONFLICT (entry_id) DO UPDATE SET "
+    + ", ".join(f"{column} = excluded.{column}" for column in _ROW_COLUMNS[1:])
+    + ", md5 = CASE WHEN downloads.file_size = excluded.file_size "
+    "AND downloads.filetime_ts = excluded.filetime_ts THEN downloads.md5 END"
+)
+
+# Newest first per group by date, then version; everything after the first row is a duplicate
+_DUPLICATES = """
+SELECT entry_id FROM (
+    SELECT entry_id, ROW_NUMBER() OVER (
+        PARTITION BY group_key ORDER BY filetime_ts DESC, version_key DESC
+    ) AS position
+    FROM downloads
+) WHERE position > 1
+"""
+
+# Not installed, in a group with nothing installed or newer than the newest installed download
+_NOT_INSTALLED = """
+SELECT downloads.entry_id FROM downloads
+LEFT JOIN (
+    SELECT group_key, MAX(filetime_ts) AS newest FROM downloads WHERE installed GROUP BY group_key
+) AS installed_groups ON installed_groups.group_key = downloads.group_key
+WHERE NOT downloads.installed
+AND (installed_groups.newest IS NULL OR downloads.filetime_ts > installed_groups.newest)
+"""
+
+_STATS = """
+SELECT COUNT(*), COALESCE(SUM(file_size), 0), COALESCE(SUM(installed), 0), COALESCE(SUM(hidden), 0),
+    COALESCE(SUM(raw_meta_path IS NULL), 0), COUNT(DISTINCT group_key), COUNT(md5)
+FROM downloads
+"""
+STATS_FIELDS = ("entries", "total_size", "installed", "hidden", "without_meta", "groups", "hashed")
+
+
+def version_sort_key(parts: Tuple) -> str:
+    """
+    Encodes a parsed version tuple as text that sorts the same way: numbers
+    by value (length-prefixed, so 10 sorts after 9), a version after every
+    version it extends. Numbers sort before letters, where comparing the
+    tuples themselves would fail.
+    """
+    encoded = []
+    for part in parts:
+        if isinstance(part, int):
+            digits = str(part)
+            encoded.append(f"0{len(digits):03d}{digits}")
+        else:
+            encoded.append(f"1{part}")
+    return "\x01".join(encoded)
+
+
+class DownloadCatalog:
+    """
+    SQLite mirror of the model's entries, kept in the downloads folder next
+    to the archives it describes. It holds every DownloadEntry field plus
+    each entry's duplicate group key, a sortable version key and the MD5 from
+    its last re-query, indexed so the bulk selections and stats are single
+    queries, and lets the model start from the last scan in one read.
+
+    Writes are queued and built and run in order on the I/O scheduler, so
+    callers never wait on disk or on turning entries into rows; reads first
+    apply whatever is still queued, so callers on the UI thread check
+    pending_writes and skip the catalog while it is behind.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        group_key: Callable[[DownloadEntry], str],
+        version_key: Callable[[str], Tuple],
+        scheduler: IOScheduler,
+    ):
+        self._path = Path(path)
+        self._group_key = group_key
+        self._version_key = version_key
+        self._scheduler = scheduler
+        self._device = device_key(self._path.parent)
+        # Held while the connection is in use; the queue has its own lock so enqueueing never waits on a write
+        self._lock = threading.RLock()
+        self._queue_lock = threading.Lock()
+        self._writes: Deque[Callable[[sqlite3.Connection], None]] = deque()
+        # Queued writes plus the one being applied
+        self._unapplied = 0
+        self._closed = False
+        self._connection = sqlite3.connect(str(self._path), check_same_thread=False, isolation_level=None)
+        try:
+            self._prepare()
+        except sqlite3.Error:
+            self._connection.close()
+            raise
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def _prepare(self):
+        connection = self._connection
+        connection.execute("PRAGMA journal_mode = WAL")
+        # It's a cache of the folder: losing the last write to a crash only costs a rescan
+        connection.execute("PRAGMA synchronous = NORMAL")
+        if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            connection.executescript(
+                "DROP TABLE IF EXISTS downloads; DROP TABLE IF EXISTS catalog_info;"
+                f"PRAGMA user_version = {SCHEMA_VERSION};"
+            )
+        connection.executescript(_SCHEMA)
+
+    @property
+    def pending_writes(self) -> int:
+        """Writes queued or still being applied; queries made now would wait for them."""
+        return self._unapplied
+
+    def close(self):
+        """Applies every queued write, checkpoints the WAL into the database file and closes it."""
+        with self._lock:
+            with self._queue_lock:
+                if self._closed:
+                    return
+                self._closed = True
+            self._flush()
+            try:
+                self._connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            except sqlite3.Error as exc:
+                logger.warning("DownloadCatalog: checkpoint of %s failed: %s", self._path, exc)
+            self._connection.close()
+
+    def _row(self, entry: DownloadEntry, synced_at: float) -> tuple:
+        return (
+            entry.entry_id, entry.name, entry.modname, entry.filename, entry.filetime.isoformat(), entry.version,
+            int(entry.installed), int(entry.hidden), str(entry.raw_file_path),
+            None if entry.raw_meta_path is None else str(entry.raw_meta_path),
+            entry.file_size, entry.nexus_mod_id, entry.nexus_file_id, entry.repository, entry.game_name,
+            entry.filetime.timestamp(), self._group_key(entry), version_sort_key(self._version_key(entry.version)),
+            synced_at,
+        )
+
+    @staticmethod
+    def _entry(row: tuple) -> DownloadEntry:
+        values = dict(zip(_ENTRY_COLUMNS, row))
+        values["filetime"] = datetime.fromisoformat(values["filetime"])
+        values["installed"] = bool(values["installed"])
+        values["hidden"] = bool(values["hidden"])
+        values["raw_file_path"] = Path(values["raw_file_path"])
+        if values["raw_meta_path"] is not None:
+            values["raw_meta_path"] = Path(values["raw_meta_path"])
+        return DownloadEntry(**values)
+
+    def _enqueue(self, write: Callable[[sqlite3.Connection], None]):
+        with self._queue_lock:
+            if self._closed:
+                logger.debug("DownloadCatalog: dropping a write queued after close")
+                return
+            self._writes.append(write)
+            self._unapplied += 1
+        self._scheduler.submit(self._drain, priority=Priority.METADATA, device=self._device)
+
+    def _drain(self):
+        with self._lock:
+            if not self._closed:
+                self._flush()
+
+    def _flush(self):
+        # Called with the lock held; whichever caller gets here first applies every queued write in order
+        while True:
+            with self._queue_lock:
+                if not self._writes:
+                    return
+                write = self._writes.popleft()
+            try:
+                with self._transaction():
+                    write(self._connection)
+            except sqlite3.Error as exc:
+                logger.warning("DownloadCatalog: write to %s failed: %s", self._path, exc)
+            finally:
+                with self._queue_lock:
+                    self._unapplied -= 1
+
+    @contextmanager
+    def _transaction(self):
+        self._connection.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self._connection.execute("ROLLBACK")
+            raise
+        self._connection.execute("COMMIT")
+
+    def replace_all(self, entries: Iterable[DownloadEntry], scanned_at: float):
+        """Queues replacing the catalog's contents with a full scan's entries; digests of unchanged archives are kept."""
+        entries = tuple(entries)
+
+        def write(connection: sqlite3.Connection):
+            connection.executemany(_UPSERT, (self._row(entry, scanned_at) for entry in entries))
+            connection.execute("DELETE FROM downloads WHERE synced_at != ?", (scanned_at,))
+            connection.execute("INSERT OR REPLACE INTO catalog_info VALUES ('scanned_at', ?)", (scanned_at,))
+
+        self._enqueue(write)
+
+    def apply(self, removed: Iterable[str], upserted: Iterable[DownloadEntry], scanned_at: float):
+        """Queues an incremental change, recording when the model's folder state was last checked."""
+        removed = tuple(removed)
+        upserted = tuple(upserted)
+
+        def write(connection: sqlite3.Connection):
+            connection.executemany("DELETE FROM downloads WHERE entry_id = ?", ((entry_id,) for entry_id in removed))
+            connection.executemany(_UPSERT, (self._row(entry, scanned_at) for entry in upserted))
+            connection.execute("INSERT OR REPLACE INTO catalog_info VALUES ('scanned_at', ?)", (scanned_at,))
+
+        self._enqueue(write)
+
+    def record_digest(self, entry_id: str, md5: str):
+        self._enqueue(lambda connection: connection.execute(
+            "UPDATE downloads SET md5 = ? WHERE entry_id = ?", (md5, entry_id)
+        ))
+
+    def _query(self, sql: str, parameters: tuple = ()) -> List[tuple]:
+        with self._lock:
+            self._flush()
+            return self._connection.execute(sql, parameters).fetchall()
+
+    def load(self) -> Tuple[List[DownloadEntry], float]:
+        """Every entry in one query, plus when the scan they came from started (0 if there never was one)."""
+        scanned = self._query("SELECT value FROM catalog_info WHERE key = 'scanned_at'")
+        rows = self._query(f"SELECT {', '.join(_ENTRY_COLUMNS)} FROM downloads")
+        return [self._entry(row) for row in rows], (scanned[0][0] if scanned else 0.0)
+
+    def duplicate_ids(self) -> List[str]:
+        return [row[0] for row in self._query(_DUPLICATES)]
+
+    def not_installed_ids(self) -> List[str]:
+        return [row[0] for row in self._query(_NOT_INSTALLED)]
+
+    def stats(self) -> Dict[str, float]:
+        return dict(zip(STATS_FIELDS, self._query(_STATS)[0]))
+
+    def digests(self) -> Dict[str, str]:
+        return dict(self._query("SELECT entry_id, md5 FROM downloads WHERE md5 IS NOT NULL"))
+
+
+def open_catalog(
+    downloads_path: Union[str, Path],
+    group_key: Callable[[DownloadEntry], str],
+    version_key: Callable[[str], Tuple],
+    scheduler: IOScheduler,
+) -> Union[DownloadCatalog, None]:
+    """
+    Opens (or creates) the downloads folder's catalog. One that can't be read
+    is deleted and rebuilt, since the folder itself is the source of truth;
+    returns None if even that fails, and the model runs without a catalog.
+    """
+    path = Path(downloads_path) / CATALOG_NAME
+    for attempt in range(2):
+        try:
+            return DownloadCatalog(path, group_key, version_key, scheduler)
+        except sqlite3.Error as exc:
+            logger.warning("open_catalog: can't use %s: %s", path, exc)
+            if attempt or not isinstance(exc, sqlite3.DatabaseError):
+                return None
+            for suffix in ("", "-wal", "-shm"):
+                try:
+                    os.remove(f"{path}{suffix}")
+                except FileNotFoundError:
+                    pass
+                except OSError:
+                    return None
+    return None
@@ -1,4 +1,6 @@
-﻿from dataclasses import dataclass
+﻿import hashlib
+import os
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 from typing import Union
@@ -6,7 +8,17 @@ from typing import Union
 from .util import DictMixin
 
 
-@dataclass(frozen=True)
+def make_entry_id(archive_path: Path, stat_result: os.stat_result) -> str:
+    """
+    Stable identity for a download: its normalized path plus the file's device
+    and inode (where the platform reports them). Metadata edits don't change
+    it, so selections and queues keep pointing at the same archive.
+    """
+    identity = f"{os.path.normcase(str(archive_path))}|{stat_result.st_dev}|{stat_result.st_ino}"
+    return hashlib.blake2b(identity.encode("utf-8"), digest_size=8).hexdigest()
+
+
+@dataclass(frozen=True, eq=False)
 class DownloadEntry(DictMixin):
     name: str
     modname: str
@@ -21,4 +33,15 @@ class DownloadEntry(DictMixin):
     nexus_mod_id: Union[int, None]
     nexus_file_id: Union[int, None]
     repository: Union[str, None]
-    game_name: Union[str, None]
\ No newline at end of file
+    game_name: Union[str, None]
+    entry_id: str
+
+    # Entries are compared and hashed by identity only, so sets and dict lookups
+    # stay O(1) and an entry with refreshed metadata still matches its old self.
+    def __eq__(self, other):
+        if not isinstance(other, DownloadEntry):
+            return NotImplemented
+        return self.entry_id == other.entry_id
+
+    def __hash__(self):
+        return hash(self.entry_id)
@@ -0,0 +1,260 @@
+from datetime import datetime
+from enum import IntEnum
+from typing import Callable, Dict, List, Union
+
+try:
+    import PyQt6.QtCore as QtCore
+    from PyQt6.QtCore import Qt, QModelIndex
+except ImportError:
+    import PyQt5.QtCore as QtCore
+    from PyQt5.QtCore import Qt, QModelIndex
+
+from .download_entry import DownloadEntry
+from .download_manager_model import DownloadManagerModel, _parse_version_tuple
+from .mo2_compat_utils import CHECKED_STATE
+from .ui_statics import bool_emoji, value_or_no
+from .util import sizeof_fmt
+
+
+class GroupColumn(IntEnum):
+    NAME = 0
+    FILENAME = 1
+    VERSION = 2
+    DATE = 3
+    SIZE = 4
+    INSTALLED = 5
+
+
+class GroupBy(IntEnum):
+    DUPLICATE_KEY = 0
+    MOD_ID = 1
+
+
+# internalId of top-level (group) indexes; children store their group row + 1
+_GROUP_ID = 0
+
+
+def _mod_id_group_key(entry: DownloadEntry) -> str:
+    if entry.nexus_mod_id:
+        return f"{entry.repository or 'Nexus'} #{entry.nexus_mod_id}"
+    return "No mod ID"
+
+
+class DownloadGroup:
+    """Aggregates for one group. Child rows are only sorted and stored once expanded."""
+
+    __slots__ = ("key", "label", "entries", "children", "total_size", "newest_version", "_newest_version_key",
+                 "newest_time", "any_installed")
+
+    def __init__(self, key: str):
+        self.key = key
+        self.label = key
+        self.entries: List[DownloadEntry] = []
+        self.children: Union[List[DownloadEntry], None] = None
+        self.total_size = 0
+        self.newest_version = ""
+        self._newest_version_key = ()
+        self.newest_time: Union[datetime, None] = None
+        self.any_installed = False
+
+    def add(self, entry: DownloadEntry):
+        if not self.entries and entry.name:
+            self.label = entry.name
+        self.entries.append(entry)
+        self.total_size += entry.file_size or 0
+        self.any_installed = self.any_installed or entry.installed
+        if self.newest_time is None or entry.filetime > self.newest_time:
+            self.newest_time = entry.filetime
+        if entry.version:
+            version_key = _parse_version_tuple(entry.version)
+            try:
+                is_newer = version_key > self._newest_version_key
+            except TypeError:
+                # Mixed numeric/text parts ("1.a" vs "1.2") don't order; compare as text
+                is_newer = str(version_key) > str(self._newest_version_key)
+            if is_newer:
+                self.newest_version = entry.version
+                self._newest_version_key = version_key
+
+    def materialize(self) -> List[DownloadEntry]:
+        if self.children is None:
+            self.children = sorted(
+                self.entries,
+                key=lambda item: (item.filetime.timestamp(), _parse_version_tuple(item.version)),
+                reverse=True,
+            )
+        return self.children
+
+
+class DownloadGroupModel(QtCore.QAbstractItemModel):
+    """
+    Tree of downloads grouped by duplicate key or Nexus mod id. Grouping and
+    aggregates are computed in one pass; child rows are created through
+    canFetchMore/fetchMore only when a group is expanded, so large folders
+    with thousands of groups stay cheap to build, expand and collapse.
+    """
+
+    _header = ("Name", "Filename / Count", "Version", "Date", "Size", "Installed?")
+
+    def __init__(self, table_model, parent=None):
+        super().__init__(parent)
+        # The flat table model owns the checkbox selection; this view reflects and edits it
+        self._table_model = table_model
+        self._groups: List[DownloadGroup] = []
+        self._group_by = GroupBy.DUPLICATE_KEY
+
+    def set_entries(self, entries: List[DownloadEntry], group_by: GroupBy):
+        key_fn: Callable[[DownloadEntry], str] = (
+            _mod_id_group_key if group_by == GroupBy.MOD_ID else DownloadManagerModel._duplicate_group_key
+        )
+        groups: Dict[str, DownloadGroup] = {}
+        for entry in entries:
+            key = key_fn(entry)
+            group = groups.get(key)
+            if group is None:
+                group = DownloadGroup(key)
+                groups[key] = group
+            group.add(entry)
+
+        self.beginResetModel()
+        self._group_by = group_by
+        # Biggest groups first; those are the ones worth reviewing
+        self._groups = sorted(groups.values(), key=lambda group: (-len(group.entries), group.label.lower()))
+        self.endResetModel()
+
+    @property
+    def group_by(self) -> GroupBy:
+        return self._group_by
+
+    def group_count(self) -> int:
+        return len(self._groups)
+
+    # region QAbstractItemModel
+    def index(self, row, column, parent=QModelIndex()):
+        if not parent.isValid():
+            if 0 <= row < len(self._groups):
+                return self.createIndex(row, column, _GROUP_ID)
+            return QModelIndex()
+        group = self._groups[parent.row()]
+        if group.children is None or not 0 <= row < len(group.children):
+            return QModelIndex()
+        return self.createIndex(row, column, parent.row() + 1)
+
+    def parent(self, index=QModelIndex()):
+        if not index.isValid() or index.internalId() == _GROUP_ID:
+            return QModelIndex()
+        return self.createIndex(index.internalId() - 1, 0, _GROUP_ID)
+
+    def rowCount(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return len(self._groups)
+        if parent.internalId() != _GROUP_ID or parent.column() != 0:
+            return 0
+        children = self._groups[parent.row()].children
+        return len(children) if children is not None else 0
+
+    def columnCount(self, _parent=QModelIndex()):
+        return len(self._header)
+
+    def hasChildren(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return bool(self._groups)
+        return parent.internalId() == _GROUP_ID and parent.column() == 0
+
+    def canFetchMore(self, parent):
+        if not parent.isValid() or parent.internalId() != _GROUP_ID:
+            return False
+        return self._groups[parent.row()].children is None
+
+    def fetchMore(self, parent):
+        if not self.canFetchMore(parent):
+            return
+        group = self._groups[parent.row()]
+        self.beginInsertRows(parent, 0, len(group.entries) - 1)
+        group.materialize()
+        self.endInsertRows()
+
+    def headerData(self, section, orientation, role=...):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self._header[section]
+        return None
+
+    def flags(self, index: QModelIndex):
+        if not index.isValid():
+            # pylint:disable=no-member
+            return Qt.ItemFlag.NoItemFlags
+        flags = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+        if index.column() == GroupColumn.NAME:
+            flags |= Qt.ItemFlag.ItemIsUserCheckable
+        return flags
+
+    def data(self, index: QModelIndex, role=...):
+        if not index.isValid():
+            return None
+        if index.internalId() == _GROUP_ID:
+            return self._group_data(self._groups[index.row()], index.column(), role)
+        entry = self._groups[index.internalId() - 1].children[index.row()]
+        return self._entry_data(entry, index.column(), role)
+
+    def setData(self, index: QModelIndex, value, role=...):
+        if role != Qt.ItemDataRole.CheckStateRole or index.column() != GroupColumn.NAME:
+            return False
+        selected = value == CHECKED_STATE
+        roles = [Qt.ItemDataRole.CheckStateRole]
+        if index.internalId() == _GROUP_ID:
+            self._table_model.set_entries_selected(self._groups[index.row()].entries, selected)
+        else:
+            entry = self._groups[index.internalId() - 1].children[index.row()]
+            self._table_model.set_entries_selected([entry], selected)
+            # The group's tri-state check depends on its children
+            parent = self.parent(index)
+            self.dataChanged.emit(parent, parent, roles)
+        self.dataChanged.emit(index, index, roles)
+        return True
+
+    # endregion
+
+    def _group_data(self, group: DownloadGroup, column: int, role):
+        if role == Qt.ItemDataRole.CheckStateRole and column == GroupColumn.NAME:
+            is_selected = self._table_model.is_selected
+            selected_count = sum(1 for entry in group.entries if is_selected(entry))
+            if selected_count == 0:
+                return Qt.CheckState.Unchecked
+            if selected_count == len(group.entries):
+                return Qt.CheckState.Checked
+            return Qt.CheckState.PartiallyChecked
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if column == GroupColumn.NAME:
+            return group.label
+        if column == GroupColumn.FILENAME:
+            return f"{len(group.entries)} files"
+        if column == GroupColumn.VERSION:
+            return value_or_no(group.newest_version)
+        if column == GroupColumn.DATE:
+            return group.newest_time.strftime("%Y-%m-%d %H:%M:%S") if group.newest_time else None
+        if column == GroupColumn.SIZE:
+            return sizeof_fmt(group.total_size)
+        if column == GroupColumn.INSTALLED:
+            return bool_emoji(group.any_installed)
+        return None
+
+    def _entry_data(self, entry: DownloadEntry, column: int, role):
+        if role == Qt.ItemDataRole.CheckStateRole and column == GroupColumn.NAME:
+            selected = self._table_model.is_selected(entry)
+            return Qt.CheckState.Checked if selected else Qt.CheckState.Unchecked
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if column == GroupColumn.NAME:
+            return value_or_no(entry.name)
+        if column == GroupColumn.FILENAME:
+            return entry.filename
+        if column == GroupColumn.VERSION:
+            return value_or_no(entry.version)
+        if column == GroupColumn.DATE:
+            return entry.filetime.strftime("%Y-%m-%d %H:%M:%S")
+        if column == GroupColumn.SIZE:
+            return sizeof_fmt(entry.file_size)
+        if column == GroupColumn.INSTALLED:
+            return bool_emoji(entry.installed)
+        return None
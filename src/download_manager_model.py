@@ -1,48 +1,99 @@
+import itertools
 import json
+import logging
 import os
+import threading
+import time
 from collections import defaultdict
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, Future, wait
 from configparser import ConfigParser
-from dataclasses import asdict
+from dataclasses import asdict, astuple, dataclass, field, replace
 from datetime import datetime
 from pathlib import Path
-from typing import List, Set, Tuple
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Set, Tuple, Union
 
 import mobase
 
-from .download_entry import DownloadEntry
+from .download_catalog import CATALOG_SETTING, STATS_FIELDS, DownloadCatalog, open_catalog
+from .download_entry import DownloadEntry, make_entry_id
+from .download_trash import DownloadTrash, TrashBatch
+from .instrumentation import PHASE_ENTRY_BUILD, PHASE_META_PARSE, PHASE_SCANDIR, PhaseTimer
+from .io_scheduler import NETWORK_DEVICE, IOScheduler, Priority, device_key, shared_scheduler
+from .meta_writer import MetaUpdate, MetaWriter, build_meta_updates
 from .mo2_compat_utils import is_above_2_4
 from .nexus_api import NexusApi, NexusMD5Response
-from .util import logger
+from .util import CancellationToken, logger
 
 try:
-    from PyQt6.QtCore import QSettings, QDateTime, QVariant
+    from PyQt6.QtCore import Qt, QDateTime
 except ImportError:
-    from PyQt5.QtCore import QSettings, QDateTime, QVariant
+    from PyQt5.QtCore import Qt, QDateTime
 
 
-def _hide_download(item: DownloadEntry) -> bool:
-    if item.raw_meta_path is None:
-        logger.warning("Cannot hide %s: no meta file path", item.filename)
-        return False
-    if not item.raw_meta_path.exists():
-        logger.warning("Cannot hide %s: meta file does not exist at %s", item.filename, item.raw_meta_path)
-        return False
-    try:
-        file_settings = QSettings(str(item.raw_meta_path), QSettings.Format.IniFormat)
-        file_settings.beginGroup("General")
-        file_settings.setValue("removed", "true")
-        file_settings.endGroup()
-        file_settings.sync()
-        return True
-    except Exception as exc:
-        logger.error("Failed to hide %s: %s", item.filename, exc)
-        return False
+@dataclass
+class EntryChanges:
+    """
+    What a mutating model operation did to the entry list. Operations only
+    compute this; apply_changes (on the UI thread) makes it take effect, so
+    the table can mirror it row by row instead of rescanning the folder.
+    """
+
+    updated: List[DownloadEntry] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    added: List[DownloadEntry] = field(default_factory=list)
+    failed: List[DownloadEntry] = field(default_factory=list)
+    # Set by revalidate(): when its folder scan started, which the snapshot only adopts once the changes are applied
+    scanned_at: float = 0.0
+
+    def merge(self, other: "EntryChanges") -> "EntryChanges":
+        self.updated.extend(other.updated)
+        self.removed.extend(other.removed)
+        self.added.extend(other.added)
+        self.failed.extend(other.failed)
+        self.scanned_at = max(self.scanned_at, other.scanned_at)
+        return self
+
+    def is_empty(self) -> bool:
+        return not (self.updated or self.removed or self.added)
 
 
-def _determine_worker_count() -> int:
-    cpu_count = os.cpu_count() or 1
-    return min(32, max(4, cpu_count * 4))
+@dataclass(frozen=True)
+class DownloadSnapshot:
+    """
+    One immutable generation of the entry list. Changes and refreshes build a
+    new snapshot and publish it with a single reference swap, so readers on
+    any thread only ever see a complete list and never need a lock.
+    scanned_at is the wall time the folder scan it came from started, and
+    from_catalog marks one read back from the catalog, which publishing
+    doesn't need to write again.
+    """
+
+    generation: int
+    entries: Tuple[DownloadEntry, ...] = field(repr=False)
+    rows: Mapping[str, int] = field(repr=False)
+    scanned_at: float = 0.0
+    from_catalog: bool = False
+
+    @classmethod
+    def build(
+        cls, generation: int, entries, scanned_at: float = 0.0, from_catalog: bool = False
+    ) -> "DownloadSnapshot":
+        entries = tuple(entries)
+        rows = MappingProxyType({entry.entry_id: row for row, entry in enumerate(entries)})
+        return cls(generation, entries, rows, scanned_at, from_catalog)
+
+    def get(self, entry_id: str) -> Union[DownloadEntry, None]:
+        row = self.rows.get(entry_id)
+        return self.entries[row] if row is not None else None
+
+    def with_changes(self, generation: int, changes: EntryChanges) -> "DownloadSnapshot":
+        removed = set(changes.removed)
+        updated = {entry.entry_id: entry for entry in changes.updated}
+        entries = [updated.get(entry.entry_id, entry) for entry in self.entries if entry.entry_id not in removed]
+        known = {entry.entry_id for entry in entries}
+        entries.extend(entry for entry in changes.added if entry.entry_id not in known)
+        return DownloadSnapshot.build(generation, entries, max(self.scanned_at, changes.scanned_at))
 
 
 def _to_bool(value) -> bool:
@@ -108,12 +159,16 @@ def _load_meta_file(meta_path: Path):
     return dict(section)
 
 
-def _file_path_to_download_entry(archive_path: Path, stat_result: os.stat_result):
+def _file_path_to_download_entry(archive_path: Path, stat_result: os.stat_result, entry_id: str = None):
     meta_path = archive_path.with_name(f"{archive_path.name}.meta")
-    meta_values = _load_meta_file(meta_path)
+    return _entry_from_meta(archive_path, stat_result, meta_path, _load_meta_file(meta_path), entry_id)
+
+
+def _entry_from_meta(archive_path: Path, stat_result: os.stat_result, meta_path: Path, meta_values, entry_id: str = None):
+    entry_id = entry_id or make_entry_id(archive_path, stat_result)
 
     if not meta_values:
-        return _file_path_to_stub(archive_path, stat_result)
+        return _file_path_to_stub(archive_path, stat_result, entry_id)
 
     return DownloadEntry(
         name=meta_values.get("name", archive_path.stem),
@@ -130,10 +185,11 @@ def _file_path_to_download_entry(archive_path: Path, stat_result: os.stat_result
         nexus_mod_id=meta_values.get("modID"),
         repository=meta_values.get("repository"),
         game_name=meta_values.get("gameName"),
+        entry_id=entry_id,
     )
 
 
-def _file_path_to_stub(archive_path: Path, stat_result: os.stat_result):
+def _file_path_to_stub(archive_path: Path, stat_result: os.stat_result, entry_id: str):
     return DownloadEntry(
         name="",
         modname="",
@@ -149,46 +205,240 @@ def _file_path_to_stub(archive_path: Path, stat_result: os.stat_result):
         nexus_mod_id=None,
         repository=None,
         game_name=None,
+        entry_id=entry_id,
     )
 
 
-def _process_file(file_info: Tuple[Path, os.stat_result]):
-    try:
-        archive_path, stat_result = file_info
-        return _file_path_to_download_entry(archive_path, stat_result)
-    except Exception as e:
-        logger.error(f"Error processing file {file_info[0]}: {e}")
-        return None
+def _process_batch(
+    batch: List[Tuple[Path, os.stat_result]], token: CancellationToken, timer: Union[PhaseTimer, None] = None
+) -> List[DownloadEntry]:
+    entries = []
+    parse_seconds = build_seconds = 0.0
+    for archive_path, stat_result in batch:
+        if token.cancelled:
+            break
+        started = time.perf_counter()
+        try:
+            meta_path = archive_path.with_name(f"{archive_path.name}.meta")
+            meta_values = _load_meta_file(meta_path)
+            parsed = time.perf_counter()
+            entry = _entry_from_meta(archive_path, stat_result, meta_path, meta_values)
+        except Exception as e:
+            logger.error(f"Error processing file {archive_path}: {e}")
+            parsed, entry = started, None
+        parse_seconds += parsed - started
+        build_seconds += time.perf_counter() - parsed
+        if entry:
+            entries.append(entry)
+        else:
+            logger.info("Entry broken. Should not happen.")
+    if timer is not None:
+        # Once per batch, so workers don't contend on the timer per file
+        timer.add(PHASE_META_PARSE, parse_seconds)
+        timer.add(PHASE_ENTRY_BUILD, build_seconds)
+        timer.count("files", len(entries))
+    return entries
+
+
+# Files parsed per executor task; also how often a refresh checks for cancellation
+REFRESH_BATCH_SIZE = 64
+# Meta files modified this close to (or after) the last scan are re-read on revalidation;
+# covers filesystems with coarse timestamps
+MTIME_SLACK_SECONDS = 2.0
 
 
 class DownloadManagerModel:
     __organizer: mobase.IOrganizer
-    __data: List[DownloadEntry]
-    __data_no_installed: List[DownloadEntry]
+    __snapshot: DownloadSnapshot
 
-    def __init__(self, organizer: mobase.IOrganizer):
+    def __init__(self, organizer: mobase.IOrganizer, scheduler: Union[IOScheduler, None] = None):
         self.__organizer = organizer
-        self.__data = []
-        self.__data_no_installed = []
-        self._executor = ThreadPoolExecutor(max_workers=_determine_worker_count())
-
-    def refresh(self):
-        files: List[Tuple[Path, os.stat_result]] = self._collect_archive_files()
-        self._read_meta_files(files)
-        self.__data_no_installed = [d for d in self.__data if not d.installed]
-
-    def _read_meta_files(self, files: List[Tuple[Path, os.stat_result]]):
-        self.__data = []
-        futures = [self._executor.submit(_process_file, file_info) for file_info in files]
-
-        for future in as_completed(futures):
-            entry = future.result()
-            if entry:
-                self.__data.append(entry)
+        self.__generations = itertools.count(1)
+        self.__snapshot = DownloadSnapshot.build(0, ())
+        # Serialises publishers only; readers just take the current reference
+        self.__publish_lock = threading.Lock()
+        self._scheduler = scheduler or shared_scheduler()
+        self._meta_writer = None
+        self._catalog: Union[DownloadCatalog, None] = None
+        if organizer.pluginSetting("Download Manager", CATALOG_SETTING):
+            self._catalog = open_catalog(
+                organizer.downloadsPath(), self._duplicate_group_key, _parse_version_tuple, self._scheduler
+            )
+
+    @property
+    def catalog(self) -> Union[DownloadCatalog, None]:
+        return self._catalog
+
+    def load_catalog(self) -> Union[DownloadSnapshot, None]:
+        """
+        Builds a snapshot of the catalog's entries from the last scan, in one
+        query and without touching the archives, for publish(); revalidate()
+        then brings it up to date. Returns None when there is no catalog or it
+        was never filled by a scan.
+        """
+        if self._catalog is None:
+            return None
+        entries, scanned_at = self._catalog.load()
+        if not scanned_at:
+            return None
+        snapshot = DownloadSnapshot.build(next(self.__generations), entries, scanned_at, from_catalog=True)
+        logger.debug("model.load_catalog: %d entries from the scan at %.0f", len(entries), scanned_at)
+        return snapshot
+
+    def refresh(
+        self,
+        token: Union[CancellationToken, None] = None,
+        timer: Union[PhaseTimer, None] = None,
+        priority: Priority = Priority.INTERACTIVE,
+        max_in_flight: int = 0,
+    ) -> Union[DownloadSnapshot, None]:
+        """
+        Rescans the downloads folder and returns the result as a new snapshot,
+        which the caller hands to publish() on the thread that owns the view;
+        the current snapshot is left untouched. If the token is cancelled part
+        way, the scan stops at the next batch, queued parse tasks are
+        cancelled and None is returned.
+
+        Phase timings go to `timer` when given, so the caller can add its own
+        phases before finishing it; otherwise the refresh records its own.
+        Background scans pass a low priority and a small max_in_flight
+        (parse batches queued at once; 0 = all) to keep their I/O throttled.
+        """
+        token = token or CancellationToken()
+        own_timer = timer is None
+        timer = timer or PhaseTimer("refresh")
+        scanned_at = time.time()
+        with timer.phase(PHASE_SCANDIR):
+            files: List[Tuple[Path, os.stat_result]] = self._collect_archive_files(token)
+        data = self._read_meta_files(files, token, timer, priority, max_in_flight)
+        if data is None or token.cancelled:
+            logger.debug("model.refresh: cancelled")
+            return None
+        snapshot = DownloadSnapshot.build(next(self.__generations), data, scanned_at)
+        if own_timer:
+            timer.finish()
+        return snapshot
+
+    def publish(self, snapshot: DownloadSnapshot, token: Union[CancellationToken, None] = None) -> bool:
+        """
+        Makes a snapshot from refresh() or load_catalog() the current one and
+        syncs the catalog with it. Skipped, returning False, when the token
+        was cancelled first (a background scan that was superseded).
+        """
+        with self.__publish_lock:
+            if token is not None and token.cancelled:
+                return False
+            if snapshot is self.__snapshot:
+                return True
+            self.__snapshot = snapshot
+            if self._catalog is not None and not snapshot.from_catalog:
+                self._catalog.replace_all(snapshot.entries, snapshot.scanned_at)
+        return True
+
+    def revalidate(self, token: Union[CancellationToken, None] = None) -> Union[EntryChanges, None]:
+        """
+        Checks the current snapshot against the downloads folder without
+        re-reading what hasn't changed: one directory scan finds new and
+        removed archives, archives whose size or date changed and meta files
+        written since the last scan, and only those are parsed again. Returns
+        the changes for apply_changes, or None if the token was cancelled.
+        """
+        token = token or CancellationToken()
+        scanned_at = time.time()
+        snapshot = self.__snapshot
+        meta_mtimes: Dict[str, float] = {}
+        files = self._collect_archive_files(token, meta_mtimes)
+        if token.cancelled:
+            return None
+
+        since = snapshot.scanned_at - MTIME_SLACK_SECONDS
+        seen: Set[str] = set()
+        stale: List[Tuple[Path, os.stat_result]] = []
+        by_path = {os.path.normcase(str(entry.raw_file_path)): entry for entry in snapshot.entries}
+        for archive_path, stat_result in files:
+            key = os.path.normcase(str(archive_path))
+            seen.add(key)
+            entry = by_path.get(key)
+            meta_mtime = meta_mtimes.get(key)
+            if (
+                entry is None
+                or entry.file_size != stat_result.st_size
+                or abs(entry.filetime.timestamp() - stat_result.st_mtime) > 1e-3
+                or (entry.raw_meta_path is None) != (meta_mtime is None)
+                or (meta_mtime is not None and meta_mtime >= since)
+            ):
+                stale.append((archive_path, stat_result))
+
+        parsed = self._read_meta_files(stale, token, priority=Priority.INTERACTIVE)
+        if parsed is None or token.cancelled:
+            return None
+        changes = EntryChanges(
+            removed=[entry.entry_id for key, entry in by_path.items() if key not in seen], scanned_at=scanned_at
+        )
+        for entry in parsed:
+            previous = by_path.get(os.path.normcase(str(entry.raw_file_path)))
+            if previous is None:
+                changes.added.append(entry)
+            elif previous.entry_id == entry.entry_id:
+                if astuple(previous) != astuple(entry):
+                    changes.updated.append(entry)
             else:
-                logger.info("Entry broken. Should not happen.")
+                # Same name, different file (replaced by a new download)
+                changes.removed.append(previous.entry_id)
+                changes.added.append(entry)
+        logger.debug(
+            "model.revalidate: %d archives, %d re-read, %d added, %d removed",
+            len(files), len(stale), len(changes.added), len(changes.removed),
+        )
+        return changes
 
-    def _collect_archive_files(self) -> List[Tuple[Path, os.stat_result]]:
+    @property
+    def snapshot(self) -> DownloadSnapshot:
+        return self.__snapshot
+
+    def get(self, entry_id: str) -> Union[DownloadEntry, None]:
+        return self.__snapshot.get(entry_id)
+
+    def _read_meta_files(
+        self,
+        files: List[Tuple[Path, os.stat_result]],
+        token: CancellationToken,
+        timer: Union[PhaseTimer, None] = None,
+        priority: Priority = Priority.INTERACTIVE,
+        max_in_flight: int = 0,
+    ) -> Union[List[DownloadEntry], None]:
+        if token.cancelled:
+            return None
+        device = device_key(self.__organizer.downloadsPath())
+        batches = iter(range(0, len(files), REFRESH_BATCH_SIZE))
+        limit = max_in_flight or len(files)
+        in_flight = set()
+        data: List[DownloadEntry] = []
+        while True:
+            for start in itertools.islice(batches, max(0, limit - len(in_flight))):
+                in_flight.add(self._scheduler.submit(
+                    _process_batch, files[start:start + REFRESH_BATCH_SIZE], token, timer,
+                    priority=priority, device=device, token=token,
+                ))
+            if not in_flight:
+                return data
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            if token.cancelled:
+                # Queued batches never start; running ones stop at their next file
+                for pending in in_flight:
+                    pending.cancel()
+                return None
+            for future in done:
+                data.extend(future.result())
+
+    def _collect_archive_files(
+        self, token: CancellationToken, meta_mtimes: Union[Dict[str, float], None] = None
+    ) -> List[Tuple[Path, os.stat_result]]:
+        """
+        Archives in the downloads folder with their stat results. When
+        meta_mtimes is given it is filled with each .meta file's mtime, keyed
+        by the normcased path of its archive; the scan sees them anyway.
+        """
         directory_path = Path(self.__organizer.downloadsPath())
         if not directory_path.exists():
             return []
@@ -199,10 +449,18 @@ class DownloadManagerModel:
         try:
             with os.scandir(directory_path) as iterator:
                 for entry in iterator:
+                    if token.cancelled:
+                        return []
                     if not entry.is_file():
                         continue
 
                     lower_name = entry.name.lower()
+                    if meta_mtimes is not None and lower_name.endswith(".meta"):
+                        try:
+                            meta_mtimes[os.path.normcase(entry.path[:-len(".meta")])] = entry.stat().st_mtime
+                        except FileNotFoundError:
+                            pass
+                        continue
                     if not lower_name.endswith(valid_suffixes):
                         continue
 
@@ -230,11 +488,27 @@ class DownloadManagerModel:
             return entry.raw_file_path.stem.lower()
         return entry.filename.lower()
 
+    def _catalog_current(self) -> bool:
+        """Whether the catalog can answer a query now; while writes are queued it would block on them."""
+        return self._catalog is not None and not self._catalog.pending_writes
+
+    def close(self):
+        """Applies the catalog's queued writes and closes it; called once when MO2 exits."""
+        if self._catalog is not None:
+            self._catalog.close()
+            self._catalog = None
+
+    def _from_catalog(self, entry_ids: List[str]) -> Set[DownloadEntry]:
+        snapshot = self.__snapshot
+        return {entry for entry in map(snapshot.get, entry_ids) if entry is not None}
+
     def get_duplicates(self):
+        if self._catalog_current():
+            return self._from_catalog(self._catalog.duplicate_ids())
         duplicates: Set[DownloadEntry] = set()
         grouped_by_key = defaultdict(list)
 
-        for entry in self.__data:
+        for entry in self.__snapshot.entries:
             key = self._duplicate_group_key(entry)
             grouped_by_key[key].append(entry)
 
@@ -258,10 +532,12 @@ class DownloadManagerModel:
         return duplicates
 
     def get_not_installed(self) -> Set[DownloadEntry]:
+        if self._catalog_current():
+            return self._from_catalog(self._catalog.not_installed_ids())
         not_installed: Set[DownloadEntry] = set()
         grouped_by_key = defaultdict(list)
 
-        for entry in self.__data:
+        for entry in self.__snapshot.entries:
             key = self._duplicate_group_key(entry)
             grouped_by_key[key].append(entry)
 
@@ -286,129 +562,274 @@ class DownloadManagerModel:
 
         return not_installed
 
-    def delete(self, item: DownloadEntry) -> bool:
-        logger.debug("model.delete: looking for item %s", item.filename)
-        file_to_delete = next((d for d in self.__data if d == item), None)
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Entry count, total size and how many are installed, hidden, without
+        meta, in distinct groups and hashed. With a catalog this waits for its
+        queued writes, since only the catalog knows the digests.
+        """
+        if self._catalog is not None:
+            return self._catalog.stats()
+        entries = self.__snapshot.entries
+        values = (
+            len(entries),
+            sum(entry.file_size for entry in entries),
+            sum(1 for entry in entries if entry.installed),
+            sum(1 for entry in entries if entry.hidden),
+            sum(1 for entry in entries if entry.raw_meta_path is None),
+            len({self._duplicate_group_key(entry) for entry in entries}),
+            0,
+        )
+        return dict(zip(STATS_FIELDS, values))
+
+    @property
+    def trash(self) -> DownloadTrash:
+        return DownloadTrash(self.__organizer.downloadsPath())
+
+    def delete(self, item: DownloadEntry, trash_batch: Union[TrashBatch, None] = None) -> EntryChanges:
+        """
+        Deletes an entry's archive and meta file. With a trash batch the files
+        are staged (renamed into the trash folder) instead, which is instant
+        and can be undone until the trash is purged. Safe to call from worker
+        threads; the entry stays in the model until the changes are applied.
+        """
+        # Called once per item by bulk deletes, so skip building debug records when they'd be dropped
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("model.delete: looking for item %s", item.filename)
+        file_to_delete = self.get(item.entry_id)
         if file_to_delete is None:
             logger.debug("model.delete: item not found in data")
-            return False
+            return EntryChanges(failed=[item])
+        if trash_batch is not None:
+            if self.trash.stage(trash_batch, file_to_delete):
+                return EntryChanges(removed=[item.entry_id])
+            return EntryChanges(failed=[item])
         try:
             if file_to_delete.raw_file_path and file_to_delete.raw_file_path.is_file():
-                logger.debug("model.delete: deleting file %s", file_to_delete.raw_file_path)
+                if debug:
+                    logger.debug("model.delete: deleting file %s", file_to_delete.raw_file_path)
                 file_to_delete.raw_file_path.unlink()
             if file_to_delete.raw_meta_path and file_to_delete.raw_meta_path.is_file():
-                logger.debug("model.delete: deleting meta %s", file_to_delete.raw_meta_path)
+                if debug:
+                    logger.debug("model.delete: deleting meta %s", file_to_delete.raw_meta_path)
                 file_to_delete.raw_meta_path.unlink()
-            logger.debug("model.delete: delete successful")
-            return True
+            if debug:
+                logger.debug("model.delete: delete successful")
+            return EntryChanges(removed=[item.entry_id])
         except Exception as exc:
             logger.error("Failed to delete %s: %s", item.filename, exc)
-            return False
+            return EntryChanges(failed=[item])
+
+    def apply_changes(self, changes: EntryChanges) -> DownloadSnapshot:
+        """
+        Publishes a new snapshot with the changes applied (copy-on-write).
+        Changes from revalidate() also move the snapshot's scan time forward,
+        even when they found nothing to change.
+        """
+        with self.__publish_lock:
+            snapshot = self.__snapshot
+            if not changes.is_empty():
+                self.__snapshot = snapshot.with_changes(next(self.__generations), changes)
+            elif changes.scanned_at > snapshot.scanned_at:
+                self.__snapshot = replace(snapshot, scanned_at=changes.scanned_at)
+            else:
+                return snapshot
+            if self._catalog is not None:
+                self._catalog.apply(changes.removed, changes.updated + changes.added, self.__snapshot.scanned_at)
+            return self.__snapshot
+
+    def restore_trash_batch(self, batch: TrashBatch) -> EntryChanges:
+        """Undoes a staged delete; the entries back in the downloads folder are reported as added."""
+        ids_by_path = {record.archive_path: record.entry_id for record in batch.records}
+        restored = []
+        for archive_path in self.trash.restore(batch):
+            try:
+                stat_result = archive_path.stat()
+            except FileNotFoundError:
+                continue
+            restored.append(
+                _file_path_to_download_entry(archive_path, stat_result, ids_by_path.get(str(archive_path)))
+            )
+        return EntryChanges(added=restored)
+
+    @property
+    def meta_writer(self) -> MetaWriter:
+        if self._meta_writer is None:
+            self._meta_writer = MetaWriter(self._scheduler)
+        return self._meta_writer
 
     @staticmethod
-    def bulk_hide(items) -> int:
-        success_count = 0
-        for entry in list(items):
-            if _hide_download(entry):
-                success_count += 1
-        return success_count
-
-    def bulk_install(self, items):
+    def hide_updates(items) -> Tuple[List[MetaUpdate], List[DownloadEntry]]:
+        """Meta patches that mark entries removed, plus the entries that have no meta file to patch."""
+        return build_meta_updates(
+            list(items), {"removed": "true"}, lambda entry: replace(entry, hidden=True)
+        )
+
+    def bulk_install(self, items) -> EntryChanges:
+        changes = EntryChanges()
         for mod in items:
-            self.install_mod(mod)
+            changes.merge(self.install_mod(mod))
+        return changes
 
-    def requery(self, mod: DownloadEntry, md5_hash: str):
+    def _reload_entry(self, mod: DownloadEntry) -> Union[DownloadEntry, None]:
+        """Re-reads one entry's archive and meta file, keeping its id."""
+        try:
+            stat_result = mod.raw_file_path.stat()
+        except FileNotFoundError:
+            return None
+        return _file_path_to_download_entry(mod.raw_file_path, stat_result, mod.entry_id)
+
+    def _reloaded_changes(self, mod: DownloadEntry) -> EntryChanges:
+        # Re-read rather than guess: MO2 and Nexus decide what ends up in the meta file
+        updated_entry = self._reload_entry(mod)
+        if updated_entry is None:
+            return EntryChanges(removed=[mod.entry_id])
+        return EntryChanges(updated=[updated_entry])
+
+    def _changes_after_write(self, mod: DownloadEntry, write: Future, result: Future):
+        """Resolves `result` with the re-read entry once a meta write lands, or with mod as failed."""
+        def written(future: Future):
+            try:
+                future.result()
+            except Exception as exc:
+                logger.error("Failed to write meta for %s: %s", mod.filename, exc)
+                result.set_result(EntryChanges(failed=[mod]))
+                return
+            result.set_result(self._reloaded_changes(mod))
+
+        write.add_done_callback(written)
+
+    def requery(self, mod: DownloadEntry, md5_hash: str) -> Future:
+        """
+        Looks the archive's hash up on Nexus and rewrites its meta file from
+        the answer, without blocking the caller: the lookup and the meta
+        write both run on the I/O scheduler. The returned future resolves to
+        the changes to apply.
+        """
         nexus_api = NexusApi(
             self.__organizer.pluginSetting("Download Manager", "nexusApiKey")
         )
-        response = nexus_api.md5_lookup(md5_hash)
-        if response is not None:
-            # Create a new meta file for this download
-            self._create_meta_from_mod_and_nexus_response(mod, response)
-            # Create a new DownloadEntry for the meta file. Assuming the meta file now exists, we pass the raw_file_path
+        if self._catalog is not None:
+            self._catalog.record_digest(mod.entry_id, md5_hash)
+        result: Future = Future()
+
+        def looked_up(lookup: Future):
             try:
-                stat_result = mod.raw_file_path.stat()
-                updated_entry = _file_path_to_download_entry(mod.raw_file_path, stat_result)
-            except FileNotFoundError:
-                updated_entry = None
+                response = lookup.result()
+            except Exception as exc:
+                logger.error("Nexus lookup failed for %s: %s", mod.filename, exc)
+                response = None
+            if response is None:
+                result.set_result(EntryChanges(failed=[mod]))
+                return
+            try:
+                write = self._create_meta_from_mod_and_nexus_response(mod, response)
+            except Exception as exc:
+                logger.error("Failed to build meta for %s: %s", mod.filename, exc)
+                result.set_result(EntryChanges(failed=[mod]))
+                return
+            self._changes_after_write(mod, write, result)
 
-            if updated_entry:
-                self.__data = [updated_entry if x == mod else x for x in self.__data]
-                self.__data_no_installed = [d for d in self.__data if not d.installed]
+        self._scheduler.submit(
+            nexus_api.md5_lookup, md5_hash, priority=Priority.INTERACTIVE, device=NETWORK_DEVICE
+        ).add_done_callback(looked_up)
+        return result
 
 
     def _create_meta_from_mod_and_nexus_response(
         self, mod: DownloadEntry, response: NexusMD5Response
-    ) -> Path:
+    ) -> Future:
+        """Queues writing the Nexus details into the download's meta file (created if missing)."""
         meta_file_name = mod.raw_file_path.with_name(f"{mod.raw_file_path.name}.meta")
 
         name = response.file_details.name
         mod_name = response.mod.name
 
-        meta_file = QSettings(str(meta_file_name), QSettings.Format.IniFormat)
-        meta_file.beginGroup("General")
-        meta_file.setValue("gameName", self.__organizer.managedGame().gameShortName())
-        meta_file.setValue("modID", response.mod.mod_id)
-        meta_file.setValue("fileID", response.file_details.file_id)
-        meta_file.setValue("url", f"https://www.nexusmods.com/skyrimspecialedition/mods/{response.mod.mod_id}")
-        meta_file.setValue("name", name)
-        meta_file.setValue("description", response.mod.description)
-        meta_file.setValue("modName", mod_name)
-        meta_file.setValue("version", response.file_details.version)
-        meta_file.setValue("newestVersion", "")
-        meta_file.setValue("fileTime", QDateTime.currentDateTime())
-        meta_file.setValue("fileCategory", response.file_details.category_id)
-        meta_file.setValue("category", response.mod.category_id)
-        meta_file.setValue("repository", "Nexus")
-        meta_file.setValue("userData", json.dumps(asdict(response.mod.user)))
-        meta_file.setValue("installed", str(mod.installed).lower())
-        meta_file.setValue("uninstalled", "false")
-        meta_file.setValue("paused", "false")
-        meta_file.setValue("removed", "false")
-        meta_file.endGroup()
-        meta_file.sync()
-        return meta_file_name
-
-    def install_mod(self, mod: DownloadEntry):
+        return self.meta_writer.submit(
+            meta_file_name,
+            {
+                "gameName": self.__organizer.managedGame().gameShortName(),
+                "modID": response.mod.mod_id,
+                "fileID": response.file_details.file_id,
+                "url": f"https://www.nexusmods.com/skyrimspecialedition/mods/{response.mod.mod_id}",
+                "name": name,
+                "description": response.mod.description,
+                "modName": mod_name,
+                "version": response.file_details.version,
+                "newestVersion": "",
+                "fileTime": QDateTime.currentDateTime().toString(Qt.DateFormat.ISODate),
+                "fileCategory": response.file_details.category_id,
+                "category": response.mod.category_id,
+                "repository": "Nexus",
+                "userData": json.dumps(asdict(response.mod.user)),
+                "installed": str(mod.installed).lower(),
+                "uninstalled": "false",
+                "paused": "false",
+                "removed": "false",
+            },
+        )
+
+    def install_mod(self, mod: DownloadEntry) -> EntryChanges:
         mo2_version = self.__organizer.appVersion().canonicalString()
         print(f"Installing {mod.name} with MO2 API version {mo2_version}")
         if is_above_2_4(mo2_version):
             # mo2 v2.5.x
-            self.__organizer.installMod(
+            installed = self.__organizer.installMod(
                 mod.raw_file_path,
             )
         else:
             # mo2 v2.4.x
-            self.__organizer.installMod(str(mod.raw_file_path))
-        _hide_download(mod)
-
-    def install_mod_safe(self, mod: DownloadEntry) -> bool:
+            installed = self.__organizer.installMod(str(mod.raw_file_path))
+        if installed is None:
+            return EntryChanges(failed=[mod])
+        return self._reloaded_changes(mod).merge(self.hide_installed(mod).result())
+
+    def hide_installed(self, mod: DownloadEntry) -> Future:
+        """
+        Queues hiding a download that has just been installed. The future
+        resolves to the re-read entry once the meta write lands, or to mod as
+        failed when there is no meta file or the write fails.
+        """
+        result: Future = Future()
+        if mod.raw_meta_path is None or not mod.raw_meta_path.exists():
+            logger.warning("Cannot hide %s: no meta file at %s", mod.filename, mod.raw_meta_path)
+            result.set_result(EntryChanges(failed=[mod]))
+            return result
+        self._changes_after_write(mod, self.meta_writer.submit(mod.raw_meta_path, {"removed": "true"}), result)
+        return result
+
+    def install_mod_safe(self, mod: DownloadEntry) -> EntryChanges:
+        """
+        Installs one download through MO2 (which has to happen on the UI
+        thread) and returns the re-read entry, or mod as failed. Hiding it
+        afterwards is left to hide_installed, so the caller doesn't wait on
+        the meta write.
+        """
         mo2_version = self.__organizer.appVersion().canonicalString()
-        logger.debug("install_mod_safe: starting for %s (MO2 version %s)", mod.name or mod.filename, mo2_version)
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("install_mod_safe: starting for %s (MO2 version %s)", mod.name or mod.filename, mo2_version)
         try:
-            logger.debug("install_mod_safe: about to call organizer.installMod for %s", mod.filename)
             if is_above_2_4(mo2_version):
-                self.__organizer.installMod(mod.raw_file_path)
+                installed = self.__organizer.installMod(mod.raw_file_path)
             else:
-                self.__organizer.installMod(str(mod.raw_file_path))
-            logger.debug("install_mod_safe: organizer.installMod returned for %s", mod.filename)
-            result = _hide_download(mod)
-            logger.debug("install_mod_safe: _hide_download returned %s for %s", result, mod.filename)
-            return result
+                installed = self.__organizer.installMod(str(mod.raw_file_path))
+            if debug:
+                logger.debug("install_mod_safe: organizer.installMod returned for %s", mod.filename)
+            if installed is None:
+                # MO2 returns no mod when the install failed or the user cancelled its dialog
+                logger.info("install_mod_safe: %s was not installed; leaving it visible", mod.filename)
+                return EntryChanges(failed=[mod])
+            return self._reloaded_changes(mod)
         except Exception as e:
             logger.error("install_mod_safe: exception for %s: %s", mod.filename, e)
-            return False
+            return EntryChanges(failed=[mod])
 
     @property
-    def data(self):
-        return self.__data
+    def data(self) -> Tuple[DownloadEntry, ...]:
+        return self.__snapshot.entries
 
     @property
-    def data_no_installed(self):
-        return self.__data_no_installed
-
-    def __del__(self):
-        try:
-            self._executor.shutdown(wait=False)
-        except Exception:
-            pass
+    def scheduler(self) -> IOScheduler:
+        return self._scheduler
@@ -1,33 +1,56 @@
+import threading
+import time
+
 import mobase
 
-from .download_manager_window import DownloadManagerWindow
-from .util import logger
+from .util import LOG_LEVEL_SETTING, CancellationToken, logger, set_log_level
 
 try:
     import PyQt6.QtGui as QtGui
+    from PyQt6.QtCore import QCoreApplication, QTimer
 except ImportError:
     import PyQt5.QtGui as QtGui
+    from PyQt5.QtCore import QCoreApplication, QTimer
+
+# MO2 loads every plugin before showing its window, so startup cost is paid
+# by every user on every launch, whether or not they open the tool.
+IMPORT_BUDGET_MS = 50
+INIT_BUDGET_MS = 5
+
+PREWARM_SETTING = "prewarmScan"
+# Let MO2 finish its own startup work before the pre-warm touches the disk
+PREWARM_DELAY_MS = 10_000
+# Parse batches the pre-warm keeps queued at once; it also runs at the lowest I/O priority
+PREWARM_IN_FLIGHT = 1
+
+
+def report_startup_cost(stage: str, started: float, budget_ms: float):
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if elapsed_ms > budget_ms:
+        logger.warning("startup: %s took %.1f ms, over its %d ms budget", stage, elapsed_ms, budget_ms)
+    else:
+        logger.debug("startup: %s took %.1f ms (budget %d ms)", stage, elapsed_ms, budget_ms)
+    return elapsed_ms
 
-# import cProfile
-# import pstats
 
+def _attach_debugger():
+    try:
+        logger.debug("Attempting to initialize DL manager debugger")
+        import pydevd_pycharm  # pylint:disable=import-outside-toplevel
+        logger.debug("pydevd_pycharm imported")
 
-# class Profiler:
-#     def __init__(self, profile_filename='profile.prof'):
-#         self.profiler = cProfile.Profile()
-#         self.profile_filename = profile_filename
-#
-#     def start(self):
-#         self.profiler.enable()
-#
-#     def stop(self):
-#         self.profiler.disable()
-#         self.save()
-#
-#     def save(self):
-#         stats = pstats.Stats(self.profiler)
-#         stats.sort_stats(pstats.SortKey.TIME)
-#         stats.dump_stats(self.profile_filename)
+        pydevd_pycharm.settrace(
+            "localhost",
+            port=5678,
+            stdoutToServer=True,
+            stderrToServer=True,
+            suspend=False,
+        )
+        logger.debug("Debugger started")
+
+    except Exception as e:
+        logger.debug("Could not start debugger. Continuing.")
+        logger.debug(e)
 
 
 class DownloadManagerPlugin(mobase.IPluginTool):
@@ -41,23 +64,83 @@ class DownloadManagerPlugin(mobase.IPluginTool):
         super().__init__()
         logger.info("DownloadManagerPlugin.__init__")
         self.__window = None
+        self.__model = None
+        self.__prewarm_token = None
 
     def init(self, organizer: mobase.IOrganizer):
+        started = time.perf_counter()
         self.__organizer = organizer
-        self.__window = DownloadManagerWindow(self.__organizer)
+        set_log_level(organizer.pluginSetting(self.NAME, LOG_LEVEL_SETTING))
+        if organizer.pluginSetting(self.NAME, "attachDebugger"):
+            _attach_debugger()
+        # The window, its models and the I/O workers are only built on first display()
+        if organizer.pluginSetting(self.NAME, PREWARM_SETTING):
+            organizer.onUserInterfaceInitialized(
+                lambda _main_window: QTimer.singleShot(PREWARM_DELAY_MS, self._start_prewarm)
+            )
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self._shutdown)
+        report_startup_cost("init", started, INIT_BUDGET_MS)
         return True
 
-    def display(self):
-        # profiler = Profiler()
-        #
-        # # Start profiling
-        # profiler.start()
+    def _start_prewarm(self):
+        if self.__window is not None:
+            return
+        # pylint:disable=import-outside-toplevel
+        from .download_manager_model import DownloadManagerModel
+
+        self.__model = DownloadManagerModel(self.__organizer)
+        self.__prewarm_token = CancellationToken()
+        threading.Thread(
+            target=self._prewarm, args=(self.__model, self.__prewarm_token), name="DownloadManagerPrewarm", daemon=True
+        ).start()
+
+    @staticmethod
+    def _prewarm(model, token: CancellationToken):
+        # pylint:disable=import-outside-toplevel
+        from .instrumentation import PhaseTimer
+        from .io_scheduler import Priority
+
+        timer = PhaseTimer("prewarm")
+        snapshot = model.refresh(token, timer, Priority.VERIFICATION, PREWARM_IN_FLIGHT)
+        # Publishing checks the token under the model's lock, so a window that opened meanwhile keeps its own scan
+        if snapshot is not None and model.publish(snapshot, token):
+            timer.finish()
+
+    def _shutdown(self):
+        """Lets the model apply its queued catalog writes before MO2 exits."""
+        if self.__prewarm_token is not None:
+            self.__prewarm_token.cancel()
+        if self.__model is not None:
+            self.__model.close()
+
+    def _window(self):
+        if self.__window is None:
+            started = time.perf_counter()
+            # Imported here so MO2 startup doesn't load the widgets, models and Nexus client
+            # pylint:disable=import-outside-toplevel
+            from .download_manager_model import DownloadManagerModel
+            from .download_manager_window import DownloadManagerWindow
+
+            if self.__prewarm_token is not None:
+                # A finished pre-warm has already published its snapshot; an unfinished one is
+                # superseded by the window's own refresh
+                self.__prewarm_token.cancel()
+            if self.__model is None:
+                self.__model = DownloadManagerModel(self.__organizer)
+            self.__window = DownloadManagerWindow(self.__organizer, model=self.__model)
+            logger.debug("window built in %.1f ms", (time.perf_counter() - started) * 1000)
+        return self.__window
 
-        self.__window.init()
-        self.__window.setWindowTitle(f"{self.NAME} v{self.version().displayString()}")
-        self.__window.show()
+    def display(self):
+        from .instrumentation import PROFILING_SETTING, Profiler  # pylint:disable=import-outside-toplevel
 
-        # profiler.stop()
+        with Profiler("display", bool(self.__organizer.pluginSetting(self.NAME, PROFILING_SETTING))):
+            window = self._window()
+            window.init()
+            window.setWindowTitle(f"{self.NAME} v{self.version().displayString()}")
+            window.show()
 
     def displayName(self):
         return self.NAME
@@ -89,6 +172,73 @@ class DownloadManagerPlugin(mobase.IPluginTool):
             mobase.PluginSetting(
                 "alternateRowColors", "Use alternating row colors in the download table.", True
             ),
+            mobase.PluginSetting(
+                "columnWidths", "Download table column widths (managed automatically).", "[]"
+            ),
+            mobase.PluginSetting(
+                "stagedDelete",
+                "Move deleted downloads to a trash folder first so the delete can be undone "
+                "(disk space is freed when the trash is purged or emptied).",
+                False,
+            ),
+            mobase.PluginSetting(
+                "trashMaxSizeGB",
+                "Purge the oldest trashed downloads once the trash exceeds this size (0 = no limit).",
+                20,
+            ),
+            mobase.PluginSetting(
+                "trashMaxAgeDays", "Purge trashed downloads older than this many days (0 = never).", 7
+            ),
+            mobase.PluginSetting(
+                "ioDeviceConcurrency",
+                "Maximum concurrent file operations per disk; lower it for hard drives (0 = automatic).",
+                0,
+            ),
+            mobase.PluginSetting(
+                "installReadAhead",
+                "During bulk installs, check and pre-read the next archive while the current one installs.",
+                True,
+            ),
+            mobase.PluginSetting(
+                "profiling",
+                "Profile opening the window, refreshes and bulk operations with cProfile; "
+                "results are written to the logs folder as .prof files.",
+                False,
+            ),
+            mobase.PluginSetting(
+                "stallThresholdMs",
+                "Log the UI thread's stack to DownloadManager.log whenever the window freezes "
+                "for longer than this many milliseconds (0 = off).",
+                500,
+            ),
+            mobase.PluginSetting(
+                "memoryDiagnostics",
+                "Trace memory with tracemalloc and log per-module usage after refreshes, table loads "
+                "and re-queries. Slows the plugin down; takes effect when MO2 restarts.",
+                False,
+            ),
+            mobase.PluginSetting(
+                LOG_LEVEL_SETTING,
+                "Detail written to logs/DownloadManager.log: DEBUG, INFO, WARNING or ERROR.",
+                "INFO",
+            ),
+            mobase.PluginSetting(
+                PREWARM_SETTING,
+                "Scan the downloads folder in the background (at low I/O priority) shortly after MO2 starts, "
+                "so the Download Manager opens with its list already loaded.",
+                False,
+            ),
+            mobase.PluginSetting(
+                "catalog",
+                "Keep an index of the downloads folder in a SQLite file inside it, so the list opens from the "
+                "last scan and duplicate/not-installed selection runs as indexed queries.",
+                False,
+            ),
+            mobase.PluginSetting(
+                "attachDebugger",
+                "Connect to a PyCharm debug server on localhost:5678 when MO2 starts (needs pydevd-pycharm).",
+                False,
+            ),
         ]
 
     def version(self):
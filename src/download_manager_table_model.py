@@ -1,6 +1,10 @@
+import heapq
+from collections import Counter
+from concurrent.futures import Future
 from datetime import datetime
 from enum import IntEnum
-from typing import Callable, Dict, List, Set
+from operator import attrgetter
+from typing import Callable, Dict, List, Set, Union
 
 import mobase
 
@@ -28,18 +32,87 @@ except ImportError:
     from PyQt5.QtGui import QColor
 
 from .download_entry import DownloadEntry
-from .download_manager_model import DownloadManagerModel
+from .download_manager_model import DownloadManagerModel, DownloadSnapshot, EntryChanges
+from .facets import FacetIndex
 from .hash_worker import HashWorker
 from .mo2_compat_utils import CHECKED_STATE
+from .search_query import RowFields, compile_query
 from .ui_statics import HashProgressDialog, bool_emoji, value_or_no
 from .util import logger, sizeof_fmt
 
 
 
+class _ColumnWidths:
+    """
+    Counts the lengths of each tracked column's display strings, keeping one
+    example string per length, and counts file sizes, as rows are added and
+    removed. The widest samples are then read from the distinct lengths (a
+    few dozen) and the largest size rather than by rendering every row. An
+    example can outlive the row it came from; it still has a length that is
+    in the table.
+    """
+
+    def __init__(self, attributes: Dict[int, str]):
+        # column -> DownloadEntry attribute it displays
+        self._getters = {column: attrgetter(attribute) for column, attribute in attributes.items()}
+        self._lengths: Dict[int, Counter] = {column: Counter() for column in attributes}
+        self._examples: Dict[int, Dict[int, str]] = {column: {} for column in attributes}
+        self._sizes: Counter = Counter()
+        self._largest_size = 0
+
+    @staticmethod
+    def _text(value) -> str:
+        return str(value_or_no(value))
+
+    def reset(self, entries: List[DownloadEntry]):
+        """Recounts from scratch, one pass per column over every entry."""
+        for column, get_value in self._getters.items():
+            texts = list(map(self._text, map(get_value, entries)))
+            lengths = list(map(len, texts))
+            self._lengths[column] = Counter(lengths)
+            self._examples[column] = dict(zip(lengths, texts))
+        self._sizes = Counter(map(attrgetter("file_size"), entries))
+        self._largest_size = max(self._sizes, default=0)
+
+    def add(self, entry: DownloadEntry):
+        for column, get_value in self._getters.items():
+            text = self._text(get_value(entry))
+            self._lengths[column][len(text)] += 1
+            self._examples[column][len(text)] = text
+        self._sizes[entry.file_size] += 1
+        self._largest_size = max(self._largest_size, entry.file_size)
+
+    def remove(self, entry: DownloadEntry):
+        for column, get_value in self._getters.items():
+            length = len(self._text(get_value(entry)))
+            lengths = self._lengths[column]
+            lengths[length] -= 1
+            if lengths[length] <= 0:
+                del lengths[length]
+                self._examples[column].pop(length, None)
+        self._sizes[entry.file_size] -= 1
+        if self._sizes[entry.file_size] <= 0:
+            del self._sizes[entry.file_size]
+            if entry.file_size == self._largest_size:
+                # Only removing the largest archive costs a pass over the distinct sizes
+                self._largest_size = max(self._sizes, default=0)
+
+    def widest(self, column: int, limit: int) -> List[str]:
+        examples = self._examples[column]
+        return [examples[length] for length in heapq.nlargest(limit, self._lengths[column])]
+
+    @property
+    def largest_size(self) -> int:
+        return self._largest_size
+
+
 class DownloadManagerTableModel(QtCore.QAbstractTableModel):
 
     SELECTED_ROW_COLOR = QColor(0, 128, 0, 70)
 
+    # A repository or game appeared or disappeared through apply_changes
+    facet_values_changed = QtCore.pyqtSignal()
+
     COLUMN_MAPPING: Dict[int, Callable[[DownloadEntry], str]] = {
         Column.NAME: lambda item: item.name,
         Column.MOD_NAME: lambda item: item.modname,
@@ -53,25 +126,91 @@ class DownloadManagerTableModel(QtCore.QAbstractTableModel):
         Column.FILE_ID: lambda item: item.nexus_file_id,
     }
 
+    # Columns whose rendered width varies with content, and the entry attribute each shows;
+    # the rest render to a near-constant width
+    VARIABLE_WIDTH_COLUMNS = {
+        Column.NAME: "name",
+        Column.MOD_NAME: "modname",
+        Column.FILENAME: "filename",
+        Column.VERSION: "version",
+        Column.MOD_ID: "nexus_mod_id",
+        Column.FILE_ID: "nexus_file_id",
+    }
+
     # Column 0 is selection checkbox column (empty header), rest are data columns
     _header = ("", "Name", "Mod Name", "Filename", "Date", "Version", "Size", "Installed?", "Hidden?", "Mod ID", "File ID")
 
-    def __init__(self, organizer: mobase.IOrganizer):
+    def __init__(self, organizer: mobase.IOrganizer, model: Union[DownloadManagerModel, None] = None):
         super().__init__()
         self.hash_worker: HashWorker
         self.hash_dialog: HashProgressDialog
         self._data: List[DownloadEntry] = []
-        self._selected: Set[DownloadEntry] = set()
-        self._model = DownloadManagerModel(organizer)
-
-    def init_data(self, data: List[DownloadEntry]):
+        self._fields: List[RowFields] = []
+        self._facet_masks: List[int] = []
+        self._facet_index = FacetIndex()
+        self._column_widths = _ColumnWidths(self.VARIABLE_WIDTH_COLUMNS)
+        self._row_by_id: Dict[str, int] = {}
+        # Selection is kept as entry ids so it survives entries being replaced
+        self._selected: Set[str] = set()
+        # The view's facet filter (see set_facet_filter); rows it hides are never selected
+        self._excluded_facets = 0
+        self._required_facets = 0
+        self._model = model or DownloadManagerModel(organizer)
+
+    def adopt_snapshot(self, snapshot: DownloadSnapshot):
+        """Switches the table to a published model snapshot in one step on the UI thread."""
+        logger.debug("adopt_snapshot: generation %d", snapshot.generation)
+        self.init_data(snapshot.entries)
+
+    def init_data(self, data):
         logger.debug("init_data called with %d items", len(data) if data else 0)
         self.layoutAboutToBeChanged.emit()
-        self._data = data
+        # Own row order, only ever touched on the UI thread; model snapshots are immutable
+        self._data = list(data)
+        self._rebuild_fields()
         self._selected.clear()
         self.layoutChanged.emit()
         logger.debug("init_data complete")
 
+    def _rebuild_fields(self):
+        self._fields = [RowFields(item) for item in self._data]
+        self._facet_masks = self._facet_index.reset(self._data)
+        self._row_by_id = {item.entry_id: row for row, item in enumerate(self._data)}
+        self._column_widths.reset(self._data)
+
+    def row_of(self, entry_id: str) -> int:
+        """Source row of an entry id, or -1 if it isn't in the table."""
+        return self._row_by_id.get(entry_id, -1)
+
+    def is_selected(self, entry: DownloadEntry) -> bool:
+        return entry.entry_id in self._selected
+
+    def row_fields(self, row: int) -> RowFields:
+        return self._fields[row]
+
+    def row_facets(self, row: int) -> int:
+        return self._facet_masks[row]
+
+    def facets_visible(self, row: int) -> bool:
+        """Whether the view's facet filter shows a source row."""
+        mask = self._facet_masks[row]
+        return not mask & self._excluded_facets and mask & self._required_facets == self._required_facets
+
+    def set_facet_filter(self, excluded: int, required: int):
+        """Takes the view's facet filter and drops the rows it now hides from the selection."""
+        self._excluded_facets = excluded
+        self._required_facets = required
+        self._facet_index.reserved = excluded | required
+        rows = [self._row_by_id[entry_id] for entry_id in self._selected if entry_id in self._row_by_id]
+        hidden = [row for row in rows if not self.facets_visible(row)]
+        for row in hidden:
+            self._selected.discard(self._data[row].entry_id)
+        self._emit_row_runs(hidden)
+
+    @property
+    def facet_index(self) -> FacetIndex:
+        return self._facet_index
+
     def headerData(self, section, _orientation, role=...):
         if role == Qt.ItemDataRole.DisplayRole:
             if section > len(self._header) - 1:
@@ -105,17 +244,36 @@ class DownloadManagerTableModel(QtCore.QAbstractTableModel):
             return column_value.strftime("%Y-%m-%d %H:%M:%S")
         return value_or_no(column_value)
 
+    def column_width_samples(self, column: int, limit: int = 5) -> List[str]:
+        """
+        Returns a bounded set of display strings likely to be the widest in a
+        column, for estimating column widths without measuring every row. The
+        longest strings are tracked as rows change, so this costs the same at
+        100 rows and 100k.
+        """
+        samples = [str(self._header[column])]
+        if column == Column.SELECTION or not self._data:
+            return samples
+        if column in self.VARIABLE_WIDTH_COLUMNS:
+            samples.extend(self._column_widths.widest(column, limit))
+        else:
+            for row in range(min(limit, len(self._data))):
+                samples.append(str(self._render_column(self._data[row], self.index(row, column))))
+            if column == Column.SIZE:
+                samples.append(sizeof_fmt(self._column_widths.largest_size))
+        return samples
+
     def data(self, index: QModelIndex, role: int = ...):
         item = self._data[index.row()]
 
         # Decorative roles will go first to ensure they are applied evenly across columns
         if role == QtCore.Qt.ItemDataRole.BackgroundRole:
-            return self.SELECTED_ROW_COLOR if item in self._selected else None
+            return self.SELECTED_ROW_COLOR if item.entry_id in self._selected else None
 
         if role == Qt.ItemDataRole.CheckStateRole and index.column() == Column.SELECTION:
             return (
                 Qt.CheckState.Checked
-                if item in self._selected
+                if item.entry_id in self._selected
                 else Qt.CheckState.Unchecked
             )
 
@@ -142,30 +300,30 @@ class DownloadManagerTableModel(QtCore.QAbstractTableModel):
     def setData(self, index: QModelIndex, value, role=...):
         if role == Qt.ItemDataRole.CheckStateRole and index.column() == Column.SELECTION:
             selected = value == CHECKED_STATE
-            selected_data = self._data[index.row()]
+            entry_id = self._data[index.row()].entry_id
             (
-                self._selected.add(selected_data)
+                self._selected.add(entry_id)
                 if selected
-                else self._selected.remove(selected_data)
+                else self._selected.discard(entry_id)
             )
             self.dataChanged.emit(index, index, [Qt.ItemDataRole.CheckStateRole])
             return True
         return False
 
     def select_at_index(self, index: QModelIndex):
-        selected_data = self._data[index.row()]
-        if selected_data not in self._selected:
-            self._selected.add(selected_data)
+        entry_id = self._data[index.row()].entry_id
+        if entry_id not in self._selected:
+            self._selected.add(entry_id)
             self.dataChanged.emit(index, index, [Qt.ItemDataRole.CheckStateRole])
         return True
 
     def toggle_at_index(self, index: QModelIndex):
         """Toggle selection state for item at index (invert current state)."""
-        item = self._data[index.row()]
-        if item in self._selected:
-            self._selected.remove(item)
+        entry_id = self._data[index.row()].entry_id
+        if entry_id in self._selected:
+            self._selected.remove(entry_id)
         else:
-            self._selected.add(item)
+            self._selected.add(entry_id)
         self.dataChanged.emit(index, index, [Qt.ItemDataRole.CheckStateRole])
         return True
 
@@ -175,7 +333,7 @@ class DownloadManagerTableModel(QtCore.QAbstractTableModel):
         for row in rows:
             if row < 0 or row >= len(self._data):
                 continue
-            if self._data[row] not in self._selected:
+            if self._data[row].entry_id not in self._selected:
                 return False
         return True
 
@@ -190,19 +348,28 @@ class DownloadManagerTableModel(QtCore.QAbstractTableModel):
         for row in rows:
             if row < 0 or row >= len(self._data):
                 continue
-            item = self._data[row]
+            entry_id = self._data[row].entry_id
             if selected:
-                if item in self._selected:
+                if entry_id in self._selected:
                     continue
-                self._selected.add(item)
+                self._selected.add(entry_id)
             else:
-                if item not in self._selected:
+                if entry_id not in self._selected:
                     continue
-                self._selected.remove(item)
+                self._selected.remove(entry_id)
             left = self.index(row, 0)
             right = self.index(row, max_column - 1)
             self.dataChanged.emit(left, right, roles)
 
+    def set_entries_selected(self, entries, selected: bool):
+        """Selects or deselects entries regardless of their current row (used by the grouped view)."""
+        entry_ids = [entry.entry_id for entry in entries]
+        if selected:
+            self._selected.update(entry_ids)
+        else:
+            self._selected.difference_update(entry_ids)
+        self._notify_table_updated()
+
     def flags(self, index: QModelIndex):
         if not index.isValid():
             # these qt5/qt6 imports act a little strangely with pylint. this member does exist.
@@ -223,7 +390,7 @@ class DownloadManagerTableModel(QtCore.QAbstractTableModel):
 
         if column == Column.SELECTION:
             self._data.sort(
-                key=lambda row: row in self._selected,
+                key=lambda row: row.entry_id in self._selected,
                 reverse=(order == Qt.SortOrder.DescendingOrder),
             )
         else:
@@ -235,33 +402,50 @@ class DownloadManagerTableModel(QtCore.QAbstractTableModel):
                 ),
                 reverse=(order == Qt.SortOrder.DescendingOrder),
             )
+        self._rebuild_fields()
         self.layoutChanged.emit()
 
-    def get_selected(self):
-        return self._selected
+    def get_selected(self) -> List[DownloadEntry]:
+        rows = self._row_by_id
+        return [self._data[rows[entry_id]] for entry_id in self._selected if entry_id in rows]
+
+    def selected_count(self) -> int:
+        return len(self._selected)
 
     def get_selected_size(self) -> float:
-        return sum(item.file_size for item in self._selected)
+        return sum(item.file_size for item in self.get_selected())
 
-    def requery(self, mod: DownloadEntry, md5_hash: str):
-        self._model.requery(mod, md5_hash)
-        self._data = self._model.data
-        self._selected.remove(mod)
-        self._notify_table_updated()
+    def requery(self, mod: DownloadEntry, md5_hash: str) -> Future:
+        """Starts a re-query; apply the changes the returned future resolves to once it's done."""
+        self._selected.discard(mod.entry_id)
+        row = self._row_by_id.get(mod.entry_id)
+        if row is not None:
+            self.dataChanged.emit(self.index(row, Column.SELECTION), self.index(row, Column.SELECTION))
+        return self._model.requery(mod, md5_hash)
 
     def select_duplicates(self):
         if self._model:
-            self._selected = self._model.get_duplicates()
+            self._selected = {entry.entry_id for entry in self._model.get_duplicates()}
             self._notify_table_updated()
 
     def select_not_installed(self):
         if self._model:
-            self._selected = self._model.get_not_installed()
+            self._selected = {entry.entry_id for entry in self._model.get_not_installed()}
             self._notify_table_updated()
 
+    def select_matching(self, query: str):
+        """Selects every row matching a search query (see search_query.compile_query)."""
+        compiled = compile_query(query)
+        if compiled.is_empty():
+            return
+        for row, fields in enumerate(self._fields):
+            if self.facets_visible(row) and compiled.matches(fields):
+                self._selected.add(self._data[row].entry_id)
+        self._notify_table_updated()
+
     def select_all(self):
-        for item in self._data:
-            self._selected.add(item)
+        """Selects every row the facet filter shows; hidden rows stay out of bulk actions."""
+        self._selected.update(self._data[row].entry_id for row in range(len(self._data)) if self.facets_visible(row))
         self._notify_table_updated()
 
     def select_none(self):
@@ -270,39 +454,110 @@ class DownloadManagerTableModel(QtCore.QAbstractTableModel):
 
     def install_selected(self):
         if self._model:
-            self._model.bulk_install(self._selected)
-            self._notify_table_updated()
-
-    def delete_selected(self):
-        if self._model:
-            logger.debug("delete_selected: starting with %d items", len(self._selected))
-            items_to_delete = list(self._selected)
-            self._selected.clear()
-            self.layoutAboutToBeChanged.emit()
-            for i, item in enumerate(items_to_delete):
-                logger.debug("delete_selected: deleting item %d/%d: %s", i + 1, len(items_to_delete), item.filename)
-                self._model.delete(item)
-                if item in self._data:
-                    self._data.remove(item)
-            logger.debug("delete_selected: emitting layoutChanged")
-            self.layoutChanged.emit()
-            logger.debug("delete_selected: complete")
-
-    def hide_selected(self):
-        if self._model:
-            self._model.bulk_hide(self._selected)
+            self.apply_changes(self._model.bulk_install(self.get_selected()))
+
+    def apply_changes(self, changes: EntryChanges):
+        """
+        Mirrors a model operation's changes into the model and this table:
+        removed rows go in contiguous range batches, updated rows are replaced
+        in place and added rows are appended, so the rest of the view (scroll
+        position, sorting, selection) stays intact.
+        """
+        self._model.apply_changes(changes)
+        if changes.is_empty():
+            return
+        values_version = self._facet_index.values_version
+        self._remove_rows(changes.removed)
+        self._update_rows(changes.updated)
+        self._insert_rows(changes.added)
+        if self._facet_index.values_version != values_version:
+            self.facet_values_changed.emit()
+
+    def _remove_rows(self, entry_ids: List[str]):
+        rows = sorted(
+            (self._row_by_id[entry_id] for entry_id in entry_ids if entry_id in self._row_by_id),
+            reverse=True,
+        )
+        if not rows:
+            return
+        self._selected.difference_update(entry_ids)
 
-    def toggle_show_installed(self, hide_installed: bool):
-        self.layoutAboutToBeChanged.emit()
-        if hide_installed:
-            self._data = self._model.data_no_installed
-        else:
-            self._data = self._model.data
-        self.layoutChanged.emit()
+        # Walk descending rows, collapsing runs like 9,8,7 into one removal of 7..9
+        range_end = range_start = rows[0]
+        for row in rows[1:] + [None]:
+            if row is not None and row == range_start - 1:
+                range_start = row
+                continue
+            self.beginRemoveRows(QModelIndex(), range_start, range_end)
+            for item in self._data[range_start:range_end + 1]:
+                self._column_widths.remove(item)
+                self._facet_index.remove(item)
+            del self._data[range_start:range_end + 1]
+            del self._fields[range_start:range_end + 1]
+            del self._facet_masks[range_start:range_end + 1]
+            self.endRemoveRows()
+            if row is not None:
+                range_end = range_start = row
+
+        for entry_id in entry_ids:
+            self._row_by_id.pop(entry_id, None)
+        for row in range(rows[-1], len(self._data)):
+            self._row_by_id[self._data[row].entry_id] = row
+
+    def _insert_rows(self, entries: List[DownloadEntry]):
+        entries = [entry for entry in entries if entry.entry_id not in self._row_by_id]
+        if not entries:
+            return
+        first = len(self._data)
+        self.beginInsertRows(QModelIndex(), first, first + len(entries) - 1)
+        for row, entry in enumerate(entries, start=first):
+            self._data.append(entry)
+            self._column_widths.add(entry)
+            self._fields.append(RowFields(entry))
+            self._facet_masks.append(self._facet_index.add(entry))
+            self._row_by_id[entry.entry_id] = row
+        self.endInsertRows()
+
+    def _update_rows(self, entries: List[DownloadEntry]):
+        rows = []
+        for entry in entries:
+            row = self._row_by_id.get(entry.entry_id)
+            if row is None:
+                continue
+            self._column_widths.remove(self._data[row])
+            self._column_widths.add(entry)
+            # Count the new values before releasing the old ones, so an unchanged repository keeps its bit
+            self._facet_masks[row] = self._facet_index.add(entry)
+            self._facet_index.remove(self._data[row])
+            self._data[row] = entry
+            self._fields[row] = RowFields(entry)
+            if not self.facets_visible(row):
+                self._selected.discard(entry.entry_id)
+            rows.append(row)
+        self._emit_row_runs(rows)
+
+    def _emit_row_runs(self, rows: List[int]):
+        if not rows:
+            return
+        # One dataChanged per run of adjacent rows, like _remove_rows: the proxy re-sorts whatever
+        # range a signal covers, so a single span from the first to the last updated row could
+        # re-sort most of the table
+        rows.sort()
+        last_column = len(self._header) - 1
+        range_start = range_end = rows[0]
+        for row in rows[1:] + [None]:
+            if row is not None and row <= range_end + 1:
+                range_end = max(range_end, row)
+                continue
+            self.dataChanged.emit(self.index(range_start, 0), self.index(range_end, last_column))
+            if row is not None:
+                range_start = range_end = row
 
     def refresh(self):
-        self._model.refresh()
-        self.init_data(self._model.data)
+        snapshot = self._model.refresh()
+        if snapshot is not None:
+            self._model.publish(snapshot)
+            self.adopt_snapshot(snapshot)
 
 
     def _notify_index_updated(self, index: QModelIndex):
@@ -315,5 +570,5 @@ class DownloadManagerTableModel(QtCore.QAbstractTableModel):
         )
 
     @property
-    def selected(self):
+    def selected_ids(self) -> Set[str]:
         return self._selected
@@ -3,11 +3,39 @@ import webbrowser
 import mobase
 
 from .bulk_install_dialog import BulkInstallPanel
+from .delete_worker import DeleteResult, DeleteWorker
+from .download_trash import TRASH_GRACE_SECONDS, TrashPurgeWorker
+from .download_group_model import DownloadGroupModel, GroupBy
+from .download_manager_model import DownloadSnapshot, EntryChanges
 from .download_manager_table_model import Column, DownloadManagerTableModel
+from .facets import FACET_HAS_META, FACET_HIDDEN, FACET_INSTALLED, VALUE_BITS
 from .hash_worker import HashResult, HashWorker
+from .install_journal import InstallJournal
+from .instrumentation import (
+    MEMORY_DIAGNOSTICS_SETTING,
+    PHASE_RESIZE,
+    PHASE_SORT,
+    PHASE_TABLE_INIT,
+    PROFILING_SETTING,
+    MemoryDiagnostics,
+    PhaseTimer,
+    Profiler,
+    profiled,
+)
+from .io_scheduler import shared_scheduler
+from .meta_writer import ChangesRelay, MetaUpdateWorker
 from .mo2_compat_utils import CHECKED_STATE
-from .ui_statics import HashProgressDialog, LoadingOverlay, create_basic_table_widget
-from .util import logger, sizeof_fmt
+from .search_query import QueryError, compile_query, plain_text_query
+from .stall_watchdog import StallWatchdog
+from .ui_statics import (
+    BulkProgressDialog,
+    HashProgressDialog,
+    LoadingOverlay,
+    PerformancePanel,
+    create_basic_table_widget,
+    create_basic_tree_widget,
+)
+from .util import CancellationToken, logger, sizeof_fmt
 
 import json
 
@@ -15,13 +43,13 @@ from pathlib import Path
 
 try:
     import PyQt6.QtWidgets as QtWidgets
-    from PyQt6.QtGui import QAction, QScreen, QIcon
-    from PyQt6.QtCore import Qt, QEvent, QSortFilterProxyModel, QThread, pyqtSignal
+    from PyQt6.QtGui import QAction, QFontMetrics, QScreen, QIcon
+    from PyQt6.QtCore import Qt, QEvent, QModelIndex, QSortFilterProxyModel, QThread, QTimer, pyqtSignal
     from PyQt6.QtWidgets import QApplication, QSizePolicy, QMenu, QStyle
 except ImportError:
     import PyQt5.QtWidgets as QtWidgets
-    from PyQt5.QtCore import Qt, QEvent, QSortFilterProxyModel, QThread, pyqtSignal
-    from PyQt5.QtGui import QScreen, QIcon
+    from PyQt5.QtCore import Qt, QEvent, QModelIndex, QSortFilterProxyModel, QThread, QTimer, pyqtSignal
+    from PyQt5.QtGui import QFontMetrics, QScreen, QIcon
     from PyQt5.QtWidgets import QApplication, QSizePolicy, QMenu, QAction, QStyle
 
 # Icon paths
@@ -39,44 +67,154 @@ def show_error(message, header, icon=QtWidgets.QMessageBox.Icon.Warning):
 
 
 class RefreshWorker(QThread):
-    """Background worker thread for refreshing download data."""
-    finished = pyqtSignal(list)
-
-    def __init__(self, model):
+    """
+    Background worker thread for refreshing download data. Each worker
+    carries the refresh generation it was started for; a cancelled worker
+    emits nothing, and the window ignores results from older generations.
+    With from_catalog it first tries the model's catalog and only scans the
+    folder when the catalog has nothing. The snapshot is only built here; the
+    window publishes it on the UI thread once it knows it's still current.
+    """
+    refresh_finished = pyqtSignal(int, object)
+
+    def __init__(self, model, generation: int, timer: PhaseTimer = None, from_catalog: bool = False):
         super().__init__()
         self._model = model
+        self._generation = generation
+        self._timer = timer
+        self._from_catalog = from_catalog
+        self._token = CancellationToken()
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def cancel(self):
+        logger.debug("RefreshWorker.cancel: cancelling generation %d", self._generation)
+        self._token.cancel()
 
     def run(self):
-        logger.debug("RefreshWorker.run: starting model.refresh()")
-        self._model.refresh()
-        logger.debug("RefreshWorker.run: model.refresh() complete, emitting finished with %d items", len(self._model.data) if self._model.data else 0)
-        self.finished.emit(self._model.data)
+        snapshot = profiled(self._model.load_catalog) if self._from_catalog else None
+        if snapshot is None:
+            logger.debug("RefreshWorker.run: starting model.refresh() for generation %d", self._generation)
+            snapshot = profiled(self._model.refresh, self._token, self._timer)
+        if snapshot is None:
+            logger.debug("RefreshWorker.run: generation %d cancelled", self._generation)
+            return
+        logger.debug("RefreshWorker.run: model.refresh() complete, emitting finished with %d items", len(snapshot.entries))
+        self.refresh_finished.emit(self._generation, snapshot)
         logger.debug("RefreshWorker.run: finished signal emitted")
 
 
+class RevalidateWorker(QThread):
+    """
+    Brings an already loaded snapshot (from the background pre-warm scan) up
+    to date. Like RefreshWorker it carries its generation and emits nothing
+    when cancelled.
+    """
+    revalidate_finished = pyqtSignal(int, object)
+
+    def __init__(self, model, generation: int):
+        super().__init__()
+        self._model = model
+        self._generation = generation
+        self._token = CancellationToken()
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def cancel(self):
+        self._token.cancel()
+
+    def run(self):
+        changes = profiled(self._model.revalidate, self._token)
+        if changes is not None:
+            self.revalidate_finished.emit(self._generation, changes)
+
+
 class DownloadFilterProxyModel(QSortFilterProxyModel):
+    """
+    Filters rows with a compiled search query. The query is parsed once per
+    change of search text and evaluated against the table model's precomputed
+    row fields, so no display strings are rendered while filtering.
 
-    FILTER_COLUMNS = (Column.MOD_NAME, Column.FILENAME)
+    Facet filters (installed, hidden, has-meta, repository, game) are applied
+    first as a bitmask test against the table model's per-row facet masks.
+    """
 
     def __init__(self, parent=None):
         super().__init__(parent)
+        self._excluded_facets = 0
+        self._required_facets = 0
         self._search_text = ""
+        self._query = compile_query("")
+        self._query_error = None
         self.setDynamicSortFilter(True)
 
     def set_search_text(self, text: str):
-        normalized = text.strip().lower()
+        normalized = text.strip()
         if normalized == self._search_text:
             return
         self._search_text = normalized
+        try:
+            self._query = compile_query(normalized)
+            self._query_error = None
+        except QueryError as exc:
+            # Keep filtering usable while the user is mid-way through typing a term
+            self._query = plain_text_query(normalized)
+            self._query_error = str(exc)
         self.invalidateFilter()
 
+    def set_facet_excluded(self, facet_bits: int, excluded: bool):
+        """Hides rows carrying any of the given facet bits."""
+        updated = (
+            self._excluded_facets | facet_bits
+            if excluded
+            else self._excluded_facets & ~facet_bits
+        )
+        if updated != self._excluded_facets:
+            self._excluded_facets = updated
+            self.sourceModel().set_facet_filter(self._excluded_facets, self._required_facets)
+            self.invalidateFilter()
+
+    def set_facet_required(self, facet_bits: int, required: bool):
+        """Hides rows missing any of the given facet bits."""
+        updated = (
+            self._required_facets | facet_bits
+            if required
+            else self._required_facets & ~facet_bits
+        )
+        if updated != self._required_facets:
+            self._required_facets = updated
+            self.sourceModel().set_facet_filter(self._excluded_facets, self._required_facets)
+            self.invalidateFilter()
+
+    def accepts_source_row(self, source_row: int) -> bool:
+        return self.filterAcceptsRow(source_row, QModelIndex())
+
+    @property
+    def excluded_facets(self) -> int:
+        return self._excluded_facets
+
+    def is_facet_excluded(self, facet_bits: int) -> bool:
+        return bool(facet_bits) and (self._excluded_facets & facet_bits) == facet_bits
+
+    @property
+    def search_text(self) -> str:
+        return self._search_text
+
+    @property
+    def query_error(self):
+        return self._query_error
+
     def lessThan(self, left, right):
         source = self.sourceModel()
         col = left.column()
         if col == Column.SELECTION:
             left_item = source._data[left.row()]
             right_item = source._data[right.row()]
-            return (left_item in source._selected) < (right_item in source._selected)
+            return source.is_selected(left_item) < source.is_selected(right_item)
         if col == Column.SIZE:
             left_item = source._data[left.row()]
             right_item = source._data[right.row()]
@@ -84,21 +222,17 @@ class DownloadFilterProxyModel(QSortFilterProxyModel):
         return super().lessThan(left, right)
 
     def filterAcceptsRow(self, source_row, source_parent):
-        if not self._search_text:
-            return True
-
         source_model = self.sourceModel()
         if source_model is None:
             return True
 
-        for column in self.FILTER_COLUMNS:
-            index = source_model.index(source_row, column, source_parent)
-            value = source_model.data(index, Qt.ItemDataRole.DisplayRole)
-            if value is None:
-                continue
-            if self._search_text in str(value).lower():
-                return True
-        return False
+        if (self._excluded_facets or self._required_facets) and not source_model.facets_visible(source_row):
+            return False
+
+        if self._query.is_empty():
+            return True
+
+        return self._query.matches(source_model.row_fields(source_row))
 
 
 class DownloadManagerWindow(QtWidgets.QDialog):
@@ -107,6 +241,19 @@ class DownloadManagerWindow(QtWidgets.QDialog):
     COLUMN_VISIBILITY_SETTING = "columnVisibilityV2"
     COLUMN_ORDER_SETTING = "columnOrderV2"
     ALTERNATE_ROWS_SETTING = "alternateRowColors"
+    COLUMN_WIDTHS_SETTING = "columnWidths"
+    STAGED_DELETE_SETTING = "stagedDelete"
+    TRASH_MAX_SIZE_SETTING = "trashMaxSizeGB"
+    TRASH_MAX_AGE_SETTING = "trashMaxAgeDays"
+    IO_DEVICE_CONCURRENCY_SETTING = "ioDeviceConcurrency"
+    INSTALL_READ_AHEAD_SETTING = "installReadAhead"
+    STALL_THRESHOLD_SETTING = "stallThresholdMs"
+    IO_STATUS_INTERVAL_MS = 500
+
+    MAX_COLUMN_WIDTH = 500
+    COLUMN_PADDING = 24
+    # Upper bound on visible rows measured when estimating column widths
+    MAX_SAMPLED_VISIBLE_ROWS = 50
 
     BUTTON_TEXT = {
         "INSTALL": lambda count: f"Install Selected ({count})",
@@ -119,33 +266,67 @@ class DownloadManagerWindow(QtWidgets.QDialog):
     __organizer: mobase.IOrganizer = None
     hash_worker = None
     hash_dialog = None
+    _delete_worker = None
+    _delete_dialog = None
+    _meta_worker = None
+    _meta_dialog = None
+    _purge_worker = None
+    # Empty Trash was confirmed while a policy purge was running; runs when that one finishes
+    _purge_all_pending = False
     _has_resized = False
+    _has_cached_column_widths = False
     _is_refreshing = False
     _refresh_worker = None
+    _refresh_generation = 0
+    _refresh_timer = None
+    _refresh_profiler = None
+    _refresh_memory_mark = None
+    _delete_profiler = None
+    _meta_profiler = None
+    _install_profiler = None
     _has_loaded_data = False
+    _revalidate_after_refresh = False
 
-    def __init__(self, organizer: mobase.IOrganizer, parent=None):
+    def __init__(self, organizer: mobase.IOrganizer, parent=None, model=None):
         try:
             super().__init__(parent)
 
             self.__organizer = organizer
 
-            self._table_model = DownloadManagerTableModel(organizer)
+            shared_scheduler().set_device_limit(int(self._load_number_setting(self.IO_DEVICE_CONCURRENCY_SETTING, 0)))
+            self._table_model = DownloadManagerTableModel(organizer, model)
             self._proxy_model = DownloadFilterProxyModel(self)
             self._proxy_model.setSourceModel(self._table_model)
+            self._table_model.facet_values_changed.connect(self._rebuild_value_facet_menus)  # type: ignore
 
             self._column_visibility = []
             self._column_order = []
+            self._refresh_workers = set()
+            # Re-query and post-install hide results arrive from I/O workers; applied here on the UI thread
+            self._changes_relay = ChangesRelay(self)
+            self._changes_relay.changes_ready.connect(self._on_relayed_changes)  # type: ignore
+            self._memory = MemoryDiagnostics(self._load_bool_setting(MEMORY_DIAGNOSTICS_SETTING, False))
+            self._stall_watchdog = StallWatchdog(
+                int(self._load_number_setting(self.STALL_THRESHOLD_SETTING, 500)), self
+            )
             self._alternate_row_colors = self._load_alternate_row_setting()
 
             self._table_widget = self.create_table_widget()
+            self._group_model = DownloadGroupModel(self._table_model, self)
+            self._tree_widget = self._create_group_tree()
+            self._view_stack = QtWidgets.QStackedWidget(self)
+            self._view_stack.addWidget(self._table_widget)
+            self._view_stack.addWidget(self._tree_widget)
+            self._performance_panel = PerformancePanel(self)
+            self._performance_panel.hide()
 
             self._main_layout = QtWidgets.QVBoxLayout()
             self._controls_widget = self._create_controls_bar()
             self._main_layout.addWidget(self._controls_widget)
             self._secondary_controls = self._create_secondary_controls()
             self._main_layout.addWidget(self._secondary_controls)
-            self._main_layout.addWidget(self._table_widget)
+            self._main_layout.addWidget(self._view_stack)
+            self._main_layout.addWidget(self._performance_panel)
 
             self._install_panel = BulkInstallPanel(self)
             self._install_panel.installation_finished.connect(self._on_install_finished)
@@ -168,6 +349,7 @@ class DownloadManagerWindow(QtWidgets.QDialog):
             self._center_window()
 
             self._table_model.dataChanged.connect(self.update_button_states)
+            self._table_model.dataChanged.connect(self._on_table_selection_changed)
 
             self.setWindowModality(Qt.WindowModality.NonModal)
 
@@ -221,6 +403,14 @@ class DownloadManagerWindow(QtWidgets.QDialog):
 
         layout.addStretch(1)
 
+        # Queue depth of the shared I/O scheduler; only shown while it has work
+        self._io_status_label = QtWidgets.QLabel(self)
+        self._io_status_label.hide()
+        layout.addWidget(self._io_status_label)
+        self._io_status_timer = QTimer(self)
+        self._io_status_timer.setInterval(self.IO_STATUS_INTERVAL_MS)
+        self._io_status_timer.timeout.connect(self._update_io_status)  # type: ignore
+
         controls.setLayout(layout)
         return controls
 
@@ -231,14 +421,22 @@ class DownloadManagerWindow(QtWidgets.QDialog):
         layout.setSpacing(8)
 
         layout.addWidget(self.create_hide_installed_checkbox())
+        layout.addWidget(self._create_facet_button())
         layout.addStretch(1)
+        layout.addWidget(QtWidgets.QLabel("Group by:", self))
+        layout.addWidget(self._create_group_by_combo())
 
         controls.setLayout(layout)
         return controls
 
     def _create_search_input(self):
         search = QtWidgets.QLineEdit(self)
-        search.setPlaceholderText("Search filename or mod name...")
+        search.setPlaceholderText("Search filename or mod name, or filter e.g. size>2GB installed:no age>365d")
+        search.setToolTip(
+            "Plain text matches mod name and filename. Filters: size>2GB, age>365d, "
+            "installed:no, hidden:yes, meta:no, mod:123, file:456, repo:!Nexus, game:SkyrimSE, "
+            "name:, modname:, filename:, version:. Prefix any term with - to negate it."
+        )
         search.textChanged.connect(self._on_search_text_changed)  # type: ignore
         search.addAction(
             self._custom_icon("icon_search.png"),
@@ -270,6 +468,11 @@ class DownloadManagerWindow(QtWidgets.QDialog):
         action_not_installed.triggered.connect(self._table_model.select_not_installed)  # type: ignore
         menu.addAction(action_not_installed)
 
+        action_matching = QAction("Select Matching Search", self)
+        action_matching.setToolTip("Selects every download matching the current search query")
+        action_matching.triggered.connect(self._select_matching_search)  # type: ignore
+        menu.addAction(action_matching)
+
         action_all = QAction("Select All", self)
         action_all.triggered.connect(self._table_model.select_all)  # type: ignore
         menu.addAction(action_all)
@@ -308,6 +511,25 @@ class DownloadManagerWindow(QtWidgets.QDialog):
         self._delete_action.triggered.connect(self.delete_selected)  # type: ignore
         menu.addAction(self._delete_action)
 
+        menu.addSeparator()
+
+        self._undo_delete_action = QAction("Undo Last Delete", self)
+        self._undo_delete_action.triggered.connect(self.undo_last_delete)  # type: ignore
+        self._undo_delete_action.setEnabled(False)
+        menu.addAction(self._undo_delete_action)
+
+        empty_trash_action = QAction("Empty Trash", self)
+        empty_trash_action.setToolTip("Permanently delete everything the staged delete has moved to the trash")
+        empty_trash_action.triggered.connect(self.empty_trash)  # type: ignore
+        menu.addAction(empty_trash_action)
+
+        menu.addSeparator()
+
+        performance_action = QAction("Show Performance Panel", self)
+        performance_action.setCheckable(True)
+        performance_action.toggled.connect(self._performance_panel.setVisible)  # type: ignore
+        menu.addAction(performance_action)
+
         for action in (
             self._install_action,
             self._requery_action,
@@ -326,10 +548,118 @@ class DownloadManagerWindow(QtWidgets.QDialog):
         return hide_installed_checkbox
 
     def hide_install_state_changed(self, checked: Qt.CheckState):
-        self._table_model.toggle_show_installed(
-            checked == CHECKED_STATE
+        self._apply_facet_change(
+            lambda: self._proxy_model.set_facet_excluded(
+                FACET_INSTALLED, checked == CHECKED_STATE
+            )
         )
-        self._proxy_model.invalidateFilter()
+
+    def _create_facet_button(self):
+        button = QtWidgets.QToolButton(self)
+        button.setText("Filters")
+        button.setPopupMode(QtWidgets.QToolButton.ToolButtonPopupMode.InstantPopup)
+        button.setStyleSheet(self._dropdown_button_style())
+
+        menu = QMenu(button)
+
+        hidden_action = QAction("Hide Hidden Files", self)
+        hidden_action.setCheckable(True)
+        hidden_action.toggled.connect(  # type: ignore
+            lambda checked: self._apply_facet_change(
+                lambda: self._proxy_model.set_facet_excluded(FACET_HIDDEN, checked)
+            )
+        )
+        menu.addAction(hidden_action)
+
+        meta_action = QAction("Hide Files Without Meta", self)
+        meta_action.setCheckable(True)
+        meta_action.toggled.connect(  # type: ignore
+            lambda checked: self._apply_facet_change(
+                lambda: self._proxy_model.set_facet_required(FACET_HAS_META, checked)
+            )
+        )
+        menu.addAction(meta_action)
+
+        menu.addSeparator()
+        self._repository_facet_menu = menu.addMenu("Repository")
+        self._game_facet_menu = menu.addMenu("Game")
+
+        button.setMenu(menu)
+        return button
+
+    def _rebuild_value_facet_menus(self):
+        facet_index = self._table_model.facet_index
+        # A repository or game no download has any more takes its filter with it, freeing the bit for reuse
+        released = self._proxy_model.excluded_facets & VALUE_BITS & ~facet_index.assigned_bits()
+        if released:
+            self._proxy_model.set_facet_excluded(released, False)
+        for facet_menu, values, bit_for in (
+            (self._repository_facet_menu, facet_index.repositories(), facet_index.repository_bit),
+            (self._game_facet_menu, facet_index.games(), facet_index.game_bit),
+        ):
+            facet_menu.clear()
+            for value in values:
+                bit = bit_for(value)
+                action = QAction(value, facet_menu)
+                action.setCheckable(True)
+                action.setChecked(not self._proxy_model.is_facet_excluded(bit))
+                action.toggled.connect(  # type: ignore
+                    lambda checked, facet_bit=bit: self._apply_facet_change(
+                        lambda: self._proxy_model.set_facet_excluded(facet_bit, not checked)
+                    )
+                )
+                facet_menu.addAction(action)
+
+    def _create_group_by_combo(self):
+        combo = QtWidgets.QComboBox(self)
+        combo.addItem("None (flat table)", None)
+        combo.addItem("Duplicate name", GroupBy.DUPLICATE_KEY)
+        combo.addItem("Nexus mod ID", GroupBy.MOD_ID)
+        combo.currentIndexChanged.connect(self._on_group_by_changed)  # type: ignore
+        self._group_by_combo = combo
+        return combo
+
+    def _create_group_tree(self):
+        tree = create_basic_tree_widget(self._alternate_row_colors)
+        tree.setModel(self._group_model)
+        return tree
+
+    def _current_group_by(self):
+        return self._group_by_combo.currentData()
+
+    def _on_group_by_changed(self, _index: int):
+        if self._current_group_by() is None:
+            self._view_stack.setCurrentWidget(self._table_widget)
+            return
+        self._refresh_group_view()
+        self._view_stack.setCurrentWidget(self._tree_widget)
+
+    def _refresh_group_view(self):
+        """Regroups the rows the flat view would show (search and facets applied)."""
+        group_by = self._current_group_by()
+        if group_by is None:
+            return
+        data = self._table_model._data
+        accepts = self._proxy_model.accepts_source_row
+        entries = [entry for row, entry in enumerate(data) if accepts(row)]
+        self._group_model.set_entries(entries, group_by)
+        if self._tree_widget.header().sectionSize(0) < 200:
+            self._tree_widget.header().resizeSection(0, 350)
+
+    def _on_table_selection_changed(self, *_):
+        if self._view_stack.currentWidget() is self._tree_widget:
+            self._tree_widget.viewport().update()
+
+    def _apply_facet_change(self, change):
+        """Applies a facet filter change, keeping the top visible row in view."""
+        top_left = self._table_widget.viewport().rect().topLeft()
+        anchor = self._proxy_model.mapToSource(self._table_widget.indexAt(top_left))
+        change()
+        if anchor.isValid():
+            proxy_index = self._proxy_model.mapFromSource(anchor)
+            if proxy_index.isValid():
+                self._table_widget.scrollTo(proxy_index, QtWidgets.QAbstractItemView.ScrollHint.PositionAtTop)
+        self._refresh_group_view()
 
     def create_refresh_button(self):
         button = QtWidgets.QPushButton("Refresh", self)
@@ -342,11 +672,32 @@ class DownloadManagerWindow(QtWidgets.QDialog):
 
     def _on_search_text_changed(self, text: str):
         self._proxy_model.set_search_text(text)
+        error = self._proxy_model.query_error
+        self._search_input.setStyleSheet("QLineEdit { color: #c0392b; }" if error else "")
+        self._search_input.setStatusTip(error or "")
+        self._refresh_group_view()
+
+    def _select_matching_search(self):
+        if self._proxy_model.query_error:
+            show_error(self._proxy_model.query_error, "Invalid search query")
+            return
+        self._table_model.select_matching(self._proxy_model.search_text)
 
     # region UI change handler
+    def _update_io_status(self):
+        stats = shared_scheduler().stats()
+        if not stats.total_queued and not stats.total_running:
+            self._io_status_label.hide()
+            return
+        by_class = ", ".join(
+            f"{priority.name.lower()} {count}" for priority, count in stats.queued.items() if count
+        )
+        self._io_status_label.setText(f"I/O: {stats.total_running} running, {stats.total_queued} queued")
+        self._io_status_label.setToolTip(f"Queued by priority: {by_class or 'none'}")
+        self._io_status_label.show()
+
     def update_button_states(self):
-        selected = self._table_model.get_selected()
-        self._toggle_button_operations(len(selected))
+        self._toggle_button_operations(self._table_model.selected_count())
 
     def _toggle_button_operations(self, selected_count):
         operations_enabled = selected_count > 0
@@ -385,81 +736,344 @@ class DownloadManagerWindow(QtWidgets.QDialog):
 
         logger.debug("install_selected: starting installation panel")
         self._table_model.select_none()
+        self._start_install_run(selected)
+
+    def _start_install_run(self, entries):
+        self._install_profiler = self._profiler("install")
+        self._install_profiler.start()
         self._install_panel.start_installation(
-            selected,
-            self._table_model._model.install_mod_safe
+            entries,
+            self._install_one,
+            self._load_bool_setting(self.INSTALL_READ_AHEAD_SETTING, True),
+            InstallJournal(self.__organizer.downloadsPath()),
+        )
+
+    def _offer_install_resume(self):
+        """Offers to continue a bulk install that MO2 closed or crashed in the middle of."""
+        journal = InstallJournal(self.__organizer.downloadsPath())
+        pending = journal.load_pending()
+        if pending is None or self._install_panel.is_running():
+            return
+        model = self._table_model._model
+        # The scan that just finished already has these entries; nothing is re-read or re-hashed
+        entries = [entry for entry in map(model.get, pending.remaining) if entry is not None]
+        logger.debug(
+            "window._offer_install_resume: run %s has %d pending (%d still present), %d done",
+            pending.run_id, len(pending.remaining), len(entries), pending.completed,
         )
+        if not entries:
+            journal.finish()
+            return
+        answer = QtWidgets.QMessageBox.question(
+            self,
+            "Resume bulk install?",
+            f"A bulk install was interrupted after {pending.completed} mod(s). "
+            f"Resume with the remaining {len(entries)}?",
+        )
+        if answer == QtWidgets.QMessageBox.StandardButton.Yes:
+            self._start_install_run(entries)
+        else:
+            journal.finish()
+
+    def _install_one(self, mod) -> bool:
+        model = self._table_model._model
+        changes = model.install_mod_safe(mod)
+        self._table_model.apply_changes(changes)
+        if changes.failed:
+            return False
+        # Hiding the installed download is a meta write; the row is updated when it lands
+        for entry in changes.updated:
+            self._changes_relay.watch(model.hide_installed(entry))
+        return True
+
+    def _on_relayed_changes(self, changes: EntryChanges):
+        self._table_model.apply_changes(changes)
+        if changes.failed:
+            logger.warning("window: meta update failed for %s", ", ".join(entry.filename for entry in changes.failed))
+        self._refresh_group_view()
+        self.update_button_states()
 
     def _on_install_finished(self):
-        logger.debug("_on_install_finished: refreshing data")
-        self.refresh_data()
+        logger.debug("_on_install_finished: updating views")
+        self._stop_profiler("_install_profiler")
+        self._refresh_group_view()
+        self.update_button_states()
 
     def requery_selected(self):
         if not self._validate_nexus_api_key():
             return
 
-        to_requery = self._table_model.get_selected().copy() # don't use selected directly, the model will change it
-        for item in to_requery:
-            self.hash_dialog = HashProgressDialog(self) # type: ignore
-            self.hash_worker = HashWorker(item)
-            self.hash_worker.progress_updated.connect(self.hash_dialog.update_progress)
-            self.hash_worker.hash_computed.connect(self._on_hash_complete)
+        to_requery = self._table_model.get_selected()
+        with self._profiler("requery"), self._memory.measure("requery"):
+            for item in to_requery:
+                self.hash_dialog = HashProgressDialog(self) # type: ignore
+                self.hash_worker = HashWorker(item)
+                self.hash_worker.progress_updated.connect(self.hash_dialog.update_progress)
+                self.hash_worker.hash_computed.connect(self._on_hash_complete)
 
-            self.hash_worker.start()
-            self.hash_dialog.exec()
+                self.hash_worker.start()
+                self.hash_dialog.exec()
 
     def _on_hash_complete(self, result: HashResult):
         self.hash_dialog.accept()
-        self._table_model.requery(result.mod, result.md5_hash)
+        self._changes_relay.watch(self._table_model.requery(result.mod, result.md5_hash))
         print(result)
 
     def delete_selected(self):
-        logger.debug("window.delete_selected: starting")
+        entries = self._table_model.get_selected()
+        logger.debug("window.delete_selected: starting with %d items", len(entries))
+        if not entries or self._delete_worker is not None:
+            return
         self._table_widget.selectionModel().clearSelection()
-        self._table_model.delete_selected()
-        logger.debug("window.delete_selected: table_model.delete_selected complete, calling refresh_data")
-        self.refresh_data()
-        logger.debug("window.delete_selected: refresh_data called")
+        self._table_model.select_none()
+
+        model = self._table_model._model
+        trash_batch = None
+        if self._load_bool_setting(self.STAGED_DELETE_SETTING, False):
+            try:
+                trash_batch = model.trash.begin_batch()
+            except OSError as exc:
+                logger.warning("window.delete_selected: trash unavailable, deleting directly: %s", exc)
+
+        self._delete_profiler = self._profiler("delete")
+        self._delete_profiler.start()
+        self._delete_dialog = BulkProgressDialog("🗑️ Deleting Downloads...", len(entries), self)
+        self._delete_worker = DeleteWorker(model, entries, trash_batch)
+        self._delete_worker.progress_updated.connect(self._delete_dialog.update_progress)
+        self._delete_worker.entries_deleted.connect(self._on_entries_deleted)
+        self._delete_worker.delete_finished.connect(self._on_delete_finished)
+        self._delete_dialog.cancel_requested.connect(self._delete_worker.cancel)
+        self._delete_worker.start()
+        self._delete_dialog.open()
+
+    def _on_entries_deleted(self, entry_ids):
+        self._table_model.apply_changes(EntryChanges(removed=entry_ids))
+        self.update_button_states()
+
+    def _on_delete_finished(self, result: DeleteResult):
+        logger.debug(
+            "window._on_delete_finished: deleted=%d failed=%d cancelled=%s",
+            len(result.deleted), len(result.failed), result.cancelled,
+        )
+        self._delete_worker.wait()
+        self._delete_worker = None
+        self._stop_profiler("_delete_profiler")
+        self._delete_dialog.finish()
+        self._delete_dialog = None
+        self._refresh_group_view()
+        if result.trash_batch is not None and result.deleted:
+            self._set_undo_available(len(result.deleted))
+            self._start_trash_purge()
+            # The new batch is inside its grace period now; check the size limit again once it isn't
+            QTimer.singleShot((TRASH_GRACE_SECONDS + 1) * 1000, self._start_trash_purge)
+            QtWidgets.QMessageBox.information(
+                self,
+                "Moved to trash",
+                f"Moved {len(result.deleted)} download(s) ({sizeof_fmt(result.trash_batch.size)}) to the "
+                "Download Manager trash; no disk space is freed until it's emptied.\n\n"
+                "Actions > Undo Last Delete puts them back. The trash is purged automatically once it's "
+                "over its size or age limit, or right away with Actions > Empty Trash.",
+            )
+        if result.failed:
+            names = "\n".join(entry.filename for entry in result.failed[:20])
+            show_error(names, f"Failed to delete {len(result.failed)} download(s)")
+
+    def _set_undo_available(self, count: int):
+        self._undo_delete_action.setEnabled(count > 0)
+        self._undo_delete_action.setText(f"Undo Last Delete ({count})" if count else "Undo Last Delete")
+
+    def undo_last_delete(self):
+        model = self._table_model._model
+        batch = model.trash.latest_batch()
+        if batch is None:
+            self._set_undo_available(0)
+            return
+        changes = model.restore_trash_batch(batch)
+        logger.debug("window.undo_last_delete: restored %d of %d", len(changes.added), len(batch.records))
+        self._table_model.apply_changes(changes)
+        self._refresh_group_view()
+        latest = model.trash.latest_batch()
+        self._set_undo_available(len(latest.records) if latest else 0)
+
+    def empty_trash(self):
+        confirm = QtWidgets.QMessageBox.question(
+            self,
+            "Empty trash?",
+            "Permanently delete all downloads in the Download Manager trash? This can't be undone.",
+        )
+        if confirm != QtWidgets.QMessageBox.StandardButton.Yes:
+            return
+        # Undo stays available until the purge has actually emptied the trash (see _on_purge_finished)
+        self._start_trash_purge(purge_all=True)
+
+    def _start_trash_purge(self, purge_all: bool = False):
+        """Applies the trash size/age policy on a lowest-priority background thread."""
+        if self._purge_worker is not None:
+            self._purge_all_pending = self._purge_all_pending or purge_all
+            return
+        max_bytes = self._load_number_setting(self.TRASH_MAX_SIZE_SETTING, 20) * 1024 ** 3
+        max_age_seconds = self._load_number_setting(self.TRASH_MAX_AGE_SETTING, 7) * 86400
+        self._purge_worker = TrashPurgeWorker(
+            self._table_model._model.trash, max_bytes, max_age_seconds, purge_all
+        )
+        self._purge_worker.purge_finished.connect(self._on_purge_finished)
+        self._purge_worker.start(QThread.Priority.LowestPriority)
+
+    def _on_purge_finished(self, freed: float):
+        logger.debug("window._on_purge_finished: freed %s", sizeof_fmt(freed))
+        self._purge_worker.wait()
+        self._purge_worker = None
+        latest = self._table_model._model.trash.latest_batch()
+        self._set_undo_available(len(latest.records) if latest else 0)
+        if self._purge_all_pending:
+            self._purge_all_pending = False
+            self._start_trash_purge(purge_all=True)
 
     def hide_selected(self):
+        if self._meta_worker is not None:
+            return
+        model = self._table_model._model
+        meta_updates, skipped = model.hide_updates(self._table_model.get_selected())
+        if skipped:
+            logger.debug("window.hide_selected: %d item(s) have no meta file to hide", len(skipped))
+        if not meta_updates:
+            return
         self._table_widget.selectionModel().clearSelection()
-        self._table_model.hide_selected()
-        self.refresh_data()
+        self._table_model.select_none()
+
+        self._meta_profiler = self._profiler("hide")
+        self._meta_profiler.start()
+        self._meta_dialog = BulkProgressDialog("🙈 Hiding Downloads...", len(meta_updates), self)
+        self._meta_worker = MetaUpdateWorker(model.meta_writer, meta_updates)
+        self._meta_worker.progress_updated.connect(self._meta_dialog.update_progress)
+        self._meta_worker.entries_updated.connect(self._on_entries_updated)
+        self._meta_worker.update_finished.connect(self._on_meta_update_finished)
+        self._meta_worker.start()
+        self._meta_dialog.open()
+
+    def _on_entries_updated(self, entries):
+        self._table_model.apply_changes(EntryChanges(updated=entries))
+
+    def _on_meta_update_finished(self, succeeded: int, failed: int):
+        logger.debug("window._on_meta_update_finished: ok=%d failed=%d", succeeded, failed)
+        self._meta_worker.wait()
+        self._meta_worker = None
+        self._stop_profiler("_meta_profiler")
+        self._meta_dialog.finish()
+        self._meta_dialog = None
+        self._refresh_group_view()
+        self.update_button_states()
+        if failed:
+            show_error("See the log for details.", f"Failed to update {failed} download(s)")
 
     def refresh_data(self):
+        """Starts a rescan. A refresh that is already running is cancelled and superseded."""
+        self._start_refresh()
+
+    def _start_refresh(self, from_catalog: bool = False):
         logger.debug("refresh_data: starting")
         if self._is_refreshing:
-            logger.debug("refresh_data: already refreshing, returning")
-            return
+            logger.debug("refresh_data: superseding generation %d", self._refresh_generation)
+            self._cancel_refresh()
         self._is_refreshing = True
+        self._refresh_generation += 1
         self._refresh_button.setEnabled(False)
 
         self._loading_overlay.set_message("Refreshing Downloads...")
-        self._loading_overlay.set_sub_message("Scanning download folder...")
+        if not from_catalog:
+            self._loading_overlay.set_sub_message("Scanning download folder...")
         self._loading_overlay.show_overlay()
+        # The catalog is as old as the last scan, so catch up with the folder once it's shown
+        self._revalidate_after_refresh = from_catalog
 
         logger.debug("refresh_data: starting background worker")
-        self._refresh_worker = RefreshWorker(self._table_model._model)
-        self._refresh_worker.finished.connect(self._on_refresh_complete)  # type: ignore
-        self._refresh_worker.start()
+        self._refresh_profiler = self._profiler("refresh")
+        self._refresh_profiler.start()
+        self._refresh_timer = PhaseTimer("refresh")
+        self._refresh_memory_mark = self._memory.begin("refresh")
+        worker = RefreshWorker(self._table_model._model, self._refresh_generation, self._refresh_timer, from_catalog)
+        worker.refresh_finished.connect(self._on_refresh_complete)  # type: ignore
+        worker.finished.connect(lambda: self._on_refresh_worker_stopped(worker))  # type: ignore
+        self._refresh_worker = worker
+        self._refresh_workers.add(worker)
+        worker.start()
         logger.debug("refresh_data: background worker started")
 
-    def _on_refresh_complete(self, data):
-        logger.debug("_on_refresh_complete: received %d items", len(data) if data else 0)
-        self._table_model.init_data(data)
+    def _start_revalidation(self):
+        self._is_refreshing = True
+        worker = RevalidateWorker(self._table_model._model, self._refresh_generation)
+        worker.revalidate_finished.connect(self._on_revalidate_complete)  # type: ignore
+        worker.finished.connect(lambda: self._on_refresh_worker_stopped(worker))  # type: ignore
+        self._refresh_worker = worker
+        self._refresh_workers.add(worker)
+        worker.start()
+
+    def _on_revalidate_complete(self, generation: int, changes: EntryChanges):
+        if generation != self._refresh_generation:
+            logger.debug("_on_revalidate_complete: dropping stale generation %d", generation)
+            return
+        self._is_refreshing = False
+        self._table_model.apply_changes(changes)
+        if changes.is_empty():
+            return
+        self._refresh_group_view()
+        self.update_button_states()
+
+    def _cancel_refresh(self):
+        if self._refresh_worker is None:
+            return
+        # The worker stays referenced in _refresh_workers until its thread has actually stopped
+        self._refresh_worker.cancel()
+        self._refresh_worker = None
+        self._is_refreshing = False
+        self._refresh_timer = None
+        self._refresh_memory_mark = None
+        self._stop_profiler("_refresh_profiler")
+
+    def _on_refresh_worker_stopped(self, worker: RefreshWorker):
+        self._refresh_workers.discard(worker)
+        if worker is self._refresh_worker:
+            self._refresh_worker = None
+
+    def _on_refresh_complete(self, generation: int, snapshot: DownloadSnapshot):
+        if generation != self._refresh_generation:
+            logger.debug("_on_refresh_complete: dropping stale generation %d", generation)
+            return
+        logger.debug("_on_refresh_complete: received %d items", len(snapshot.entries))
+        self._table_model._model.publish(snapshot)
+        timer = self._refresh_timer or PhaseTimer("refresh")
+        table_mark = self._memory.begin("table init")
+        with timer.phase(PHASE_TABLE_INIT):
+            self._table_model.adopt_snapshot(snapshot)
+        self._memory.end(table_mark, len(snapshot.entries))
+        self._rebuild_value_facet_menus()
+        self._refresh_group_view()
         logger.debug("_on_refresh_complete: init_data complete")
+        if not self._has_loaded_data:
+            self._start_trash_purge()
+            QTimer.singleShot(0, self._offer_install_resume)
         self._loading_overlay.hide_overlay()
         if not self._has_resized:
             logger.debug("_on_refresh_complete: resizing window")
-            self.resize_window()
+            with timer.phase(PHASE_RESIZE):
+                self.resize_window()
             self._has_resized = True
         logger.debug("_on_refresh_complete: reapplying sort")
-        self.reapply_sort()
+        with timer.phase(PHASE_SORT):
+            self.reapply_sort()
         self.update_button_states()
         self._refresh_button.setEnabled(True)
         self._is_refreshing = False
         self._has_loaded_data = True
+        self._refresh_timer = None
+        self._performance_panel.show_record(timer.finish())
+        self._stop_profiler("_refresh_profiler")
+        self._memory.end(self._refresh_memory_mark, len(snapshot.entries))
+        self._refresh_memory_mark = None
         logger.debug("_on_refresh_complete: complete")
+        if self._revalidate_after_refresh:
+            self._revalidate_after_refresh = False
+            self._start_revalidation()
 
     # endregion
 
@@ -506,6 +1120,12 @@ class DownloadManagerWindow(QtWidgets.QDialog):
             table.setColumnHidden(column, not initial_state)
         header.sectionMoved.connect(self._handle_section_moved)
 
+        cached_widths = self._load_column_widths(column_count)
+        if cached_widths:
+            for column, width in enumerate(cached_widths):
+                header.resizeSection(column, width)
+            self._has_cached_column_widths = True
+
     def _handle_column_toggle(
         self, table: QtWidgets.QTableView, column: int, checked: bool
     ):
@@ -604,6 +1224,53 @@ class DownloadManagerWindow(QtWidgets.QDialog):
 
         return filtered_order
 
+    def _load_column_widths(self, column_count: int):
+        if not self.__organizer:
+            return []
+
+        try:
+            stored_value = self.__organizer.pluginSetting(
+                "Download Manager", self.COLUMN_WIDTHS_SETTING
+            )
+        except Exception:
+            return []
+
+        if not stored_value:
+            return []
+
+        parsed_value = None
+        if isinstance(stored_value, list):
+            parsed_value = stored_value
+        elif isinstance(stored_value, str):
+            try:
+                parsed_value = json.loads(stored_value)
+            except json.JSONDecodeError:
+                return []
+
+        if not isinstance(parsed_value, list) or len(parsed_value) != column_count:
+            return []
+        if not all(isinstance(value, int) and value > 0 for value in parsed_value):
+            return []
+        return parsed_value
+
+    def _save_column_widths(self):
+        if not self.__organizer:
+            return
+        header = self._table_widget.horizontalHeader()
+        # Hidden columns report 0, fall back to the default width for those
+        widths = [
+            header.sectionSize(column) or header.defaultSectionSize()
+            for column in range(header.count())
+        ]
+        try:
+            self.__organizer.setPluginSetting(
+                "Download Manager",
+                self.COLUMN_WIDTHS_SETTING,
+                json.dumps(widths),
+            )
+        except Exception:
+            pass
+
     def _save_column_visibility(self):
         if not self.__organizer:
             return
@@ -641,6 +1308,37 @@ class DownloadManagerWindow(QtWidgets.QDialog):
             return True
         return self._coerce_bool(stored_value, True)
 
+    def _profiler(self, name: str) -> Profiler:
+        return Profiler(name, self._load_bool_setting(PROFILING_SETTING, False))
+
+    def _stop_profiler(self, attribute: str):
+        profiler = getattr(self, attribute)
+        if profiler is not None:
+            profiler.stop()
+            setattr(self, attribute, None)
+
+    def _load_bool_setting(self, key: str, default: bool) -> bool:
+        if not self.__organizer:
+            return default
+        try:
+            stored_value = self.__organizer.pluginSetting("Download Manager", key)
+        except Exception:
+            return default
+        if stored_value in (None, ""):
+            return default
+        return self._coerce_bool(stored_value, default)
+
+    def _load_number_setting(self, key: str, default: float) -> float:
+        if not self.__organizer:
+            return default
+        try:
+            stored_value = self.__organizer.pluginSetting("Download Manager", key)
+            return float(stored_value) if stored_value not in (None, "") else default
+        except (TypeError, ValueError):
+            return default
+        except Exception:
+            return default
+
     @staticmethod
     def _coerce_bool(value, default):
         if isinstance(value, bool):
@@ -652,32 +1350,12 @@ class DownloadManagerWindow(QtWidgets.QDialog):
         return default
 
     def resize_window(self):
-        max_column_width = 500
         padding = 50
 
-        # Resize columns to contents
-        resize_mode = QtWidgets.QHeaderView.ResizeMode.ResizeToContents
-        header = self._table_widget.horizontalHeader()
-        header.setSectionResizeMode(resize_mode)
-
-        # Adjust each column so they don't go over max width
-        for column in range(self._table_widget.model().columnCount()):
-            header.setSectionResizeMode(column, resize_mode)
-
-            header_width = header.sectionSize(column)
-            content_width = self._table_widget.columnWidth(column)
-
-            actual_width = max(header_width, content_width)
-
-            if actual_width > max_column_width:
-                header.setSectionResizeMode(
-                    column, QtWidgets.QHeaderView.ResizeMode.Interactive
-                )
-                header.resizeSection(column, max_column_width)
-            # After the initial sizing pass, leave the column in interactive mode
-            header.setSectionResizeMode(
-                column, QtWidgets.QHeaderView.ResizeMode.Interactive
-            )
+        if not self._has_cached_column_widths:
+            self._autosize_columns()
+            self._save_column_widths()
+            self._has_cached_column_widths = True
 
         controls_size = self._controls_widget.sizeHint()
         table_size = self._table_widget.sizeHint()
@@ -694,6 +1372,54 @@ class DownloadManagerWindow(QtWidgets.QDialog):
         self.resize(new_width, new_height)
         self._center_window()
 
+    def _autosize_columns(self):
+        """
+        Estimates column widths from a bounded sample (header text, the rows
+        currently in view and the longest strings per column) using font
+        metrics, instead of ResizeToContents which measures every row.
+        """
+        table = self._table_widget
+        header = table.horizontalHeader()
+        cell_metrics = QFontMetrics(table.font())
+        header_metrics = QFontMetrics(header.font())
+
+        first_row = max(table.rowAt(0), 0)
+        visible_rows = range(
+            first_row,
+            min(self._proxy_model.rowCount(), first_row + self.MAX_SAMPLED_VISIBLE_ROWS),
+        )
+
+        for column in range(self._table_model.columnCount()):
+            if column == Column.SELECTION:
+                indicator = QApplication.style().pixelMetric(QStyle.PixelMetric.PM_IndicatorWidth)
+                header.resizeSection(column, indicator + self.COLUMN_PADDING)
+                continue
+
+            samples = self._table_model.column_width_samples(column)
+            width = header_metrics.horizontalAdvance(samples[0])
+            for text in samples[1:]:
+                width = max(width, cell_metrics.horizontalAdvance(text))
+            for row in visible_rows:
+                value = self._proxy_model.index(row, column).data(Qt.ItemDataRole.DisplayRole)
+                if value is not None:
+                    width = max(width, cell_metrics.horizontalAdvance(str(value)))
+
+            header.resizeSection(column, min(width + self.COLUMN_PADDING, self.MAX_COLUMN_WIDTH))
+
+    def hideEvent(self, event):
+        """Persist column widths so the next first show doesn't need to measure anything."""
+        self._io_status_timer.stop()
+        self._stall_watchdog.stop()
+        if self._has_cached_column_widths:
+            self._save_column_widths()
+        if self._is_refreshing:
+            # Don't keep scanning for a window nobody is looking at
+            self._cancel_refresh()
+            self._refresh_generation += 1
+            self._loading_overlay.hide_overlay()
+            self._refresh_button.setEnabled(True)
+        super().hideEvent(event)
+
     def _center_window(self):
         screen = QApplication.primaryScreen().availableGeometry()
         this_window = self.frameGeometry()
@@ -828,11 +1554,23 @@ class DownloadManagerWindow(QtWidgets.QDialog):
     def showEvent(self, event):
         """Called when window is shown. Auto-refresh if no data loaded yet."""
         super().showEvent(event)
+        self._io_status_timer.start()
+        self._stall_watchdog.start()
         # Auto-refresh on first show if we haven't loaded data yet
         if not self._has_loaded_data and not self._is_refreshing:
+            model = self._table_model._model
+            snapshot = model.snapshot
+            if snapshot.generation:
+                # Pre-warmed in the background: show it now, then catch up with what changed since
+                self._on_refresh_complete(self._refresh_generation, snapshot)
+                self._start_revalidation()
+                return
             self._loading_overlay.set_message("Loading Downloads...")
-            self._loading_overlay.set_sub_message("First launch - scanning download folder...")
-            self.refresh_data()
+            if model.catalog is not None:
+                self._loading_overlay.set_sub_message("Reading the download catalog...")
+            else:
+                self._loading_overlay.set_sub_message("First launch - scanning download folder...")
+            self._start_refresh(from_catalog=model.catalog is not None)
 
     def resizeEvent(self, event):
         """Ensure loading overlay covers the window when resized."""
@@ -0,0 +1,204 @@
+import json
+import os
+import shutil
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import List, Union
+
+from .download_entry import DownloadEntry
+from .util import logger
+
+try:
+    from PyQt6.QtCore import QThread, pyqtSignal
+except ImportError:
+    from PyQt5.QtCore import QThread, pyqtSignal
+
+TRASH_DIR_NAME = ".download_manager_trash"
+MANIFEST_NAME = "manifest.json"
+
+_records_lock = threading.Lock()
+
+# The newest batches are never purged for size reasons before this many seconds, so undo stays possible
+TRASH_GRACE_SECONDS = 600
+
+
+@dataclass
+class TrashRecord:
+    entry_id: str
+    archive_path: str
+    staged_archive_path: str
+    meta_path: Union[str, None]
+    staged_meta_path: Union[str, None]
+    size: float
+
+
+@dataclass
+class TrashBatch:
+    batch_id: str
+    created: float
+    records: List[TrashRecord] = field(default_factory=list)
+
+    @property
+    def size(self) -> float:
+        return sum(record.size for record in self.records)
+
+
+class DownloadTrash:
+    """
+    Staging area for deletes inside the downloads folder. Staging is a rename
+    on the same volume, so it is a metadata-only operation even for huge
+    archives; the real deletion happens later in purge(). MO2 and the folder
+    scan only look at files in the top level of the downloads folder, so the
+    trash directory is invisible to both.
+    """
+
+    def __init__(self, downloads_path: Union[str, Path]):
+        self._root = Path(downloads_path) / TRASH_DIR_NAME
+
+    @property
+    def root(self) -> Path:
+        return self._root
+
+    def begin_batch(self) -> TrashBatch:
+        batch_id = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        (self._root / batch_id).mkdir(parents=True, exist_ok=True)
+        return TrashBatch(batch_id=batch_id, created=time.time())
+
+    def stage(self, batch: TrashBatch, entry: DownloadEntry) -> bool:
+        """Moves an entry's archive and meta file into the batch folder. Safe to call from worker threads."""
+        batch_dir = self._root / batch.batch_id
+        # Prefix with the entry id so same-named archives from different folders can't collide
+        staged_archive = batch_dir / f"{entry.entry_id}_{entry.raw_file_path.name}"
+        try:
+            os.rename(entry.raw_file_path, staged_archive)
+        except OSError as exc:
+            logger.error("Failed to stage %s for deletion: %s", entry.raw_file_path, exc)
+            return False
+
+        staged_meta = None
+        meta_path = entry.raw_meta_path
+        if meta_path is not None and meta_path.is_file():
+            staged_meta = batch_dir / f"{entry.entry_id}_{meta_path.name}"
+            try:
+                os.rename(meta_path, staged_meta)
+            except OSError as exc:
+                logger.warning("Failed to stage meta %s: %s", meta_path, exc)
+                staged_meta = None
+
+        record = TrashRecord(
+            entry_id=entry.entry_id,
+            archive_path=str(entry.raw_file_path),
+            staged_archive_path=str(staged_archive),
+            meta_path=str(meta_path) if staged_meta else None,
+            staged_meta_path=str(staged_meta) if staged_meta else None,
+            size=entry.file_size,
+        )
+        with _records_lock:
+            batch.records.append(record)
+        return True
+
+    def commit_batch(self, batch: TrashBatch):
+        batch_dir = self._root / batch.batch_id
+        if not batch.records:
+            shutil.rmtree(batch_dir, ignore_errors=True)
+            return
+        manifest = {"created": batch.created, "records": [asdict(record) for record in batch.records]}
+        with (batch_dir / MANIFEST_NAME).open("w", encoding="utf-8") as handle:
+            json.dump(manifest, handle)
+
+    def batches(self) -> List[TrashBatch]:
+        """Committed batches, oldest first."""
+        if not self._root.is_dir():
+            return []
+        found = []
+        for batch_dir in sorted(self._root.iterdir()):
+            manifest_path = batch_dir / MANIFEST_NAME
+            if not manifest_path.is_file():
+                continue
+            try:
+                with manifest_path.open("r", encoding="utf-8") as handle:
+                    manifest = json.load(handle)
+                records = [TrashRecord(**record) for record in manifest["records"]]
+            except (OSError, ValueError, KeyError, TypeError) as exc:
+                logger.warning("Ignoring unreadable trash manifest %s: %s", manifest_path, exc)
+                continue
+            found.append(TrashBatch(batch_id=batch_dir.name, created=manifest.get("created", 0), records=records))
+        return found
+
+    def latest_batch(self) -> Union[TrashBatch, None]:
+        batches = self.batches()
+        return batches[-1] if batches else None
+
+    def restore(self, batch: TrashBatch) -> List[Path]:
+        """Moves a batch back into the downloads folder. Returns the restored archive paths."""
+        restored = []
+        for record in batch.records:
+            archive_path = Path(record.archive_path)
+            if archive_path.exists():
+                logger.warning("Not restoring %s: a file with that name exists again", archive_path)
+                continue
+            try:
+                os.rename(record.staged_archive_path, archive_path)
+            except OSError as exc:
+                logger.error("Failed to restore %s: %s", archive_path, exc)
+                continue
+            if record.staged_meta_path and record.meta_path and not Path(record.meta_path).exists():
+                try:
+                    os.rename(record.staged_meta_path, record.meta_path)
+                except OSError as exc:
+                    logger.warning("Failed to restore meta %s: %s", record.meta_path, exc)
+            restored.append(archive_path)
+        shutil.rmtree(self._root / batch.batch_id, ignore_errors=True)
+        return restored
+
+    def purge(self, max_bytes: float, max_age_seconds: float, purge_all: bool = False) -> int:
+        """
+        Permanently deletes batches older than max_age_seconds, then the oldest
+        batches while the trash is over max_bytes (batches inside the grace
+        period are kept). A limit of 0 disables it. Returns bytes freed.
+        """
+        now = time.time()
+        batches = self.batches()
+        total = sum(batch.size for batch in batches)
+        freed = 0
+        for batch in batches:
+            age = now - batch.created
+            expired = bool(max_age_seconds) and age > max_age_seconds
+            oversize = bool(max_bytes) and total > max_bytes and age > TRASH_GRACE_SECONDS
+            if not (purge_all or expired or oversize):
+                continue
+            shutil.rmtree(self._root / batch.batch_id, ignore_errors=True)
+            total -= batch.size
+            freed += batch.size
+            logger.debug("DownloadTrash.purge: removed batch %s (%d files)", batch.batch_id, len(batch.records))
+        # Unfinished batches (no manifest) are leftovers from a crash mid-delete; nothing can undo them
+        if self._root.is_dir():
+            for batch_dir in self._root.iterdir():
+                if batch_dir.is_dir() and not (batch_dir / MANIFEST_NAME).exists():
+                    if now - batch_dir.stat().st_mtime > TRASH_GRACE_SECONDS:
+                        shutil.rmtree(batch_dir, ignore_errors=True)
+        return freed
+
+
+class TrashPurgeWorker(QThread):
+    """Runs DownloadTrash.purge in the background. Start it with a low thread priority."""
+
+    purge_finished = pyqtSignal(float)
+
+    def __init__(self, trash: DownloadTrash, max_bytes: float, max_age_seconds: float, purge_all: bool = False):
+        super().__init__()
+        self._trash = trash
+        self._max_bytes = max_bytes
+        self._max_age_seconds = max_age_seconds
+        self._purge_all = purge_all
+
+    def run(self):
+        try:
+            freed = self._trash.purge(self._max_bytes, self._max_age_seconds, self._purge_all)
+        except Exception as exc:
+            logger.error("TrashPurgeWorker: purge failed: %s", exc)
+            freed = 0
+        self.purge_finished.emit(float(freed))
@@ -0,0 +1,131 @@
+from collections import Counter
+from operator import attrgetter
+from typing import Dict, List
+
+from .download_entry import DownloadEntry
+
+FACET_INSTALLED = 1 << 0
+FACET_HIDDEN = 1 << 1
+FACET_HAS_META = 1 << 2
+
+# Bits below this are the fixed boolean facets; repositories and games are
+# assigned bits from here upward as new values are seen.
+_FIRST_VALUE_BIT = 8
+VALUE_BITS = ~((1 << _FIRST_VALUE_BIT) - 1)
+
+NO_VALUE_LABEL = "(none)"
+
+
+class FacetIndex:
+    """
+    Assigns every row a bitmask describing its facets (installed, hidden,
+    has-meta, repository and game) so the proxy can filter with a single
+    integer test per row instead of keeping filtered copies of the data.
+
+    Repository and game bits are counted per row: a value no row has any
+    more gives its bit back, and the bit is handed to a new value only once
+    no filter refers to it (see reserved).
+    """
+
+    def __init__(self):
+        self._next_bit = _FIRST_VALUE_BIT
+        self._free_bits: List[int] = []
+        self._repository_bits: Dict[str, int] = {}
+        self._game_bits: Dict[str, int] = {}
+        self._rows_per_bit: Counter = Counter()
+        # Bits the view's filter still uses; kept out of reuse so a new value doesn't inherit a stale filter
+        self.reserved = 0
+        # Bumped whenever a repository or game appears or disappears
+        self.values_version = 0
+
+    def _take_bit(self) -> int:
+        for position, bit in enumerate(self._free_bits):
+            if not bit & self.reserved:
+                return self._free_bits.pop(position)
+        bit = 1 << self._next_bit
+        self._next_bit += 1
+        return bit
+
+    def _value_bit(self, bits: Dict[str, int], value) -> int:
+        key = value or NO_VALUE_LABEL
+        bit = bits.get(key)
+        if bit is None:
+            bit = self._take_bit()
+            bits[key] = bit
+            self.values_version += 1
+        return bit
+
+    @staticmethod
+    def _flag_mask(entry: DownloadEntry) -> int:
+        mask = 0
+        if entry.installed:
+            mask |= FACET_INSTALLED
+        if entry.hidden:
+            mask |= FACET_HIDDEN
+        if entry.raw_meta_path is not None:
+            mask |= FACET_HAS_META
+        return mask
+
+    def add(self, entry: DownloadEntry) -> int:
+        """Counts a row's repository and game, and returns its facet mask."""
+        mask = self._flag_mask(entry)
+        for bits, value in ((self._repository_bits, entry.repository), (self._game_bits, entry.game_name)):
+            bit = self._value_bit(bits, value)
+            self._rows_per_bit[bit] += 1
+            mask |= bit
+        return mask
+
+    def remove(self, entry: DownloadEntry):
+        """Uncounts a row; a repository or game left without rows gives its bit back."""
+        for bits, value in ((self._repository_bits, entry.repository), (self._game_bits, entry.game_name)):
+            key = value or NO_VALUE_LABEL
+            bit = bits.get(key)
+            if bit is None:
+                continue
+            self._rows_per_bit[bit] -= 1
+            if self._rows_per_bit[bit] <= 0:
+                self._release(bits, key)
+
+    def _release(self, bits: Dict[str, int], key: str):
+        bit = bits.pop(key)
+        self._rows_per_bit.pop(bit, None)
+        self._free_bits.append(bit)
+        self.values_version += 1
+
+    def reset(self, entries: List[DownloadEntry]) -> List[int]:
+        """
+        Recounts from the table's current rows and returns their masks. Values
+        still present keep their bits, so filters on them survive a refresh.
+        """
+        self._rows_per_bit.clear()
+        for bits, attribute in ((self._repository_bits, "repository"), (self._game_bits, "game_name")):
+            for value, count in Counter(map(attrgetter(attribute), entries)).items():
+                self._rows_per_bit[self._value_bit(bits, value)] += count
+            for key in [key for key, bit in bits.items() if bit not in self._rows_per_bit]:
+                self._release(bits, key)
+        repository_bits, game_bits = self._repository_bits, self._game_bits
+        return [
+            self._flag_mask(entry)
+            | repository_bits[entry.repository or NO_VALUE_LABEL]
+            | game_bits[entry.game_name or NO_VALUE_LABEL]
+            for entry in entries
+        ]
+
+    def assigned_bits(self) -> int:
+        """Every repository and game bit currently held by a value."""
+        mask = 0
+        for bit in (*self._repository_bits.values(), *self._game_bits.values()):
+            mask |= bit
+        return mask
+
+    def repository_bit(self, repository: str) -> int:
+        return self._repository_bits.get(repository or NO_VALUE_LABEL, 0)
+
+    def game_bit(self, game: str) -> int:
+        return self._game_bits.get(game or NO_VALUE_LABEL, 0)
+
+    def repositories(self) -> List[str]:
+        return sorted(self._repository_bits)
+
+    def games(self) -> List[str]:
+        return sorted(self._game_bits)
@@ -1,47 +1,64 @@
 ﻿import hashlib
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Callable, Union
 
 from .download_entry import DownloadEntry
+from .io_scheduler import Priority, device_key, shared_scheduler
 
 try:
     from PyQt6.QtCore import QThread, pyqtSignal
 except ImportError:
     from PyQt5.QtCore import QThread, pyqtSignal
 
+def file_md5(path: Path, chunk_size: int = 1024 * 1024, progress: Union[Callable[[int], None], None] = None) -> str:
+    """MD5 of a file read in chunks; progress, when given, gets the bytes read after each chunk."""
+    hash_md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hash_md5.update(chunk)
+            if progress is not None:
+                progress(len(chunk))
+    return hash_md5.hexdigest()
+
 @dataclass
 class HashResult:
     md5_hash: str
     mod: DownloadEntry
 
 class HashWorker(QThread):
+    """Hashes one archive on the shared I/O scheduler at hashing priority, below scans and meta writes."""
     progress_updated = pyqtSignal(int)
     hash_computed = pyqtSignal(HashResult)
 
-    def __init__(self, mod: DownloadEntry, chunk_size=4096):
+    def __init__(self, mod: DownloadEntry, chunk_size=1024 * 1024):
         super().__init__()
         self.mod = mod
         self.file_path = mod.raw_file_path
         self.chunk_size = chunk_size
 
+    def _hash_file(self) -> str:
+        file_size = Path(self.file_path).stat().st_size
+        processed_size = 0
+        last_update = -1
+
+        def chunk_read(length: int):
+            nonlocal processed_size, last_update
+            processed_size += length
+            progress = int((processed_size / file_size) * 100)
+
+            # ensure progress only updates in 1% intervals.
+            if progress > last_update:
+                self.progress_updated.emit(progress)
+                last_update = progress
+
+        return file_md5(self.file_path, self.chunk_size, chunk_read)
+
     def run(self):
         try:
-            file_size = Path(self.file_path).stat().st_size
-            processed_size = 0
-            hash_md5 = hashlib.md5()
-            last_update = -1
-
-            with open(self.file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(self.chunk_size), b""):
-                    hash_md5.update(chunk)
-                    processed_size += len(chunk)
-                    progress = int((processed_size / file_size) * 100)
-
-                    # ensure progress only updates in 1% intervals.
-                    if progress > last_update:
-                        self.progress_updated.emit(progress)
-                        last_update = progress
-
-            self.hash_computed.emit(HashResult(md5_hash=hash_md5.hexdigest(), mod=self.mod))
+            md5_hash = shared_scheduler().submit(
+                self._hash_file, priority=Priority.HASHING, device=device_key(self.file_path)
+            ).result()
+            self.hash_computed.emit(HashResult(md5_hash=md5_hash, mod=self.mod))
         except Exception as e:
             self.hash_computed.emit(f"Error: {e}")
\ No newline at end of file
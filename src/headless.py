@@ -0,0 +1,93 @@
+import sys
+import types
+from pathlib import Path
+from typing import Dict, Union
+
+
+def ensure_mobase():
+    """
+    Makes `import mobase` work outside MO2. The real module is used when it
+    can be imported; otherwise a stand-in whose attributes are empty
+    placeholder classes is registered, which is enough for the type
+    annotations and base classes the plugin modules reference at import time.
+    """
+    if "mobase" in sys.modules:
+        return sys.modules["mobase"]
+    try:
+        import mobase  # pylint:disable=import-outside-toplevel
+        return mobase
+    except ImportError:
+        pass
+
+    stand_in = types.ModuleType("mobase")
+    placeholders: Dict[str, type] = {}
+
+    def __getattr__(name: str):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        if name not in placeholders:
+            placeholders[name] = type(name, (), {"__init__": lambda self, *args, **kwargs: None})
+        return placeholders[name]
+
+    stand_in.__getattr__ = __getattr__
+    sys.modules["mobase"] = stand_in
+    return stand_in
+
+
+class _Version:
+    def __init__(self, version: str):
+        self._version = version
+
+    def canonicalString(self) -> str:
+        return self._version
+
+
+class _Game:
+    def __init__(self, short_name: str):
+        self._short_name = short_name
+
+    def gameShortName(self) -> str:
+        return self._short_name
+
+
+class HeadlessOrganizer:
+    """
+    Stand-in for mobase.IOrganizer with just the calls the model layer makes,
+    so it can run outside MO2 (benchmarks, command-line use).
+    """
+
+    def __init__(
+        self,
+        downloads_path: Union[str, Path],
+        settings: Union[Dict[str, object], None] = None,
+        app_version: str = "2.5.2",
+        game_short_name: str = "SkyrimSE",
+    ):
+        self._downloads_path = str(downloads_path)
+        self._settings: Dict[str, object] = dict(settings or {})
+        self._version = _Version(app_version)
+        self._game = _Game(game_short_name)
+        self.installed = []
+
+    def downloadsPath(self) -> str:
+        return self._downloads_path
+
+    def pluginSetting(self, _plugin_name: str, key: str):
+        return self._settings.get(key)
+
+    def setPluginSetting(self, _plugin_name: str, key: str, value):
+        self._settings[key] = value
+
+    def appVersion(self) -> _Version:
+        return self._version
+
+    def managedGame(self) -> _Game:
+        return self._game
+
+    def installMod(self, archive_path, *_args):
+        # There is no MO2 to install into; record the request and report success
+        self.installed.append(str(archive_path))
+        return object()
+
+    def getPluginDataPath(self) -> str:
+        return str(Path(self._downloads_path) / ".download_manager_data")
@@ -0,0 +1,119 @@
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Union
+
+from .download_entry import DownloadEntry
+from .util import logger
+
+JOURNAL_NAME = ".download_manager_install_queue.jsonl"
+
+STATUS_INSTALLING = "installing"
+STATUS_INSTALLED = "installed"
+STATUS_FAILED = "failed"
+_DONE_STATUSES = (STATUS_INSTALLED, STATUS_FAILED)
+
+
+@dataclass
+class PendingRun:
+    run_id: str
+    started: float
+    # Entry ids still to install, in queue order
+    remaining: List[str] = field(default_factory=list)
+    completed: int = 0
+    seconds: Dict[str, float] = field(default_factory=dict)
+
+
+class InstallJournal:
+    """
+    Append-only JSON-lines log of a bulk install run, kept in the downloads
+    folder so it belongs to the MO2 instance. One "start" record lists the
+    queue, then one "status" record per step; each line is flushed to disk
+    before the next install starts. A run that finishes normally deletes
+    the file, so a journal left behind means the run was interrupted.
+    """
+
+    def __init__(self, downloads_path: Union[str, Path]):
+        self._path = Path(downloads_path) / JOURNAL_NAME
+        self._handle = None
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def _append(self, record: dict):
+        if self._handle is None:
+            self._handle = open(self._path, "a", encoding="utf-8")
+        self._handle.write(json.dumps(record) + "\n")
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+
+    def start(self, entries: List[DownloadEntry]):
+        try:
+            self._append({
+                "event": "start",
+                "run_id": datetime.now().strftime("%Y%m%d-%H%M%S-%f"),
+                "time": time.time(),
+                "entries": [{"id": entry.entry_id, "file": entry.filename} for entry in entries],
+            })
+        except OSError as exc:
+            logger.warning("InstallJournal.start: can't write %s: %s", self._path, exc)
+
+    def record(self, entry: DownloadEntry, status: str, seconds: float = 0.0):
+        try:
+            self._append({"event": "status", "id": entry.entry_id, "status": status, "seconds": round(seconds, 3)})
+        except OSError as exc:
+            logger.warning("InstallJournal.record: can't write %s: %s", self._path, exc)
+
+    def finish(self):
+        """Ends the run; nothing is left to resume."""
+        self.close()
+        try:
+            self._path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as exc:
+            logger.warning("InstallJournal.finish: can't remove %s: %s", self._path, exc)
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def load_pending(self) -> Union[PendingRun, None]:
+        """Reads back an interrupted run. A torn last line (crash mid-write) is ignored."""
+        try:
+            with open(self._path, "r", encoding="utf-8") as handle:
+                lines = handle.readlines()
+        except FileNotFoundError:
+            return None
+        except OSError as exc:
+            logger.warning("InstallJournal.load_pending: can't read %s: %s", self._path, exc)
+            return None
+
+        run = None
+        queue: List[str] = []
+        statuses: Dict[str, str] = {}
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("event") == "start":
+                # Only the most recent run counts
+                run = PendingRun(run_id=record.get("run_id", ""), started=record.get("time", 0))
+                queue = [item["id"] for item in record.get("entries", [])]
+                statuses = {}
+            elif record.get("event") == "status" and run is not None:
+                statuses[record["id"]] = record["status"]
+                if record["status"] in _DONE_STATUSES:
+                    run.seconds[record["id"]] = record.get("seconds", 0.0)
+        if run is None:
+            return None
+        # An entry stuck at "installing" was interrupted mid-install and is retried
+        run.remaining = [entry_id for entry_id in queue if statuses.get(entry_id) not in _DONE_STATUSES]
+        run.completed = len(queue) - len(run.remaining)
+        return run if run.remaining else None
@@ -0,0 +1,305 @@
+import cProfile
+import gc
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Union
+
+from .util import logger, logs_dir
+
+PROFILING_SETTING = "profiling"
+MEMORY_DIAGNOSTICS_SETTING = "memoryDiagnostics"
+
+PHASE_SCANDIR = "scandir"
+PHASE_META_PARSE = "meta parse"
+PHASE_ENTRY_BUILD = "entry build"
+PHASE_TABLE_INIT = "table init"
+PHASE_SORT = "sort"
+PHASE_RESIZE = "resize"
+
+
+@dataclass(frozen=True)
+class TimingRecord:
+    operation: str
+    started: float  # epoch seconds
+    elapsed: float
+    # Seconds per phase. Phases that run on several workers at once are summed
+    # across them, so they can add up to more than `elapsed`.
+    phases: Dict[str, float] = field(default_factory=dict)
+    counts: Dict[str, int] = field(default_factory=dict)
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "operation": self.operation,
+                "started": round(self.started, 3),
+                "elapsed_ms": round(self.elapsed * 1000, 3),
+                "phases_ms": {name: round(seconds * 1000, 3) for name, seconds in self.phases.items()},
+                "counts": self.counts,
+            }
+        )
+
+
+_last_records: Dict[str, TimingRecord] = {}
+
+
+def last_timing(operation: str) -> Union[TimingRecord, None]:
+    return _last_records.get(operation)
+
+
+class PhaseTimer:
+    """
+    Accumulates time per named phase of one operation. Cheap enough to stay on
+    permanently; thread-safe so scheduler workers can add their share. Call
+    finish() once to log the result as a `timing {...}` JSON line and keep it
+    as the operation's last record.
+    """
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self._started = time.perf_counter()
+        self._started_epoch = time.time()
+        self._phases: Dict[str, float] = {}
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            self._phases[name] = self._phases.get(name, 0.0) + seconds
+
+    def count(self, name: str, amount: int):
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + amount
+
+    def finish(self) -> TimingRecord:
+        with self._lock:
+            record = TimingRecord(
+                operation=self.operation,
+                started=self._started_epoch,
+                elapsed=time.perf_counter() - self._started,
+                phases=dict(self._phases),
+                counts=dict(self._counts),
+            )
+        _last_records[record.operation] = record
+        logger.info("timing %s", record.to_json())
+        return record
+
+
+_active_profiler: Union["Profiler", None] = None
+
+
+class Profiler:
+    """
+    cProfile around one operation, dumped to the logs folder as
+    DownloadManager-<name>-<time>.prof when stopped. Covers the thread that
+    started it plus anything run through `profiled` meanwhile (I/O scheduler
+    tasks, refresh workers). Only one profiler runs at a time; starting a second
+    one, or one created disabled, does nothing.
+    """
+
+    def __init__(self, name: str, enabled: bool = True):
+        self._name = name
+        self._enabled = enabled
+        self._profile: Union[cProfile.Profile, None] = None
+        self._thread_profiles = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        global _active_profiler
+        if not self._enabled or _active_profiler is not None:
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as exc:
+            # Another profiling tool (a debugger, say) already owns the hook
+            logger.warning("Profiler(%s): could not start: %s", self._name, exc)
+            return
+        self._profile = profile
+        _active_profiler = self
+
+    def stop(self) -> Union[Path, None]:
+        global _active_profiler
+        if self._profile is None:
+            return None
+        self._profile.disable()
+        _active_profiler = None
+        with self._lock:
+            stats = pstats.Stats(self._profile)
+            for profile in self._thread_profiles:
+                stats.add(profile)
+        self._profile = None
+        path = logs_dir() / f"DownloadManager-{self._name}-{time.strftime('%Y%m%d-%H%M%S')}.prof"
+        stats.sort_stats(pstats.SortKey.CUMULATIVE)
+        stats.dump_stats(str(path))
+        logger.info("Profiler(%s): wrote %s", self._name, path)
+        return path
+
+    def runcall(self, fn: Callable, *args, **kwargs):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ profiles every thread from one hook, so the
+            # starting thread's profile already sees this call
+            return fn(*args, **kwargs)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.disable()
+            with self._lock:
+                if self._profile is not None:
+                    self._thread_profiles.append(profile)
+
+    def __enter__(self) -> "Profiler":
+        self.start()
+        return self
+
+    def __exit__(self, *_exc):
+        self.stop()
+
+
+def profiled(fn: Callable, *args, **kwargs):
+    """Calls fn, under the active profiler if there is one."""
+    profiler = _active_profiler
+    if profiler is None:
+        return fn(*args, **kwargs)
+    return profiler.runcall(fn, *args, **kwargs)
+
+
+_PACKAGE_DIR = os.path.normcase(os.path.dirname(os.path.abspath(__file__)))
+# Frames kept per traced allocation; enough to reach plugin code from stdlib internals
+MEMORY_TRACE_FRAMES = 16
+# Modules whose live memory scales with the number of downloads
+ENTRY_MODULES = (
+    "download_entry",
+    "download_manager_model",
+    "download_manager_table_model",
+    "search_query",
+    "facets",
+    "download_group_model",
+)
+
+
+def _module_of(traceback: tracemalloc.Traceback) -> str:
+    """The innermost plugin module on an allocation's stack, or "other"."""
+    for frame in reversed(traceback):
+        filename = os.path.normcase(frame.filename)
+        if filename.startswith(_PACKAGE_DIR):
+            return os.path.splitext(os.path.basename(filename))[0]
+    return "other"
+
+
+def _live_workers() -> Dict[str, int]:
+    # Workers are the usual leak: a QThread kept alive by a dangling connection
+    counts = Counter(
+        type(obj).__name__
+        for obj in gc.get_objects()
+        if type(obj).__name__.endswith("Worker") and type(obj).__module__.startswith(__package__ or "")
+    )
+    return dict(counts)
+
+
+@dataclass(frozen=True)
+class MemoryRecord:
+    operation: str
+    entries: int
+    delta_bytes: int
+    traced_bytes: int
+    peak_bytes: int
+    # Traced memory now minus after this operation's first run; steady growth means a leak
+    growth_since_first: int
+    delta_by_module: Dict[str, int] = field(default_factory=dict)
+    live_by_module: Dict[str, int] = field(default_factory=dict)
+    bytes_per_entry: Dict[str, float] = field(default_factory=dict)
+    live_workers: Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class MemoryMark:
+    operation: str
+    snapshot: tracemalloc.Snapshot
+
+
+class MemoryDiagnostics:
+    """
+    Opt-in tracemalloc accounting. begin() snapshots the heap, end() diffs
+    against it and logs a `memory {json}` line: growth per plugin module
+    (allocations are attributed to the innermost plugin frame on their
+    stack), live bytes per module and per entry, traced memory growth since
+    the operation's first run, and live worker objects. Snapshots of a large
+    heap take a while, so this is for diagnosing, not for everyday use.
+    """
+
+    def __init__(self, enabled: bool):
+        self._enabled = enabled
+        self._first_traced: Dict[str, int] = {}
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start(MEMORY_TRACE_FRAMES)
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def begin(self, operation: str) -> Union[MemoryMark, None]:
+        if not self._enabled:
+            return None
+        return MemoryMark(operation, self._snapshot())
+
+    def end(self, mark: Union[MemoryMark, None], entries: int = 0) -> Union[MemoryRecord, None]:
+        if mark is None:
+            return None
+        after = self._snapshot()
+        delta_by_module: Counter = Counter()
+        for diff in after.compare_to(mark.snapshot, "traceback"):
+            delta_by_module[_module_of(diff.traceback)] += diff.size_diff
+        live_by_module: Counter = Counter()
+        for stat in after.statistics("traceback"):
+            live_by_module[_module_of(stat.traceback)] += stat.size
+        traced, peak = tracemalloc.get_traced_memory()
+        first = self._first_traced.setdefault(mark.operation, traced)
+        record = MemoryRecord(
+            operation=mark.operation,
+            entries=entries,
+            delta_bytes=sum(delta_by_module.values()),
+            traced_bytes=traced,
+            peak_bytes=peak,
+            growth_since_first=traced - first,
+            delta_by_module=dict(delta_by_module.most_common()),
+            live_by_module=dict(live_by_module.most_common()),
+            bytes_per_entry={
+                module: round(size / entries, 1)
+                for module, size in live_by_module.items()
+                if entries and module in ENTRY_MODULES
+            },
+            live_workers=_live_workers(),
+        )
+        logger.info("memory %s", json.dumps(asdict(record)))
+        return record
+
+    @contextmanager
+    def measure(self, operation: str):
+        mark = self.begin(operation)
+        try:
+            yield
+        finally:
+            self.end(mark)
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
@@ -0,0 +1,191 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from enum import IntEnum
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Tuple, Union
+
+from .instrumentation import profiled
+from .util import CancellationToken, logger
+
+
+class Priority(IntEnum):
+    """Lower values run first. Within a class, tasks run in submission order."""
+
+    INTERACTIVE = 0  # folder scans, deletes and Nexus lookups the user is waiting on
+    METADATA = 1  # .meta writes
+    HASHING = 2
+    VERIFICATION = 3  # background checks nobody is waiting on
+
+
+# Device key for work that doesn't touch the disk
+NETWORK_DEVICE = "network"
+NETWORK_CONCURRENCY = 2
+
+
+def _determine_worker_count() -> int:
+    cpu_count = os.cpu_count() or 4
+    return min(32, max(4, cpu_count * 4))
+
+
+def device_key(path: Union[str, Path, None]) -> str:
+    """Identifies the volume a path lives on, so per-device limits apply across folders."""
+    if path is None:
+        return "unknown"
+    candidate = Path(path)
+    while True:
+        try:
+            return f"dev:{candidate.stat().st_dev}"
+        except OSError:
+            if candidate.parent == candidate:
+                return "unknown"
+            candidate = candidate.parent
+
+
+@dataclass
+class _Task:
+    fn: Callable
+    args: Tuple
+    future: Future
+    token: Union[CancellationToken, None]
+
+
+@dataclass
+class SchedulerStats:
+    queued: Dict[Priority, int] = field(default_factory=dict)
+    running: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def total_queued(self) -> int:
+        return sum(self.queued.values())
+
+    @property
+    def total_running(self) -> int:
+        return sum(self.running.values())
+
+
+class IOScheduler:
+    """
+    One worker pool shared by every disk and network task in the plugin.
+    Workers always take the highest-priority task whose device is below its
+    concurrency limit, so a background hash can't starve an interactive scan
+    of the same disk. Tasks whose cancellation token fired before they
+    started are dropped without running.
+    """
+
+    def __init__(self, max_workers: int = 0, device_limit: int = 0):
+        self._max_workers = max_workers or _determine_worker_count()
+        self._device_limit = device_limit or self._max_workers
+        self._condition = threading.Condition()
+        # priority -> device -> FIFO of tasks
+        self._queues: Dict[Priority, Dict[str, Deque[_Task]]] = {priority: {} for priority in Priority}
+        self._running: Dict[str, int] = {}
+        self._workers: List[threading.Thread] = []
+        self._shutdown = False
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers
+
+    def set_device_limit(self, limit: int):
+        """Maximum concurrent tasks per disk (0 = as many as there are workers)."""
+        with self._condition:
+            self._device_limit = int(limit) if limit and limit > 0 else self._max_workers
+            self._condition.notify_all()
+
+    def _limit_for(self, device: str) -> int:
+        return NETWORK_CONCURRENCY if device == NETWORK_DEVICE else self._device_limit
+
+    def submit(
+        self,
+        fn: Callable,
+        *args,
+        priority: Priority = Priority.INTERACTIVE,
+        device: str = "unknown",
+        token: Union[CancellationToken, None] = None,
+    ) -> Future:
+        future = Future()
+        task = _Task(fn, args, future, token)
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("IOScheduler has been shut down")
+            self._queues[priority].setdefault(device, deque()).append(task)
+            self._ensure_workers()
+            self._condition.notify()
+        return future
+
+    def _ensure_workers(self):
+        if len(self._workers) >= self._max_workers:
+            return
+        # Grow one worker per submit; idle plugins keep no threads around
+        worker = threading.Thread(target=self._work, name=f"IOScheduler-{len(self._workers)}", daemon=True)
+        self._workers.append(worker)
+        worker.start()
+
+    def _next_task(self) -> Union[Tuple[str, _Task], None]:
+        for devices in self._queues.values():
+            for device, tasks in devices.items():
+                if tasks and self._running.get(device, 0) < self._limit_for(device):
+                    return device, tasks.popleft()
+        return None
+
+    def _work(self):
+        while True:
+            with self._condition:
+                picked = self._next_task()
+                while picked is None:
+                    if self._shutdown:
+                        return
+                    self._condition.wait()
+                    picked = self._next_task()
+                device, task = picked
+                self._running[device] = self._running.get(device, 0) + 1
+
+            try:
+                if task.token is not None and task.token.cancelled:
+                    task.future.cancel()
+                if task.future.set_running_or_notify_cancel():
+                    try:
+                        task.future.set_result(profiled(task.fn, *task.args))
+                    except BaseException as exc:
+                        task.future.set_exception(exc)
+            finally:
+                with self._condition:
+                    self._running[device] -= 1
+                    # A slot on this device opened up; tasks waiting on it may now run
+                    self._condition.notify_all()
+
+    def stats(self) -> SchedulerStats:
+        with self._condition:
+            queued = {
+                priority: sum(len(tasks) for tasks in devices.values())
+                for priority, devices in self._queues.items()
+            }
+            running = {device: count for device, count in self._running.items() if count}
+        return SchedulerStats(queued=queued, running=running)
+
+    def shutdown(self):
+        with self._condition:
+            self._shutdown = True
+            for devices in self._queues.values():
+                for tasks in devices.values():
+                    for task in tasks:
+                        task.future.cancel()
+                    tasks.clear()
+            self._condition.notify_all()
+        logger.debug("IOScheduler.shutdown: stopped accepting work")
+
+
+_shared_scheduler: Union[IOScheduler, None] = None
+_shared_lock = threading.Lock()
+
+
+def shared_scheduler() -> IOScheduler:
+    """The plugin-wide scheduler, created on first use."""
+    global _shared_scheduler
+    with _shared_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = IOScheduler()
+        return _shared_scheduler
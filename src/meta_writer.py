@@ -0,0 +1,242 @@
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple, Union
+
+from .download_entry import DownloadEntry
+from .io_scheduler import IOScheduler, Priority, device_key, shared_scheduler
+from .util import logger
+
+try:
+    from PyQt6.QtCore import QObject, QThread, pyqtSignal
+except ImportError:
+    from PyQt5.QtCore import QObject, QThread, pyqtSignal
+
+META_SECTION = "General"
+
+# Characters that make QSettings quote a value when it writes an ini file
+_QUOTE_TRIGGERS = (",", ";", "=", '"')
+
+
+def _ini_escape(value) -> str:
+    """Formats a value the way QSettings' ini writer would, so MO2 reads it back unchanged."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    text = "" if value is None else str(value)
+    escaped = (
+        text.replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+        .replace("\t", "\\t")
+    )
+    if any(trigger in text for trigger in _QUOTE_TRIGGERS) or text != text.strip():
+        return f'"{escaped}"'
+    return escaped
+
+
+def patch_ini_text(text: str, updates: Dict[str, object], section: str = META_SECTION) -> str:
+    """
+    Rewrites only the given keys of one section, leaving every other line as
+    it was. Keys that don't exist yet are appended to the end of the section,
+    and the section is created at the top of the file if it's missing.
+    """
+    lines = text.splitlines()
+    header = f"[{section}]"
+    remaining = dict(updates)
+    in_section = False
+    section_found = False
+    insert_at = None
+    patched = []
+
+    for line in lines:
+        stripped = line.strip()
+        if stripped.startswith("[") and stripped.endswith("]"):
+            if in_section:
+                insert_at = len(patched)
+            in_section = stripped == header
+            section_found = section_found or in_section
+            patched.append(line)
+            continue
+        if in_section and "=" in line:
+            key = line.split("=", 1)[0].strip()
+            if key in remaining:
+                patched.append(f"{key}={_ini_escape(remaining.pop(key))}")
+                continue
+        patched.append(line)
+
+    new_lines = [f"{key}={_ini_escape(value)}" for key, value in remaining.items()]
+    if not section_found:
+        patched = [header] + new_lines + ([""] + patched if patched else [])
+    elif new_lines:
+        if insert_at is None:
+            insert_at = len(patched)
+        # Keep a blank line that separates sections after the appended keys
+        while insert_at > 0 and not patched[insert_at - 1].strip():
+            insert_at -= 1
+        patched[insert_at:insert_at] = new_lines
+    return "\n".join(patched) + "\n"
+
+
+def write_meta_atomic(meta_path: Path, updates: Dict[str, object]) -> Path:
+    """Patches keys in a .meta file via temp file and rename, so readers never see a partial file."""
+    try:
+        with open(meta_path, "r", encoding="utf-8", errors="surrogateescape", newline="") as handle:
+            text = handle.read()
+    except FileNotFoundError:
+        text = ""
+    newline = "\r\n" if "\r\n" in text else "\n"
+    patched = patch_ini_text(text, updates)
+
+    temp_path = meta_path.with_name(f"{meta_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(temp_path, "w", encoding="utf-8", errors="surrogateescape", newline=newline) as handle:
+            handle.write(patched)
+        os.replace(temp_path, meta_path)
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+    return meta_path
+
+
+@dataclass
+class _PendingWrite:
+    meta_path: Path
+    updates: Dict[str, object]
+    future: Future
+
+
+class MetaWriter:
+    """
+    Writes .meta patches through the I/O scheduler at metadata priority.
+    Updates to a file that is still queued are merged into the queued write
+    rather than written twice, and writes to the same file never run
+    concurrently.
+    """
+
+    _LOCK_STRIPES = 64
+
+    def __init__(self, scheduler: Union[IOScheduler, None] = None):
+        self._scheduler = scheduler or shared_scheduler()
+        self._lock = threading.Lock()
+        self._pending: Dict[str, _PendingWrite] = {}
+        self._path_locks = [threading.Lock() for _ in range(self._LOCK_STRIPES)]
+        self._devices: Dict[Path, str] = {}
+
+    def submit(self, meta_path: Path, updates: Dict[str, object]) -> Future:
+        key = os.path.normcase(str(meta_path))
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is not None:
+                pending.updates.update(updates)
+                return pending.future
+            pending = _PendingWrite(meta_path, dict(updates), Future())
+            self._pending[key] = pending
+        folder = Path(meta_path).parent
+        device = self._devices.get(folder)
+        if device is None:
+            device = self._devices[folder] = device_key(folder)
+        self._scheduler.submit(self._run, key, priority=Priority.METADATA, device=device)
+        return pending.future
+
+    def _run(self, key: str):
+        with self._path_locks[hash(key) % self._LOCK_STRIPES]:
+            with self._lock:
+                pending = self._pending.pop(key)
+            if not pending.future.set_running_or_notify_cancel():
+                return
+            try:
+                pending.future.set_result(write_meta_atomic(pending.meta_path, pending.updates))
+            except Exception as exc:
+                pending.future.set_exception(exc)
+
+
+# (entry, key updates, entry as it looks once the write has landed)
+MetaUpdate = Tuple[DownloadEntry, Dict[str, object], DownloadEntry]
+
+
+class MetaUpdateWorker(QThread):
+    """
+    Drives a batch of meta writes through a MetaWriter and reports the
+    resulting entries in batches, so the table can update rows in place
+    instead of rescanning the downloads folder.
+    """
+
+    progress_updated = pyqtSignal(int, int)
+    entries_updated = pyqtSignal(list)
+    update_finished = pyqtSignal(int, int)
+
+    BATCH_SIZE = 128
+    BATCH_INTERVAL = 0.1
+
+    def __init__(self, writer: MetaWriter, updates: List[MetaUpdate]):
+        super().__init__()
+        self._writer = writer
+        self._updates = updates
+
+    def run(self):
+        total = len(self._updates)
+        # Coalesced writes share a future, so a future can stand for several entries
+        futures: Dict[Future, List[DownloadEntry]] = {}
+        for _entry, key_updates, updated_entry in self._updates:
+            future = self._writer.submit(updated_entry.raw_meta_path, key_updates)
+            futures.setdefault(future, []).append(updated_entry)
+
+        batch: List[DownloadEntry] = []
+        last_flush = time.monotonic()
+        done_count = 0
+        failed = 0
+        not_done = set(futures)
+        while not_done:
+            done, not_done = wait(not_done, timeout=self.BATCH_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in done:
+                updated_entries = futures[future]
+                done_count += len(updated_entries)
+                try:
+                    future.result()
+                    batch.extend(updated_entries)
+                except Exception as exc:
+                    failed += len(updated_entries)
+                    logger.error("Failed to write meta for %s: %s", updated_entries[0].filename, exc)
+            now = time.monotonic()
+            if batch and (len(batch) >= self.BATCH_SIZE or now - last_flush >= self.BATCH_INTERVAL):
+                self.entries_updated.emit(batch)
+                batch = []
+                last_flush = now
+            self.progress_updated.emit(done_count, total)
+        if batch:
+            self.entries_updated.emit(batch)
+        self.update_finished.emit(done_count - failed, failed)
+
+
+class ChangesRelay(QObject):
+    """
+    Delivers the result of a model future (a requery or a hide after
+    install) to the thread this object lives on. The future completes on an
+    I/O worker; emitting from there queues the signal to the UI thread, where
+    the changes can be applied to the table.
+    """
+
+    changes_ready = pyqtSignal(object)
+
+    def watch(self, future: Future):
+        future.add_done_callback(lambda done: self.changes_ready.emit(done.result()))
+
+
+def build_meta_updates(
+    entries: List[DownloadEntry],
+    updates: Dict[str, object],
+    apply: Callable[[DownloadEntry], DownloadEntry],
+) -> Tuple[List[MetaUpdate], List[DownloadEntry]]:
+    """Pairs entries with their key updates; entries without a meta file are returned separately."""
+    meta_updates: List[MetaUpdate] = []
+    skipped: List[DownloadEntry] = []
+    for entry in entries:
+        if entry.raw_meta_path is None:
+            skipped.append(entry)
+            continue
+        meta_updates.append((entry, updates, apply(entry)))
+    return meta_updates, skipped
@@ -0,0 +1,282 @@
+import re
+import time
+from typing import Callable, List, Optional, Tuple, Union
+
+from .download_entry import DownloadEntry
+
+
+class QueryError(ValueError):
+    """Raised when a search query cannot be compiled."""
+
+
+class RowFields:
+    """
+    Typed, pre-normalized view of a DownloadEntry used by search predicates.
+    Built once per row when the table data changes so filtering never has to
+    render display strings.
+    """
+
+    __slots__ = (
+        "name",
+        "modname",
+        "filename",
+        "text",
+        "version",
+        "size",
+        "mtime",
+        "installed",
+        "hidden",
+        "has_meta",
+        "mod_id",
+        "file_id",
+        "repository",
+        "game",
+    )
+
+    def __init__(self, entry: DownloadEntry):
+        self.name = (entry.name or "").lower()
+        self.modname = (entry.modname or "").lower()
+        self.filename = (entry.filename or "").lower()
+        # Same columns the plain-text search has always matched against
+        self.text = f"{self.modname}\n{self.filename}"
+        self.version = (entry.version or "").lower()
+        self.size = entry.file_size or 0
+        self.mtime = entry.filetime.timestamp() if entry.filetime else 0.0
+        self.installed = bool(entry.installed)
+        self.hidden = bool(entry.hidden)
+        self.has_meta = entry.raw_meta_path is not None
+        self.mod_id = _to_int(entry.nexus_mod_id)
+        self.file_id = _to_int(entry.nexus_file_id)
+        self.repository = (entry.repository or "").lower()
+        self.game = (entry.game_name or "").lower()
+
+
+Predicate = Callable[[RowFields], bool]
+
+_SIZE_UNITS = {
+    "": 1,
+    "b": 1,
+    "k": 1024,
+    "kb": 1024,
+    "kib": 1024,
+    "m": 1024 ** 2,
+    "mb": 1024 ** 2,
+    "mib": 1024 ** 2,
+    "g": 1024 ** 3,
+    "gb": 1024 ** 3,
+    "gib": 1024 ** 3,
+    "t": 1024 ** 4,
+    "tb": 1024 ** 4,
+    "tib": 1024 ** 4,
+}
+
+_AGE_UNITS = {
+    "": 86400,
+    "h": 3600,
+    "d": 86400,
+    "w": 7 * 86400,
+    "m": 30 * 86400,
+    "y": 365 * 86400,
+}
+
+_TRUE_VALUES = ("yes", "y", "true", "1", "on")
+_FALSE_VALUES = ("no", "n", "false", "0", "off")
+
+_TERM_RE = re.compile(r"^(?P<field>[a-z_]+)(?P<op>>=|<=|!=|:|=|>|<)(?P<value>.*)$", re.IGNORECASE)
+_SPLIT_RE = re.compile(r'(?:[^\s"]*"[^"]*"?)+[^\s"]*|\S+')
+_NUMBER_RE = re.compile(r"^(?P<number>\d+(?:\.\d+)?)\s*(?P<unit>[a-z]*)$")
+
+_COMPARATORS = {
+    ":": lambda a, b: a == b,
+    "=": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+}
+
+# Query field aliases -> canonical field name
+_FIELD_ALIASES = {
+    "size": "size",
+    "age": "age",
+    "installed": "installed",
+    "hidden": "hidden",
+    "meta": "meta",
+    "mod": "mod",
+    "modid": "mod",
+    "file": "file",
+    "fileid": "file",
+    "repo": "repo",
+    "repository": "repo",
+    "game": "game",
+    "name": "name",
+    "modname": "modname",
+    "filename": "filename",
+    "version": "version",
+}
+
+
+def _to_int(value) -> Optional[int]:
+    if value is None or value == "":
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_size(value: str) -> float:
+    match = _NUMBER_RE.match(value.strip().lower())
+    if not match or match.group("unit") not in _SIZE_UNITS:
+        raise QueryError(f"Invalid size: {value!r}")
+    return float(match.group("number")) * _SIZE_UNITS[match.group("unit")]
+
+
+def _parse_age(value: str) -> float:
+    match = _NUMBER_RE.match(value.strip().lower())
+    if not match or match.group("unit") not in _AGE_UNITS:
+        raise QueryError(f"Invalid age: {value!r}")
+    return float(match.group("number")) * _AGE_UNITS[match.group("unit")]
+
+
+def _parse_bool(value: str) -> bool:
+    lowered = value.strip().lower()
+    if lowered in _TRUE_VALUES:
+        return True
+    if lowered in _FALSE_VALUES:
+        return False
+    raise QueryError(f"Expected yes/no, got {value!r}")
+
+
+def _numeric_predicate(attribute: str, op: str, target: float) -> Predicate:
+    compare = _COMPARATORS[op]
+
+    def predicate(fields: RowFields) -> bool:
+        value = getattr(fields, attribute)
+        return value is not None and compare(value, target)
+
+    return predicate
+
+
+def _text_predicate(attribute: str, op: str, needle: str) -> Predicate:
+    if op in (":", "!="):
+        # ":" is a substring match, "!=" its negation
+        if op == ":":
+            return lambda fields: needle in getattr(fields, attribute)
+        return lambda fields: needle not in getattr(fields, attribute)
+    if op == "=":
+        return lambda fields: getattr(fields, attribute) == needle
+    raise QueryError(f"Operator {op!r} is not supported for text fields")
+
+
+def _compile_field(field: str, op: str, value: str, now: float) -> Predicate:
+    negate = False
+    if op == ":" and value.startswith("!"):
+        negate = True
+        value = value[1:]
+    if not value:
+        raise QueryError(f"Missing value for {field!r}")
+
+    if field == "size":
+        predicate = _numeric_predicate("size", "=" if op == ":" else op, _parse_size(value))
+    elif field == "age":
+        # age>365d means older than a year, i.e. a smaller timestamp
+        inverted = {">": "<", ">=": "<=", "<": ">", "<=": ">=", ":": "=", "=": "=", "!=": "!="}[op]
+        predicate = _numeric_predicate("mtime", inverted, now - _parse_age(value))
+    elif field in ("installed", "hidden", "meta"):
+        if op not in (":", "="):
+            raise QueryError(f"Operator {op!r} is not supported for {field!r}")
+        attribute = "has_meta" if field == "meta" else field
+        expected = _parse_bool(value)
+        predicate = lambda fields: getattr(fields, attribute) is expected
+    elif field in ("mod", "file"):
+        target = _to_int(value)
+        if target is None:
+            raise QueryError(f"Expected a number for {field!r}, got {value!r}")
+        predicate = _numeric_predicate(f"{field}_id", "=" if op == ":" else op, target)
+    elif field in ("repo", "game"):
+        attribute = "repository" if field == "repo" else "game"
+        # Repository and game are matched exactly; use name/filename for substrings
+        predicate = _text_predicate(attribute, "=" if op == ":" else op, value.lower())
+    else:
+        predicate = _text_predicate(field, op, value.lower())
+
+    if negate:
+        return lambda fields: not predicate(fields)
+    return predicate
+
+
+def _compile_term(term: str, now: float) -> Predicate:
+    negate = False
+    if term.startswith("-") and len(term) > 1:
+        negate = True
+        term = term[1:]
+
+    match = _TERM_RE.match(term)
+    field = _FIELD_ALIASES.get(match.group("field").lower()) if match else None
+    if field is not None:
+        predicate = _compile_field(field, match.group("op"), match.group("value"), now)
+    else:
+        # Unknown prefixes are treated as plain text so "foo:bar" still finds filenames
+        needle = term.lower()
+        predicate = lambda fields: needle in fields.text
+
+    if negate:
+        return lambda fields: not predicate(fields)
+    return predicate
+
+
+def _split_terms(query: str) -> List[str]:
+    # Whitespace separated, double quotes group words (name:"two words", -"two words")
+    return [term.replace('"', "") for term in _SPLIT_RE.findall(query) if term.replace('"', "")]
+
+
+class CompiledQuery:
+    """A query parsed once and evaluated per row as a conjunction of predicates."""
+
+    __slots__ = ("text", "_predicates")
+
+    def __init__(self, text: str, predicates: Tuple[Predicate, ...]):
+        self.text = text
+        self._predicates = predicates
+
+    def is_empty(self) -> bool:
+        return not self._predicates
+
+    def matches(self, fields: RowFields) -> bool:
+        for predicate in self._predicates:
+            if not predicate(fields):
+                return False
+        return True
+
+
+def compile_query(query: str, now: Union[float, None] = None) -> CompiledQuery:
+    """
+    Compiles a search query into a CompiledQuery.
+
+    Terms are space separated and all must match. Supported forms:
+        text                plain substring over mod name and filename
+        "two words"         quoted substring
+        -term               negates any term
+        size>2GB            size with B/KB/MB/GB/TB units (binary)
+        age>365d            file age with h/d/w/m/y units
+        installed:no        also hidden: and meta:
+        mod:123 file:456    Nexus mod / file ids, comparisons allowed
+        repo:Nexus game:SkyrimSE
+        repo:!Nexus         "!" after ":" negates the value
+        name:foo modname:foo filename:foo version:1.2
+
+    :raises QueryError: if a recognized field has an invalid value.
+    """
+    now = time.time() if now is None else now
+    predicates = tuple(_compile_term(term, now) for term in _split_terms(query.strip()))
+    return CompiledQuery(query, predicates)
+
+
+def plain_text_query(text: str) -> CompiledQuery:
+    """Builds a query that only does the plain substring match, ignoring any field syntax."""
+    needle = text.strip().lower()
+    if not needle:
+        return CompiledQuery(text, ())
+    return CompiledQuery(text, (lambda fields: needle in fields.text,))
@@ -0,0 +1,104 @@
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import List, Union
+
+from .util import logger
+
+try:
+    from PyQt6.QtCore import QObject, QTimer
+except ImportError:
+    from PyQt5.QtCore import QObject, QTimer
+
+# Stacks kept per stall; enough to see where a long freeze spends its time
+MAX_SAMPLES = 20
+# Innermost frames kept per sampled stack
+STACK_LIMIT = 30
+
+
+class StallWatchdog(QObject):
+    """
+    Detects UI freezes. A timer on the UI thread records a heartbeat; a
+    watchdog thread notices when the heartbeat is late by more than the
+    threshold and samples the UI thread's Python stack via
+    sys._current_frames while the freeze is still going on. Once the event
+    loop is back, the stall is logged with its start time, duration and the
+    distinct stacks seen, most frequent first.
+    """
+
+    def __init__(self, threshold_ms: int, parent=None):
+        super().__init__(parent)
+        self._threshold = max(0, threshold_ms) / 1000
+        self._interval = max(0.02, self._threshold / 4)
+        self._timer = QTimer(self)
+        self._timer.setInterval(int(self._interval * 1000))
+        self._timer.timeout.connect(self._beat)  # type: ignore
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Union[threading.Thread, None] = None
+        self._ui_thread_id = None
+        self._last_beat = time.monotonic()
+        self._samples: List[str] = []
+        self._stall_started = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self._threshold > 0
+
+    def start(self):
+        """Starts watching the calling (UI) thread. Does nothing when disabled or already running."""
+        if not self.enabled or self._thread is not None:
+            return
+        self._ui_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._timer.start()
+        self._thread = threading.Thread(target=self._watch, name="DownloadManagerStallWatchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._timer.stop()
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._thread.join(1)
+        self._thread = None
+
+    def _beat(self):
+        now = time.monotonic()
+        with self._lock:
+            late_by = now - self._last_beat - self._interval
+            self._last_beat = now
+            samples, self._samples = self._samples, []
+            stall_started = self._stall_started
+        if samples:
+            self._report(late_by, stall_started, samples)
+
+    def _watch(self):
+        poll = max(0.01, self._threshold / 2)
+        while not self._stopped.wait(poll):
+            with self._lock:
+                late_by = time.monotonic() - self._last_beat - self._interval
+            if late_by < self._threshold:
+                continue
+            frame = sys._current_frames().get(self._ui_thread_id)  # pylint:disable=protected-access
+            if frame is None:
+                continue
+            stack = "".join(traceback.format_stack(frame, STACK_LIMIT))
+            del frame
+            with self._lock:
+                if not self._samples:
+                    self._stall_started = time.time() - late_by
+                if len(self._samples) < MAX_SAMPLES:
+                    self._samples.append(stack)
+
+    @staticmethod
+    def _report(duration: float, started: float, samples: List[str]):
+        started_text = time.strftime("%H:%M:%S", time.localtime(started)) + f".{int(started % 1 * 1000):03d}"
+        lines = [f"UI stall: event loop blocked for {duration * 1000:.0f} ms starting at {started_text}"]
+        for stack, count in Counter(samples).most_common():
+            lines.append(f"-- UI thread stack ({count} of {len(samples)} samples):")
+            lines.append(stack.rstrip())
+        logger.warning("\n".join(lines))
@@ -1,13 +1,15 @@
-﻿try:
+﻿import time
+
+try:
     import PyQt6.QtWidgets as QtWidgets
     from PyQt6.QtWidgets import QHeaderView
     from PyQt6.QtGui import QPalette, QColor, QFont, QPainter, QPen
-    from PyQt6.QtCore import Qt, QTimer
+    from PyQt6.QtCore import Qt, QTimer, pyqtSignal
 except ImportError:
     import PyQt5.QtWidgets as QtWidgets
     from PyQt5.QtWidgets import QHeaderView
     from PyQt5.QtGui import QPalette, QColor, QFont, QPainter, QPen
-    from PyQt5.QtCore import Qt, QTimer
+    from PyQt5.QtCore import Qt, QTimer, pyqtSignal
 
 class HashProgressDialog(QtWidgets.QDialog):
     def __init__(self, parent=None):
@@ -28,6 +30,45 @@ class HashProgressDialog(QtWidgets.QDialog):
     def cancel(self):
         self.reject()
 
+class BulkProgressDialog(QtWidgets.QDialog):
+    """
+    Non-blocking progress for bulk operations. Cancel / Esc emits
+    cancel_requested and keeps the dialog up until the owner calls finish().
+    """
+
+    cancel_requested = pyqtSignal()
+
+    def __init__(self, title: str, total: int, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(title)
+        self.setMinimumWidth(360)
+        self.label = QtWidgets.QLabel(f"0 of {total}")
+        self.progress_bar = QtWidgets.QProgressBar()
+        self.progress_bar.setRange(0, max(total, 1))
+        self.cancel_button = QtWidgets.QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.reject)  # type: ignore
+        layout = QtWidgets.QVBoxLayout()
+        layout.addWidget(self.label)
+        layout.addWidget(self.progress_bar)
+        layout.addWidget(self.cancel_button)
+        self.setLayout(layout)
+
+    def update_progress(self, done: int, total: int):
+        self.progress_bar.setMaximum(max(total, 1))
+        self.progress_bar.setValue(done)
+        self.label.setText(f"{done} of {total}")
+
+    def reject(self):
+        if not self.cancel_button.isEnabled():
+            return
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.setText("Cancelling...")
+        self.cancel_requested.emit()
+
+    def finish(self):
+        self.accept()
+
+
 def create_basic_table_widget(alternate_rows: bool = True):
     """Set the model after creating this. Cleans up window code"""
     table = QtWidgets.QTableView()
@@ -47,6 +88,19 @@ def create_basic_table_widget(alternate_rows: bool = True):
     return table
 
 
+def create_basic_tree_widget(alternate_rows: bool = True):
+    """Tree counterpart of create_basic_table_widget for the grouped view."""
+    tree = QtWidgets.QTreeView()
+    tree.setAlternatingRowColors(alternate_rows)
+    # Uniform rows let Qt skip measuring every row when expanding large groups
+    tree.setUniformRowHeights(True)
+    tree.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectionBehavior.SelectRows)
+    tree.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+    tree.header().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+    tree.header().setStretchLastSection(False)
+    return tree
+
+
 def button_with_handler(text, parent, handler) -> QtWidgets.QPushButton:
     button = QtWidgets.QPushButton(text, parent)
     button.clicked.connect(handler) # type: ignore
@@ -182,3 +236,30 @@ class LoadingOverlay(QtWidgets.QWidget):
         super().resizeEvent(event)
         if self.parent():
             self.setGeometry(self.parent().rect())
+
+
+class PerformancePanel(QtWidgets.QGroupBox):
+    """Compact breakdown of the last refresh's phase timings."""
+
+    def __init__(self, parent=None):
+        super().__init__("Performance", parent)
+        self._summary = QtWidgets.QLabel("No refresh recorded yet.", self)
+        self._phases = QtWidgets.QLabel(self)
+        self._phases.setToolTip(
+            "Meta parse and entry build run on several workers at once; their times are summed across workers."
+        )
+        layout = QtWidgets.QVBoxLayout()
+        layout.setContentsMargins(8, 4, 8, 4)
+        layout.addWidget(self._summary)
+        layout.addWidget(self._phases)
+        self.setLayout(layout)
+
+    def show_record(self, record):
+        files = record.counts.get("files", 0)
+        self._summary.setText(
+            f"Last refresh: {files} downloads in {record.elapsed * 1000:.0f} ms "
+            f"at {time.strftime('%H:%M:%S', time.localtime(record.started))}"
+        )
+        self._phases.setText(
+            "  ·  ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in record.phases.items())
+        )
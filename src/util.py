@@ -1,6 +1,11 @@
-﻿import logging
+﻿import atexit
+import logging
 import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
+from typing import Union
 
 logger: logging.Logger = logging.getLogger("DownloadManager")
 
@@ -11,6 +16,21 @@ class DictMixin:
     def __setitem__(self, key, value):
         setattr(self, key, value)
 
+
+class CancellationToken:
+    """Thread-safe flag a long-running task polls between batches to stop early."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+
 def sizeof_fmt(num, suffix="B"):
     for unit in ("", "Ki", "Mi", "Gi", "Ti", "Pi", "Ei", "Zi"):
         if abs(num) < 1024.0:
@@ -19,33 +39,64 @@ def sizeof_fmt(num, suffix="B"):
     return f"{num:.1f}Yi{suffix}"
 
 
+def logs_dir() -> Path:
+    """MO2's logs folder (two levels above the plugin), created if missing."""
+    script_dir: str = os.path.dirname(os.path.abspath(__file__))
+    path = Path(os.path.abspath(os.path.join(script_dir, "..", "..", "logs")))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+LOG_LEVEL_SETTING = "logLevel"
+LOG_MAX_BYTES = 5 * 1024 ** 2
+LOG_BACKUP_COUNT = 3
+
+_log_listener: Union[QueueListener, None] = None
+
+
 def create_logger() -> None:
     """
-    Creates a logger with a file handler and sets it to the DEBUG level.
-    Removes all existing handlers from the logger.
+    Sends the logger's records through a queue to a background thread that
+    writes DownloadManager.log, so logging never waits on the disk. Each MO2
+    session starts a fresh log; earlier ones are kept as .1 to .3, and a log
+    that outgrows 5 MiB rotates the same way. Removes all existing handlers
+    from the logger and sets it to DEBUG until set_log_level is called.
     """
-    # Remove all existing handlers from the logger
+    global _log_listener
     for handler in logger.handlers[:]:
         logger.removeHandler(handler)
+    if _log_listener is not None:
+        _log_listener.stop()
 
-    script_dir: str = os.path.dirname(os.path.abspath(__file__))
-    logs_dir: str = os.path.abspath(os.path.join(script_dir, "..", "..", "logs"))
-    Path(logs_dir).mkdir(parents=True, exist_ok=True)
-    log_path: str = os.path.abspath(os.path.join(logs_dir, "DownloadManager.log"))
-    with open(log_path, "w", encoding="utf-8") as _:
-        pass
-
-    # Create a file handler that logs messages to "logs\PageFileManager.log"
-    file_handler = logging.FileHandler(log_path, encoding="utf-8", mode="w")
-
-    # Set the format of the log messages
-    formatter = logging.Formatter(
-        "[%(asctime)s] [%(levelname)s] [%(filename)s:%(lineno)d] %(message)s"
+    log_path = logs_dir() / "DownloadManager.log"
+    file_handler = RotatingFileHandler(
+        log_path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8", delay=True
+    )
+    if log_path.exists() and log_path.stat().st_size:
+        file_handler.doRollover()
+    file_handler.setFormatter(
+        logging.Formatter("[%(asctime)s] [%(levelname)s] [%(filename)s:%(lineno)d] %(message)s")
     )
-    file_handler.setFormatter(formatter)
-
-    # Add the file handler to the logger
-    logger.addHandler(file_handler)
 
-    # Set the logger to the DEBUG level
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(QueueHandler(log_queue))
+    _log_listener = QueueListener(log_queue, file_handler)
+    _log_listener.start()
     logger.setLevel(logging.DEBUG)
+
+
+def stop_logging() -> None:
+    """Flushes queued records to disk and stops the writer thread."""
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
+
+
+atexit.register(stop_logging)
+
+
+def set_log_level(level_name) -> None:
+    """Applies the logLevel setting; unknown or empty values fall back to INFO."""
+    level = logging.getLevelName(str(level_name or "").strip().upper())
+    logger.setLevel(level if isinstance(level, int) else logging.INFO)